@@ -6,7 +6,7 @@ class AuthenticationConfig(AppConfig):
     name = 'authentication'
     
     def ready(self):
-        pass
+        from . import signals  # noqa: F401
     
     # def __str__(self):
     #     return self.name
@@ -0,0 +1,167 @@
+"""
+Async versions of the login, registration and change-password endpoints for
+deployments served through backend/asgi.py.
+
+Password hashing runs on the bounded executor in hashing.py and the ORM is
+only reached through Django's async queryset methods or sync_to_async, so a
+single process keeps many of these requests in flight while each one waits
+on PBKDF2. Responses match the sync views in views.py.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, Throttled
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .hashing import acheck_password, amake_password
+from .models import CustomUser
+from .serializers import ChangePasswordSerializer, LoginCredentialsSerializer, RegisterSerializer
+from .throttling import LoginRateThrottle
+from .views import format_error_response, login_response_data, register_response_data
+
+
+class AsyncAPIView(View):
+    """
+    Just enough of APIView for JSON endpoints under ASGI: parses the body
+    into request.data and, when `authenticated` is set, resolves
+    request.user from the JWT bearer token.
+    """
+    authenticated = False
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated like the DRF views, so no CSRF cookie involved.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return self.http_method_not_allowed(request, *args, **kwargs)
+
+        if request.content_type == 'application/json':
+            try:
+                request.data = json.loads(request.body or b'{}')
+            except ValueError:
+                return JsonResponse(format_error_response('Malformed JSON'), status=status.HTTP_400_BAD_REQUEST)
+        else:
+            request.data = request.POST.dict()
+
+        if self.authenticated:
+            try:
+                result = await sync_to_async(JWTAuthentication().authenticate)(request)
+            except AuthenticationFailed as e:
+                return JsonResponse(format_error_response(str(e.detail)), status=status.HTTP_401_UNAUTHORIZED)
+            if result is None:
+                return JsonResponse(
+                    format_error_response('Authentication credentials were not provided.'),
+                    status=status.HTTP_401_UNAUTHORIZED
+                )
+            request.user = result[0]
+
+        return await handler(request, *args, **kwargs)
+
+
+class AsyncLoginView(AsyncAPIView):
+    async def post(self, request):
+        # One local SQLite statement; cheap enough to run on the loop.
+        throttle = LoginRateThrottle()
+        if not throttle.allow_request(request, self):
+            exc = Throttled(throttle.wait())
+            response = JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+            response['Retry-After'] = str(exc.wait)
+            return response
+
+        try:
+            serializer = LoginCredentialsSerializer(data=request.data)
+            if not serializer.is_valid():
+                return JsonResponse({
+                    'success': False,
+                    'detail': 'Invalid input',
+                    'errors': serializer.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            identifier = serializer.validated_data['email'].lower()
+            password = serializer.validated_data['password']
+
+            user = await CustomUser.objects.afind_by_identifier(identifier)
+            if user is None:
+                detail = serializer.NO_ACCOUNT
+            elif not await acheck_password(user, password):
+                detail = serializer.INVALID_PASSWORD
+            else:
+                data = await sync_to_async(login_response_data)(user)
+                return JsonResponse(data, status=status.HTTP_200_OK)
+
+            return JsonResponse({
+                'success': False,
+                'detail': [detail],
+                'errors': {'detail': [detail]}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'detail': 'Login failed',
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncRegisterView(AsyncAPIView):
+    async def post(self, request):
+        try:
+            serializer = RegisterSerializer(data=request.data)
+            # The unique-email check queries the database.
+            if not await sync_to_async(serializer.is_valid)():
+                return JsonResponse(
+                    format_error_response('Registration failed', serializer.errors),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            password_hash = await amake_password(serializer.validated_data['password1'])
+            user = await sync_to_async(serializer.save)(password_hash=password_hash)
+            data = await sync_to_async(register_response_data)(user)
+            return JsonResponse(data, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            return JsonResponse(
+                format_error_response('Registration failed', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AsyncChangePasswordView(AsyncAPIView):
+    authenticated = True
+
+    async def post(self, request):
+        try:
+            serializer = ChangePasswordSerializer(data=request.data)
+            if not serializer.is_valid():
+                return JsonResponse(
+                    format_error_response('Password change failed', serializer.errors),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            user = request.user
+            if not await acheck_password(user, serializer.validated_data['old_password']):
+                return JsonResponse(
+                    format_error_response('Password change failed', {'old_password': 'Incorrect old password'}),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            user.password = await amake_password(serializer.validated_data['new_password'])
+            await user.asave(update_fields=['password'])
+            return JsonResponse({
+                'success': True,
+                'message': 'Password has been changed successfully.'
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return JsonResponse(
+                format_error_response('Password change failed', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,47 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Thread pool that runs password hashing for the async views. hashlib
+    releases the GIL while it works, so up to PASSWORD_HASHING_WORKERS
+    hashes run in parallel while the event loop keeps serving requests;
+    anything beyond that queues here rather than piling onto the CPU.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', None) or os.cpu_count() or 2
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+    return _executor
+
+
+async def amake_password(raw_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), make_password, raw_password)
+
+
+async def acheck_password(user, raw_password):
+    """
+    Async counterpart of user.check_password() that keeps the hashing off
+    the event loop. Like the sync version it upgrades the stored hash when
+    the hasher settings have changed.
+    """
+    loop = asyncio.get_running_loop()
+    is_correct, must_update = await loop.run_in_executor(
+        get_executor(), verify_password, raw_password, user.password
+    )
+    if is_correct and must_update:
+        user.password = await amake_password(raw_password)
+        await user.asave(update_fields=['password'])
+    return is_correct
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+
+from authentication.models import CustomUser
+from backend.benchmark import scratch_database
+
+PASSWORD = 'Bench!Passw0rd-123'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare login throughput of the sync LoginView (one request at a time, '
+        'as in a sync worker) with AsyncLoginView serving concurrent requests '
+        'in one process. Runs against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=32)
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            CustomUser.objects.create_user(email='bench@example.com', password=PASSWORD, role='owner')
+            payload = {'email': 'bench@example.com', 'password': PASSWORD}
+            total = options['requests']
+
+            client = Client()
+            start = time.perf_counter()
+            for _ in range(total):
+                response = client.post('/api/auth/login/', payload, content_type='application/json')
+                assert response.status_code == 200, response.content
+            sync_elapsed = time.perf_counter() - start
+
+            async_elapsed = asyncio.run(self.run_async(payload, total, options['concurrency']))
+
+        self.stdout.write(f"{'view':<28} {'requests':>8} {'seconds':>8} {'logins/s':>9}")
+        self.stdout.write(f"{'LoginView (sync)':<28} {total:>8} {sync_elapsed:>8.2f} {total / sync_elapsed:>9.1f}")
+        label = f"AsyncLoginView (x{options['concurrency']})"
+        self.stdout.write(f"{label:<28} {total:>8} {async_elapsed:>8.2f} {total / async_elapsed:>9.1f}")
+
+    async def run_async(self, payload, total, concurrency):
+        client = AsyncClient()
+        slots = asyncio.Semaphore(concurrency)
+
+        async def login():
+            async with slots:
+                response = await client.post('/api/auth/async/login/', payload, content_type='application/json')
+                assert response.status_code == 200, response.content
+
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(total)))
+        return time.perf_counter() - start
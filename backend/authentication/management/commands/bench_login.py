@@ -0,0 +1,68 @@
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from authentication.models import CustomUser
+from backend.benchmark import measure, scratch_database, summarize
+
+
+def legacy_lookup(identifier):
+    # The pre-index login path: two case-insensitive scans.
+    user = CustomUser.objects.filter(email__iexact=identifier).first()
+    if not user:
+        user = CustomUser.objects.filter(user_name__iexact=identifier).first()
+    return user
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the login user lookup as the user table grows. Runs against '
+        'a scratch database; password hashing is excluded.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000],
+            help='User table sizes to measure at.',
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(sorted(options['sizes']), options['repeat'], options['batch_size'])
+
+    def run(self, sizes, repeat, batch_size):
+        password = make_password('benchmark-password')
+        self.stdout.write(
+            f"{'users':>10} {'legacy miss':>12} {'indexed miss':>13} "
+            f"{'indexed email':>14} {'indexed name':>13}   (mean ms)"
+        )
+        created = 0
+        for size in sizes:
+            while created < size:
+                count = min(batch_size, size - created)
+                CustomUser.objects.bulk_create([
+                    CustomUser(
+                        email=f'user{n}@example.com', email_key=f'user{n}@example.com',
+                        user_name=f'User{n}', user_name_key=f'user{n}',
+                        password=password, role='employee',
+                    )
+                    for n in range(created, created + count)
+                ])
+                created += count
+
+            probe = created // 2
+            legacy = summarize(measure(lambda: legacy_lookup('nobody@example.com'), repeat))
+            miss = summarize(measure(
+                lambda: CustomUser.objects.find_by_identifier('nobody@example.com'), repeat
+            ))
+            email = summarize(measure(
+                lambda: CustomUser.objects.find_by_identifier(f'USER{probe}@example.com'), repeat
+            ))
+            name = summarize(measure(
+                lambda: CustomUser.objects.find_by_identifier(f'user{probe}'), repeat
+            ))
+            self.stdout.write(
+                f"{created:>10} {legacy['mean']:>12.3f} {miss['mean']:>13.3f} "
+                f"{email['mean']:>14.3f} {name['mean']:>13.3f}"
+            )
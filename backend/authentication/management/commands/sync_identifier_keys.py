@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from authentication.models import CustomUser, normalize_identifier
+
+
+class Command(BaseCommand):
+    help = 'Backfill the normalized email/username lookup keys used by login.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated = 0
+        batch = []
+        users = CustomUser.objects.only('id', 'email', 'user_name', 'email_key', 'user_name_key')
+        for user in users.iterator(chunk_size=batch_size):
+            email_key = normalize_identifier(user.email)
+            user_name_key = normalize_identifier(user.user_name)
+            if user.email_key == email_key and user.user_name_key == user_name_key:
+                continue
+            user.email_key = email_key
+            user.user_name_key = user_name_key
+            batch.append(user)
+            if len(batch) >= batch_size:
+                CustomUser.objects.bulk_update(batch, ['email_key', 'user_name_key'])
+                updated += len(batch)
+                batch = []
+        if batch:
+            CustomUser.objects.bulk_update(batch, ['email_key', 'user_name_key'])
+            updated += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Updated lookup keys for {updated} users.'))
@@ -1,16 +1,21 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
+from django.db.models import Case, Q, When
 from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
 from django.conf import settings
 
 class CustomUserManager(BaseUserManager):
-    def create_user(self, email, password=None, **extra_fields):
+    def create_user(self, email, password=None, password_hash=None, **extra_fields):
         if not email:
             raise ValueError('The Email field must be set')
         email = self.normalize_email(email)
         user = self.model(email=email, **extra_fields)
-        user.set_password(password)
+        if password_hash is not None:
+            # Already hashed by the caller, e.g. off the event loop.
+            user.password = password_hash
+        else:
+            user.set_password(password)
         user.save(using=self._db)
         return user
 
@@ -20,6 +25,34 @@ class CustomUserManager(BaseUserManager):
         extra_fields.setdefault('is_active', True)
         return self.create_user(email, password, **extra_fields)
 
+    def find_by_identifier(self, identifier):
+        """
+        Resolve a login identifier (email or username) in a single indexed
+        query. An email match wins over a username match.
+        """
+        key = normalize_identifier(identifier)
+        if not key:
+            return None
+        return self._identifier_queryset(key).first()
+
+    async def afind_by_identifier(self, identifier):
+        key = normalize_identifier(identifier)
+        if not key:
+            return None
+        return await self._identifier_queryset(key).afirst()
+
+    def _identifier_queryset(self, key):
+        return (
+            self.select_related('business_profile')
+            .filter(Q(email_key=key) | Q(user_name_key=key))
+            .order_by(Case(When(email_key=key, then=0), default=1), 'pk')
+        )
+
+
+def normalize_identifier(value):
+    return (value or '').strip().lower()
+
+
 class CustomUser(AbstractBaseUser, PermissionsMixin):
     
     ROLE_CHOICES = [
@@ -31,6 +64,10 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(unique=True)
     full_name = models.CharField(max_length=150, blank=True)
     user_name = models.CharField(max_length=150, blank=True)
+    # Lower-cased copies of email/user_name so logins can use an index
+    # instead of a case-insensitive scan. Kept in sync by save().
+    email_key = models.CharField(max_length=254, db_index=True, editable=False, default='')
+    user_name_key = models.CharField(max_length=150, db_index=True, editable=False, default='')
     phone_number = PhoneNumberField(blank=True, null=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)  # Added role field
     is_active = models.BooleanField(default=True)
@@ -43,9 +80,45 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    class Meta:
+        # Back the user list's keyset pagination, alone or behind its role
+        # and is_active filters.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='idx_user_listing'),
+            models.Index(fields=['role', 'is_active', '-created_at', '-id'], name='idx_user_role_listing'),
+            models.Index(fields=['is_active', '-created_at', '-id'], name='idx_user_active_listing'),
+        ]
+
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        self.email_key = normalize_identifier(self.email)
+        self.user_name_key = normalize_identifier(self.user_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'email' in update_fields:
+                update_fields.add('email_key')
+            if 'user_name' in update_fields:
+                update_fields.add('user_name_key')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     @property
     def get_full_name(self):
         return self.full_name
+
+
+class UsernameSequence(models.Model):
+    """
+    Next free numeric suffix for usernames derived from an email local part,
+    e.g. base "info" hands out info, info1, info2, ... Allocations bump
+    next_suffix with a single UPDATE, so concurrent registrations never
+    receive the same suffix.
+    """
+    base = models.CharField(max_length=150, unique=True)
+    next_suffix = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.base} -> {self.next_suffix}"
@@ -0,0 +1,194 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WORKERS': 2,
+    'BATCH_SIZE': 50,
+    'MAX_QUEUE_SIZE': 1000,
+    'MAX_RETRIES': 3,
+    'RETRY_BACKOFF': 2.0,
+    'IDLE_TIMEOUT': 30,
+}
+
+
+class OutboxFull(Exception):
+    pass
+
+
+class EmailOutbox:
+    """
+    In-process queue of outgoing emails drained by a small pool of worker
+    threads. Each worker keeps its SMTP connection open between batches and
+    only closes it after IDLE_TIMEOUT seconds without mail, so a burst of
+    password resets is sent over a handful of connections instead of one
+    SMTP_SSL handshake per request.
+    """
+
+    def __init__(self, workers=2, batch_size=50, max_queue_size=1000,
+                 max_retries=3, retry_backoff=2.0, idle_timeout=30,
+                 connection_factory=get_connection):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self.connection_factory = connection_factory
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULTS, **getattr(settings, 'EMAIL_OUTBOX', {})}
+        return cls(**{key.lower(): value for key, value in options.items()})
+
+    def enqueue(self, message):
+        """
+        Queue an EmailMessage for delivery and return immediately.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            raise OutboxFull('Email outbox is full, try again later.')
+
+    def flush(self, timeout=None):
+        """
+        Block until every queued message has been sent or given up on.
+        Returns False if the timeout expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout=None):
+        """
+        Deliver what is queued, then shut the workers down.
+        """
+        self.flush(timeout)
+        with self._lock:
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f'email-outbox-{index}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _take_batch(self):
+        try:
+            first = self._queue.get(timeout=self.idle_timeout)
+        except queue.Empty:
+            return []
+        if first is None:
+            # Shutdown sentinel from stop()
+            self._queue.task_done()
+            return None
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if message is None:
+                # Not ours to consume mid-batch; leave it for the next loop.
+                self._queue.task_done()
+                self._queue.put(None)
+                break
+            batch.append(message)
+        return batch
+
+    def _run(self):
+        connection = None
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                break
+            if not batch:
+                # Idle for a while: let the SMTP server go rather than have
+                # it drop us mid-batch later.
+                if connection is not None:
+                    self._close(connection)
+                    connection = None
+                continue
+            try:
+                connection = self._send_batch(connection, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        if connection is not None:
+            self._close(connection)
+
+    def _send_batch(self, connection, batch):
+        for message in batch:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    if connection is None:
+                        connection = self.connection_factory(fail_silently=False)
+                        connection.open()
+                    connection.send_messages([message])
+                    break
+                except Exception as e:
+                    # The connection may be half-dead; start over on a fresh one.
+                    if connection is not None:
+                        self._close(connection)
+                        connection = None
+                    if attempt == self.max_retries:
+                        logger.error(
+                            'Giving up on email to %s after %d attempts: %s',
+                            ', '.join(message.to), attempt + 1, e,
+                        )
+                        break
+                    delay = self.retry_backoff * (2 ** attempt)
+                    logger.warning(
+                        'Email to %s failed (%s), retrying in %.1fs',
+                        ', '.join(message.to), e, delay,
+                    )
+                    time.sleep(delay)
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = EmailOutbox.from_settings()
+                # Give queued mail a chance to go out on a clean shutdown.
+                atexit.register(_outbox.stop, 10)
+    return _outbox
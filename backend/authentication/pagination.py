@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+
+
+class UserCursorPagination(CursorPagination):
+    """
+    Cursor pagination for the user list, newest first. DRF's cursor holds
+    the last row's created_at (the first ordering field only) plus an
+    offset past the rows sharing that value, so each page is a range scan
+    from that point rather than an OFFSET over every earlier page, and
+    rows inserted meanwhile do not shift later pages. id only breaks ties
+    in the ordering; users created in the same instant are skipped by
+    offset, not by id.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
@@ -1,11 +1,17 @@
+import logging
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from phonenumber_field.validators import validate_international_phonenumber
-from .utils import generate_username  # Make sure to create this utility function
+from .utils import generate_username
 from .models import CustomUser
-from django.core.mail import send_mail
+from .outbox import OutboxFull, get_outbox
+from .tokens import CachedRefreshToken, get_user_claims
+from django.core.mail import EmailMessage
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
 #import api view
@@ -16,9 +22,11 @@ from business_settings.models import BusinessProfile
 from django.core.validators import validate_email
 from phonenumber_field.validators import validate_international_phonenumber
 from django.core.exceptions import ValidationError
+from django.db.models import Q
 #import is authenticated
 from rest_framework.permissions import IsAuthenticated
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
@@ -31,6 +39,37 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return token
 
 
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh that decodes the token once, checks the blacklist against the
+    in-memory index and answers the user details from the claims cache.
+    With rotation on, recording the old token on the blacklist is the only
+    database work left on a warm cache.
+    """
+    token_class = CachedRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        user = get_user_claims(refresh[api_settings.USER_ID_CLAIM])
+        if user is None:
+            raise TokenError('User not found')
+
+        data = {'access': str(refresh.access_token), 'user': user}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data['refresh'] = str(refresh)
+
+        return data
+
+
 
 class UserSerializer(serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
@@ -39,6 +78,13 @@ class UserSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ['id', 'email', 'full_name', 'user_name', 'phone_number', 'role']
 
+    def __init__(self, *args, fields=None, **kwargs):
+        # `fields` narrows the output to a subset of Meta.fields.
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def get_full_name(self, obj):
         return obj.full_name
 
@@ -54,7 +100,14 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class LoginSerializer(serializers.Serializer):
+class LoginCredentialsSerializer(serializers.Serializer):
+    """
+    Field-level checks of a login payload only; no database access, so it
+    is safe to run on the event loop.
+    """
+    NO_ACCOUNT = 'No account found with this email or username.'
+    INVALID_PASSWORD = 'Invalid password.'
+
     email = serializers.CharField(required=True)  
     password = serializers.CharField(
         style={'input_type': 'password'},
@@ -63,6 +116,8 @@ class LoginSerializer(serializers.Serializer):
         required=True
     )
 
+
+class LoginSerializer(LoginCredentialsSerializer):
     def validate(self, attrs):
         identifier = attrs.get('email', '').lower()  
         password = attrs.get('password')
@@ -73,18 +128,16 @@ class LoginSerializer(serializers.Serializer):
             })
 
         # Try to find user by email or username
-        user = CustomUser.objects.filter(email__iexact=identifier).first()
-        if not user:
-            user = CustomUser.objects.filter(user_name__iexact=identifier).first()
+        user = CustomUser.objects.find_by_identifier(identifier)
         
         if not user:
             raise serializers.ValidationError({
-                'detail': 'No account found with this email or username.'
+                'detail': self.NO_ACCOUNT
             })
             
         if not user.check_password(password):
             raise serializers.ValidationError({
-                'detail': 'Invalid password.'
+                'detail': self.INVALID_PASSWORD
             })
 
         attrs['user'] = user
@@ -122,22 +175,22 @@ class PasswordResetRequestSerializer(serializers.Serializer):
             This link will expire in 24 hours.
             '''
             
-            # Send email with detailed error handling
+            # Queue the email; the outbox workers deliver it over a pooled
+            # SMTP connection so this request does not wait on the server.
             try:
-                send_mail(
+                get_outbox().enqueue(EmailMessage(
                     subject,
                     message,
                     settings.DEFAULT_FROM_EMAIL,
                     [user.email],
-                    fail_silently=False,
-                )
-                print(f"Password reset email sent successfully to {user.email}")
-            except Exception as e:
-                print(f"Error sending password reset email: {str(e)}")
+                ))
+                logger.info('Password reset email queued', extra={'user_id': user.pk})
+            except OutboxFull as e:
+                logger.warning('Password reset email not queued: %s', e)
                 raise serializers.ValidationError(f"Failed to send password reset email: {str(e)}")
                 
         except Exception as e:
-            print(f"Error in send_reset_email: {str(e)}")
+            logger.exception('Password reset email failed')
             raise serializers.ValidationError(f"Password reset process failed: {str(e)}")
 
 
@@ -151,28 +204,22 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
     )
 
     def validate(self, attrs):
-        print("Validating password reset data:", attrs)  # Debug log
-        
         # Validate email and token
         user = CustomUser.objects.filter(email=attrs['email']).first()
         if not user:
             raise serializers.ValidationError({"email": "Invalid email address"})
 
-        print("Found user:", user.email)  # Debug log
-
         # Check if token is valid
         if not default_token_generator.check_token(user, attrs['token']):
             raise serializers.ValidationError({"token": "Invalid or expired password reset token"})
 
-        print("Token is valid")  # Debug log
         return attrs
 
     def save(self):
-        print("Saving new password")  # Debug log
         user = CustomUser.objects.get(email=self.validated_data['email'])
         user.set_password(self.validated_data['new_password'])
         user.save()
-        print("Password updated successfully")  # Debug log
+        logger.info('Password reset completed', extra={'user_id': user.pk})
         return user
 
 
@@ -316,7 +363,7 @@ class RegisterSerializer(serializers.ModelSerializer):
                     
                 attrs['phone_number'] = phone
             except Exception as e:
-                print(f"Error formatting phone number: {str(e)}")
+                logger.warning('Could not normalize phone number: %s', e)
                 
         # Clean up business profile phone
         if 'business_profile' in attrs and attrs['business_profile']:
@@ -337,7 +384,7 @@ class RegisterSerializer(serializers.ModelSerializer):
                         
                     business_data['business_phone'] = phone
                 except Exception as e:
-                    print(f"Error formatting business phone: {str(e)}")
+                    logger.warning('Could not normalize business phone: %s', e)
                     
         return attrs
 
@@ -345,14 +392,20 @@ class RegisterSerializer(serializers.ModelSerializer):
         business_profile_data = validated_data.pop('business_profile', None)
         validated_data.pop('password2', None)
         password = validated_data.pop('password1')
+        password_hash = validated_data.pop('password_hash', None)
         
         # Set default role to owner
         role = validated_data.pop('role', 'owner')
+
+        # Derive a unique username from the email when none was given
+        if not validated_data.get('user_name'):
+            validated_data['user_name'] = generate_username(validated_data['email'])
         
         # Create user
         user = CustomUser.objects.create_user(
             **validated_data,
             password=password,
+            password_hash=password_hash,
             role=role
         )
         
@@ -370,3 +423,53 @@ class RegisterSerializer(serializers.ModelSerializer):
                 )
         
         return user
+
+
+
+class UserStatusFilterSerializer(serializers.Serializer):
+    store = serializers.IntegerField(required=False)
+    location = serializers.IntegerField(required=False)
+    role = serializers.ChoiceField(choices=CustomUser.ROLE_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Filter by at least one of store, location or role.")
+        return attrs
+
+
+class BulkUserStatusSerializer(serializers.Serializer):
+    MAX_USER_IDS = 10000
+
+    action = serializers.ChoiceField(choices=['activate', 'deactivate'])
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False, max_length=MAX_USER_IDS
+    )
+    filter = UserStatusFilterSerializer(required=False)
+
+    def validate(self, attrs):
+        if ('user_ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Provide either user_ids or filter.")
+        return attrs
+
+    def get_queryset(self):
+        """
+        Users targeted by the request. A store's staff are its admin plus the
+        accounts whose email matches one of its employees; a location's are
+        the accounts of employees working there.
+        """
+        from employees.models import Employee
+
+        if 'user_ids' in self.validated_data:
+            return CustomUser.objects.filter(id__in=self.validated_data['user_ids'])
+
+        filters = self.validated_data['filter']
+        users = CustomUser.objects.all()
+        if 'store' in filters:
+            employee_emails = Employee.objects.filter(store_id=filters['store']).values('email')
+            users = users.filter(Q(managed_stores=filters['store']) | Q(email__in=employee_emails))
+        if 'location' in filters:
+            employee_emails = Employee.objects.filter(location_id=filters['location']).values('email')
+            users = users.filter(email__in=employee_emails)
+        if 'role' in filters:
+            users = users.filter(role=filters['role'])
+        return users.distinct()
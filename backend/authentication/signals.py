@@ -1,12 +1,35 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
 from django.contrib.auth import get_user_model
 import logging
 
+from .tokens import invalidate_user_claims, user_claims_cache
+
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+# Sent once per bulk status change (which bypasses post_save) with
+# user_ids and is_active. user_ids is None for a change made by filter,
+# whose ids are never read.
+users_status_changed = Signal()
+
 @receiver(post_save, sender=User)
 def log_user_creation(sender, instance, created, **kwargs):
     if created:
-        logger.info(f"New user created: {instance.email}")
\ No newline at end of file
+        logger.info(f"New user created: {instance.email}")
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user_claims(sender, instance, **kwargs):
+    invalidate_user_claims(instance.pk)
+
+
+@receiver(users_status_changed)
+def drop_cached_claims_for_status_change(sender, user_ids, is_active, **kwargs):
+    if user_ids is None:
+        user_claims_cache.clear()
+        logger.info(f"{'Activated' if is_active else 'Deactivated'} users by filter")
+        return
+    for user_id in user_ids:
+        invalidate_user_claims(user_id)
+    logger.info(f"{'Activated' if is_active else 'Deactivated'} {len(user_ids)} users")
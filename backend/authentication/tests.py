@@ -1,10 +1,30 @@
-from django.test import TestCase
+import os
+import tempfile
+
+from django.test import AsyncClient, TestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.core.mail import EmailMessage
+from business_settings.models import BusinessProfile
+from .outbox import EmailOutbox, OutboxFull, get_outbox
+from .serializers import LoginSerializer, RegisterSerializer
+from .signals import users_status_changed
+from .throttling import SQLiteRateStore
+from .tokens import BloomFilter, blacklist_index, user_claims_cache
+from .utils import allocate_usernames, generate_username
 
 User = get_user_model()
 
+# Keep throttle counters out of the shared SQLite file during tests.
+MEMORY_RATE_STORE = {'BACKEND': 'authentication.throttling.MemoryRateStore'}
+
+@override_settings(RATE_LIMIT_STORE=MEMORY_RATE_STORE)
 class UserRegistrationTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -45,4 +65,381 @@ class UserRegistrationTests(TestCase):
         response = self.client.post(self.login_url, login_data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('access', response.data)
-        self.assertIn('refresh', response.data)
\ No newline at end of file
+        self.assertIn('refresh', response.data)
+
+class FlakyConnection:
+    """Test double for an SMTP backend that fails the first `failures` sends."""
+    opened = 0
+    failures = 0
+    sent = []
+
+    def __init__(self, fail_silently=False):
+        pass
+
+    def open(self):
+        FlakyConnection.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        if FlakyConnection.failures:
+            FlakyConnection.failures -= 1
+            raise ConnectionError('connection reset')
+        FlakyConnection.sent.extend(messages)
+        return len(messages)
+
+    def close(self):
+        pass
+
+
+@override_settings(RATE_LIMIT_STORE=MEMORY_RATE_STORE)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        FlakyConnection.opened = 0
+        FlakyConnection.failures = 0
+        FlakyConnection.sent = []
+
+    def make_outbox(self, **kwargs):
+        options = {'workers': 1, 'retry_backoff': 0, 'connection_factory': FlakyConnection}
+        options.update(kwargs)
+        outbox = EmailOutbox(**options)
+        self.addCleanup(outbox.stop, 5)
+        return outbox
+
+    def test_batch_reuses_one_connection(self):
+        outbox = self.make_outbox()
+        for i in range(20):
+            outbox.enqueue(EmailMessage('Subject', 'Body', 'from@example.com', [f'user{i}@example.com']))
+        self.assertTrue(outbox.flush(timeout=5))
+        self.assertEqual(len(FlakyConnection.sent), 20)
+        self.assertEqual(FlakyConnection.opened, 1)
+
+    def test_failed_send_is_retried_on_fresh_connection(self):
+        FlakyConnection.failures = 2
+        outbox = self.make_outbox(max_retries=3)
+        outbox.enqueue(EmailMessage('Subject', 'Body', 'from@example.com', ['user@example.com']))
+        self.assertTrue(outbox.flush(timeout=5))
+        self.assertEqual(len(FlakyConnection.sent), 1)
+        self.assertEqual(FlakyConnection.opened, 3)
+
+    def test_full_outbox_rejects_message(self):
+        # No workers, so nothing drains the queue.
+        outbox = EmailOutbox(workers=0, max_queue_size=1)
+        outbox.enqueue(EmailMessage('Subject', 'Body', 'from@example.com', ['a@example.com']))
+        with self.assertRaises(OutboxFull):
+            outbox.enqueue(EmailMessage('Subject', 'Body', 'from@example.com', ['b@example.com']))
+
+    def test_password_reset_request_is_queued(self):
+        User.objects.create_user(email='reset@example.com', password='Str0ng!Passw0rd', role='owner')
+        response = APIClient().post('/api/auth/password-reset/', {'email': 'reset@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(get_outbox().flush(timeout=5))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reset@example.com'])
+
+
+class LoginLookupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='Owner@Example.com', password='Str0ng!Passw0rd', user_name='ShopOwner', role='owner'
+        )
+        BusinessProfile.objects.create(user=self.user, business_name='Shop', business_type='retail')
+
+    def test_lookup_keys_follow_saves(self):
+        self.assertEqual(self.user.email_key, 'owner@example.com')
+        self.user.user_name = 'NewName'
+        self.user.save(update_fields=['user_name'])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.user_name_key, 'newname')
+
+    def test_email_or_username_in_one_query(self):
+        for identifier in ('OWNER@example.COM', 'shopowner'):
+            with self.assertNumQueries(1):
+                user = User.objects.find_by_identifier(identifier)
+                self.assertEqual(user.business_profile.business_type, 'retail')
+            self.assertEqual(user.pk, self.user.pk)
+
+    def test_email_match_wins_over_username(self):
+        other = User.objects.create_user(
+            email='someone@example.com', password='Str0ng!Passw0rd', user_name='owner@example.com', role='owner'
+        )
+        self.assertEqual(User.objects.find_by_identifier('owner@example.com').pk, self.user.pk)
+        self.assertEqual(User.objects.find_by_identifier('someone@example.com').pk, other.pk)
+
+    def test_login_serializer_uses_lookup(self):
+        serializer = LoginSerializer(data={'email': 'ShopOwner', 'password': 'Str0ng!Passw0rd'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['user'].pk, self.user.pk)
+
+
+class UsernameAllocatorTests(TestCase):
+    def test_consecutive_suffixes_per_local_part(self):
+        self.assertEqual(
+            allocate_usernames(['info@a.com', 'info@b.com', 'sales@a.com', 'info@c.com']),
+            ['info', 'info1', 'sales', 'info2'],
+        )
+        self.assertEqual(generate_username('info@d.com'), 'info3')
+
+    def test_skips_names_taken_outside_the_allocator(self):
+        for n, name in enumerate(['info', 'info7', 'information']):
+            User.objects.create_user(email=f'u{n}@example.com', user_name=name, role='owner')
+        self.assertEqual(generate_username('info@example.com'), 'info8')
+        self.assertEqual(generate_username('informa@example.com'), 'informa')
+
+    def test_batch_cost_does_not_grow_with_collisions(self):
+        emails = [f'info@shop{n}.com' for n in range(50)] + [f'staff{n}@shop.com' for n in range(50)]
+        with self.assertNumQueries(6):
+            usernames = allocate_usernames(emails)
+        self.assertEqual(len(set(usernames)), 100)
+        self.assertEqual(usernames[49], 'info49')
+
+    def test_registration_assigns_username(self):
+        serializer = RegisterSerializer(data={
+            'email': 'info@newshop.com', 'password1': 'Str0ng!Passw0rd', 'password2': 'Str0ng!Passw0rd',
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.save().user_name, 'info')
+
+
+class TokenRefreshTests(TestCase):
+    refresh_url = '/api/auth/token/refresh/'
+
+    def setUp(self):
+        user_claims_cache.clear()
+        blacklist_index.reset()
+        self.user = User.objects.create_user(
+            email='refresh@example.com', password='Str0ng!Passw0rd', full_name='Refresh User', role='owner'
+        )
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post(self.refresh_url, {'refresh': token}, format='json')
+
+    def test_refresh_rotates_and_returns_user(self):
+        response = self.refresh(str(RefreshToken.for_user(self.user)))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+        self.assertEqual(response.data['user']['full_name'], 'Refresh User')
+
+        # The rotated-out token is now rejected.
+        old = response.data['refresh']
+        self.assertEqual(self.refresh(old).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.refresh(old).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_warm_refresh_only_writes_the_blacklist(self):
+        token = self.refresh(str(RefreshToken.for_user(self.user))).data['refresh']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.refresh(token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sql = [query['sql'] for query in queries]
+        # No user lookup and no blacklist membership join; what remains is
+        # simplejwt recording the rotated token.
+        self.assertFalse(any('authentication_customuser' in statement for statement in sql))
+        self.assertFalse(any('INNER JOIN' in statement for statement in sql))
+
+    def test_user_save_invalidates_claims(self):
+        token = self.refresh(str(RefreshToken.for_user(self.user))).data['refresh']
+        self.user.full_name = 'Renamed'
+        self.user.save()
+        self.assertEqual(self.refresh(token).data['user']['full_name'], 'Renamed')
+
+    def test_token_blacklisted_elsewhere_is_rejected_after_sync(self):
+        token = RefreshToken.for_user(self.user)
+        blacklist_index.sync()
+        token.blacklist()  # plain simplejwt, bypassing the local index
+        blacklist_index.sync()
+        self.assertEqual(self.refresh(str(token)).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_REFRESH_CACHE={'BLACKLIST_CAPACITY': 4})
+    def test_sync_past_capacity_keeps_earlier_tokens(self):
+        blacklist_index.reset()
+        tokens = [RefreshToken.for_user(self.user) for _ in range(10)]
+        for token in tokens:
+            token.blacklist()
+        blacklist_index.sync()
+        self.assertTrue(all(blacklist_index.might_contain(token['jti']) for token in tokens))
+        self.assertEqual(self.refresh(str(tokens[0])).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for n in range(1000):
+            bloom.add(f'jti-{n}')
+        self.assertTrue(all(f'jti-{n}' in bloom for n in range(1000)))
+        false_positives = sum(f'other-{n}' in bloom for n in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+@override_settings(RATE_LIMIT_STORE=MEMORY_RATE_STORE)
+class AsyncAuthViewTests(TestCase):
+    password = 'Str0ng!Passw0rd'
+
+    async def test_register_login_and_change_password(self):
+        client = AsyncClient()
+        response = await client.post('/api/auth/async/register/', {
+            'email': 'async@example.com', 'password1': self.password, 'password2': self.password,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['user']['user_name'], 'async')
+
+        response = await client.post('/api/auth/async/login/', {
+            'email': 'ASYNC', 'password': self.password,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['role'], 'user')
+        access = response.json()['access']
+
+        response = await client.post('/api/auth/async/change-password/', {
+            'old_password': self.password, 'new_password': 'N3w!Passw0rd-xyz',
+        }, content_type='application/json', headers={'Authorization': f'Bearer {access}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user = await User.objects.aget(email='async@example.com')
+        self.assertTrue(user.check_password('N3w!Passw0rd-xyz'))
+
+    async def test_login_rejects_bad_password(self):
+        await sync_to_async(User.objects.create_user)(
+            email='async@example.com', password=self.password, role='owner'
+        )
+        response = await AsyncClient().post('/api/auth/async/login/', {
+            'email': 'async@example.com', 'password': 'wrong',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_change_password_requires_token(self):
+        response = await AsyncClient().post('/api/auth/async/change-password/', {
+            'old_password': 'x', 'new_password': 'y',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(RATE_LIMIT_STORE=MEMORY_RATE_STORE)
+class LoginThrottleTests(TestCase):
+    def test_login_scope_is_enforced(self):
+        client = APIClient()
+        payload = {'email': 'nobody@example.com', 'password': 'whatever'}
+        for _ in range(5):
+            self.assertEqual(client.post('/api/auth/login/', payload).status_code, status.HTTP_400_BAD_REQUEST)
+        response = client.post('/api/auth/login/', payload)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    def test_password_reset_is_throttled(self):
+        client = APIClient()
+        for _ in range(5):
+            client.post('/api/auth/password-reset/', {'email': 'nobody@example.com'})
+        response = client.post('/api/auth/password-reset/', {'email': 'nobody@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_sqlite_store_is_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'ratelimit.sqlite3')
+            # Two instances stand in for two worker processes.
+            first, second = SQLiteRateStore(path), SQLiteRateStore(path)
+            results = [store.consume('login_1.2.3.4', 3, 0.01)[0] for store in (first, second, first, second)]
+            self.assertEqual(results, [True, True, True, False])
+            allowed, wait = second.consume('login_1.2.3.4', 3, 0.01)
+            self.assertFalse(allowed)
+            self.assertGreater(wait, 0)
+            self.assertTrue(first.consume('login_5.6.7.8', 3, 0.01)[0])
+
+
+class BulkUserStatusTests(TestCase):
+    url = '/api/auth/account/status/bulk/'
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='Str0ng!Passw0rd', role='admin', is_staff=True
+        )
+        self.users = [
+            User.objects.create_user(email=f'staff{n}@example.com', password='Str0ng!Passw0rd', role='employee')
+            for n in range(3)
+        ]
+        self.users[2].is_active = False
+        self.users[2].save()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_reports_outcome_per_id(self):
+        received = []
+        users_status_changed.connect(lambda **kwargs: received.append(kwargs), weak=False, dispatch_uid='bulk-test')
+        self.addCleanup(users_status_changed.disconnect, dispatch_uid='bulk-test')
+
+        ids = [user.id for user in self.users] + [999999]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'action': 'activate', 'user_ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        outcomes = {result['id']: result['status'] for result in response.data['results']}
+        self.assertEqual(outcomes, {
+            self.users[0].id: 'unchanged', self.users[1].id: 'unchanged',
+            self.users[2].id: 'updated', 999999: 'not_found',
+        })
+        self.assertTrue(User.objects.get(id=self.users[2].id).is_active)
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0]['user_ids'], [self.users[2].id])
+
+    def test_status_change_is_one_update(self):
+        ids = [user.id for user in self.users]
+        # One read of the current status, then a single UPDATE.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, {'action': 'deactivate', 'user_ids': ids}, format='json')
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(User.objects.filter(id__in=ids, is_active=True).exists())
+
+    def test_filter_by_role(self):
+        user_claims_cache.set(self.users[0].id, {'id': self.users[0].id})
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url, {'action': 'deactivate', 'filter': {'role': 'employee'}}, format='json'
+            )
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['results'], [])
+        self.assertTrue(User.objects.get(id=self.admin.id).is_active)
+        # The filter goes into the UPDATE; no ids are read first.
+        statements = [query['sql'] for query in queries if 'authentication_customuser' in query['sql']]
+        self.assertEqual([sql.split()[0] for sql in statements if not sql.startswith(('SAVEPOINT', 'RELEASE'))], ['UPDATE'])
+        self.assertIsNone(user_claims_cache.get(self.users[0].id))
+
+    def test_requires_ids_or_filter(self):
+        response = self.client.post(self.url, {'action': 'activate'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UserListTests(TestCase):
+    url = '/api/auth/users/'
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='Str0ng!Passw0rd', role='admin', is_staff=True
+        )
+        for n in range(5):
+            User.objects.create_user(
+                email=f'emp{n}@example.com', password='Str0ng!Passw0rd', role='employee', is_active=n % 2 == 0
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_cursor_pages_cover_every_user_once(self):
+        seen = []
+        url = f'{self.url}?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(user['id'] for user in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(User.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_sparse_fields_narrow_select_and_payload(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'{self.url}?fields=id,email')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'email'})
+        select = next(query['sql'] for query in queries if 'FROM "authentication_customuser"' in query['sql'])
+        self.assertNotIn('"password"', select)
+        self.assertNotIn('"phone_number"', select)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(f'{self.url}?fields=id,password')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_role_and_activity(self):
+        response = self.client.get(f'{self.url}?role=employee&is_active=true')
+        self.assertEqual(len(response.data['results']), 3)
@@ -0,0 +1,152 @@
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class MemoryRateStore:
+    """
+    Token buckets in process memory. Only correct with a single worker
+    process; meant for tests and local development.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate):
+        """
+        Take one token from the bucket at `key`. Returns (allowed, wait) where
+        wait is the number of seconds until a token is available again.
+        """
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return False, (1 - tokens) / refill_rate
+            self._buckets[key] = (tokens - 1, now)
+            return True, 0.0
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteRateStore:
+    """
+    Token buckets in a local SQLite file, shared by every worker process on
+    the host. Each check is a single UPSERT that refills and takes a token
+    in one statement, so concurrent workers cannot both spend the last
+    token, and the cost per request is one primary-key lookup.
+    """
+
+    CONSUME_SQL = '''
+        INSERT INTO buckets (key, tokens, updated) VALUES (?1, ?2 - 1, ?3)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = MIN(?2, tokens + (excluded.updated - updated) * ?4) - 1,
+            updated = excluded.updated
+        WHERE MIN(?2, tokens + (excluded.updated - updated) * ?4) >= 1
+        RETURNING tokens
+    '''
+    # Fraction of calls that also drop buckets idle long enough to be full.
+    PRUNE_PROBABILITY = 0.001
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            self._local.connection = conn
+        return conn
+
+    def consume(self, key, capacity, refill_rate):
+        now = time.time()
+        conn = self.connection
+        if conn.execute(self.CONSUME_SQL, (key, capacity, now, refill_rate)).fetchone():
+            if random.random() < self.PRUNE_PROBABILITY:
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - capacity / refill_rate,))
+            return True, 0.0
+        # Denied: work out how long until the next token. Rare path, so a
+        # second read is fine.
+        row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+        tokens = min(capacity, row[0] + (now - row[1]) * refill_rate) if row else 0
+        return False, max(0.0, (1 - tokens) / refill_rate)
+
+    def clear(self):
+        self.connection.execute('DELETE FROM buckets')
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_rate_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = getattr(settings, 'RATE_LIMIT_STORE', {})
+                backend = import_string(config.get('BACKEND', 'authentication.throttling.MemoryRateStore'))
+                _store = backend(**config.get('OPTIONS', {}))
+    return _store
+
+
+@receiver(setting_changed)
+def reset_rate_store(setting, **kwargs):
+    global _store
+    if setting == 'RATE_LIMIT_STORE':
+        _store = None
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Scoped throttle backed by the shared rate store instead of the
+    per-process cache. A rate of "N/period" is a bucket of N tokens that
+    refills at N per period, keyed on the client address.
+    """
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        allowed, self._wait = get_rate_store().consume(
+            key, self.num_requests, self.num_requests / self.duration
+        )
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    scope = 'login'
+
+
+class PasswordResetRateThrottle(TokenBucketThrottle):
+    scope = 'password_reset'
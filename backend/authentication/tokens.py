@@ -0,0 +1,198 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+DEFAULTS = {
+    'USER_CLAIMS_TTL': 60,
+    'USER_CLAIMS_MAXSIZE': 10000,
+    'BLACKLIST_CAPACITY': 1000000,
+    'BLACKLIST_ERROR_RATE': 0.001,
+    'BLACKLIST_SYNC_INTERVAL': 1,
+}
+
+
+def refresh_setting(name):
+    return getattr(settings, 'TOKEN_REFRESH_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU whose entries also expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. `in` never gives a false negative;
+    false positives happen at roughly `error_rate` once `capacity` items
+    have been added.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Double hashing: two 64-bit halves of one digest give k positions.
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class BlacklistIndex:
+    """
+    In-memory membership test for blacklisted refresh token ids, backed by
+    the token_blacklist tables. A miss means the token is definitely not
+    blacklisted as of the last sync; a hit still has to be confirmed in the
+    database. New blacklist rows are pulled in incrementally at most once
+    per BLACKLIST_SYNC_INTERVAL seconds, which bounds how long a token
+    revoked by another process can still be refreshed here.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._filter = BloomFilter(
+                refresh_setting('BLACKLIST_CAPACITY'), refresh_setting('BLACKLIST_ERROR_RATE')
+            )
+            self._last_id = 0
+            self._synced_at = None
+
+    def add(self, jti):
+        with self._lock:
+            self._add(jti)
+
+    def might_contain(self, jti):
+        interval = refresh_setting('BLACKLIST_SYNC_INTERVAL')
+        if self._synced_at is None or time.monotonic() - self._synced_at >= interval:
+            self.sync()
+        return jti in self._filter
+
+    def sync(self):
+        with self._lock:
+            rebuilt = True
+            while rebuilt:
+                rebuilt = False
+                rows = BlacklistedToken.objects.filter(id__gt=self._last_id).values_list('id', 'token__jti')
+                for row_id, jti in rows.order_by('id').iterator():
+                    if self._add(jti):
+                        # The new filter holds only this jti: scan again
+                        # from the first row.
+                        rebuilt = True
+                        break
+                    self._last_id = row_id
+            self._synced_at = time.monotonic()
+
+    def _add(self, jti):
+        """
+        Add `jti`; returns True if the filter was full and has been
+        replaced, in which case everything else has to be reloaded.
+        """
+        rebuilt = self._filter.count >= self._filter.capacity
+        if rebuilt:
+            # Full: start over at twice the size; the next sync reloads
+            # every row.
+            self._filter = BloomFilter(self._filter.capacity * 2, refresh_setting('BLACKLIST_ERROR_RATE'))
+            self._last_id = 0
+            self._synced_at = None
+        self._filter.add(jti)
+        return rebuilt
+
+
+user_claims_cache = TTLCache(
+    refresh_setting('USER_CLAIMS_MAXSIZE'), refresh_setting('USER_CLAIMS_TTL')
+)
+blacklist_index = BlacklistIndex()
+
+
+def get_user_claims(user_id):
+    """
+    The user details echoed back by token refresh, cached for
+    USER_CLAIMS_TTL seconds and dropped whenever the user is saved.
+    """
+    claims = user_claims_cache.get(user_id)
+    if claims is None:
+        claims = (
+            get_user_model().objects.filter(id=user_id)
+            .values('id', 'email', 'full_name', 'user_name', 'role', 'is_superuser')
+            .first()
+        )
+        if claims is not None:
+            user_claims_cache.set(user_id, claims)
+    return claims
+
+
+def invalidate_user_claims(user_id):
+    user_claims_cache.delete(user_id)
+
+
+class CachedRefreshToken(RefreshToken):
+    """
+    Refresh token whose blacklist check consults the in-memory index and
+    only queries the database when the index reports a possible match.
+    """
+
+    def check_blacklist(self):
+        if blacklist_index.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        blacklist_index.add(self.payload[api_settings.JTI_CLAIM])
+        return blacklisted
@@ -4,28 +4,37 @@ from .views import (
     LoginView, 
     RegisterView, 
     UserProfileView, 
+    UserListView,
     LogoutView,
     PasswordResetRequestView,
     PasswordResetConfirmView,
     ChangePasswordView,
     UserAccountStatusView,
+    UserBulkStatusView,
     UserProfileUpdateView,
     CustomTokenRefreshView,
     test_email,
     test_smtp_connection
 )
+from .async_views import AsyncChangePasswordView, AsyncLoginView, AsyncRegisterView
 
 urlpatterns = [
     path('login/', LoginView.as_view(), name='login'),
     path('login/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('register/', RegisterView.as_view(), name='register'),
+    # Async variants for ASGI deployments
+    path('async/login/', AsyncLoginView.as_view(), name='async_login'),
+    path('async/register/', AsyncRegisterView.as_view(), name='async_register'),
+    path('async/change-password/', AsyncChangePasswordView.as_view(), name='async_change_password'),
     path('profile/', UserProfileView.as_view(), name='profile'),
+    path('users/', UserListView.as_view(), name='user_list'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('password-reset/', PasswordResetRequestView.as_view(), name='password_reset_request'),
     path('password-reset/confirm/', PasswordResetConfirmView.as_view(), name='password_reset_confirm'),
     path('change-password/', ChangePasswordView.as_view(), name='change_password'),
     path('profile/update/', UserProfileUpdateView.as_view(), name='profile_update'),
     path('account/status/', UserAccountStatusView.as_view(), name='account_status'),
+    path('account/status/bulk/', UserBulkStatusView.as_view(), name='account_status_bulk'),
     path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('test-email/', test_email, name='test-email'),  
     path('test-smtp/', test_smtp_connection, name='test-smtp'),
@@ -1,15 +1,95 @@
+from collections import Counter
+
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .models import UsernameSequence, normalize_identifier
 
 User = get_user_model()
 
+# Bases per statement; keeps the CASE/IN lists well under SQLite's
+# bound-parameter limit.
+ALLOCATION_CHUNK_SIZE = 200
+
+
 def generate_username(email):
     """
     Generate a unique username from email
     """
-    base_username = email.split('@')[0]
-    unique_username = base_username
-    counter = 1
-    while User.objects.filter(user_name=unique_username).exists():
-        unique_username = f"{base_username}{counter}"
-        counter += 1
-    return unique_username
\ No newline at end of file
+    return allocate_usernames([email])[0]
+
+
+def allocate_usernames(emails):
+    """
+    Allocate one unique username per email, in order. Emails sharing a local
+    part get consecutive suffixes ("info", "info1", "info2", ...).
+
+    Each chunk of distinct bases costs a fixed number of queries no matter
+    how many suffixes are already taken: one range scan over the indexed
+    username keys to find names created outside the allocator, then one
+    UPDATE reserving a block of suffixes per base on UsernameSequence.
+    """
+    local_parts = [email.split('@')[0] for email in emails]
+    bases = [normalize_identifier(local_part) for local_part in local_parts]
+    wanted = Counter(bases)
+
+    starts = {}
+    distinct = list(wanted)
+    for i in range(0, len(distinct), ALLOCATION_CHUNK_SIZE):
+        chunk = {base: wanted[base] for base in distinct[i:i + ALLOCATION_CHUNK_SIZE]}
+        starts.update(_reserve_suffixes(chunk))
+
+    usernames = []
+    for local_part, base in zip(local_parts, bases):
+        suffix = starts[base]
+        starts[base] += 1
+        usernames.append(local_part if suffix == 0 else f"{local_part}{suffix}")
+    return usernames
+
+
+def _reserve_suffixes(wanted):
+    """
+    Reserve wanted[base] consecutive suffixes for each base and return the
+    first suffix of each block.
+    """
+    with transaction.atomic():
+        # Write first so SQLite takes its write lock up front instead of
+        # upgrading from a read lock later.
+        UsernameSequence.objects.bulk_create(
+            [UsernameSequence(base=base) for base in wanted],
+            ignore_conflicts=True,
+        )
+        floors = _taken_suffix_floors(wanted)
+        UsernameSequence.objects.filter(base__in=wanted).update(
+            next_suffix=Case(*[
+                When(base=base, then=Greatest(F('next_suffix'), Value(floors.get(base, 0))) + Value(count))
+                for base, count in wanted.items()
+            ])
+        )
+        ends = dict(
+            UsernameSequence.objects.filter(base__in=wanted).values_list('base', 'next_suffix')
+        )
+    return {base: ends[base] - count for base, count in wanted.items()}
+
+
+def _taken_suffix_floors(bases):
+    """
+    Lowest suffix above every existing "<base><digits>" username, per base.
+    Usernames sort between "<base>" and "<base>:" when followed by digits,
+    so this is a range scan on the username index rather than a LIKE.
+    """
+    ranges = Q()
+    for base in bases:
+        ranges |= Q(user_name_key__gte=base, user_name_key__lt=f"{base}:")
+    floors = {}
+    for key in User.objects.filter(ranges).values_list('user_name_key', flat=True):
+        for split in range(len(key), -1, -1):
+            base, digits = key[:split], key[split:]
+            if digits and not digits.isdigit():
+                break
+            if base in bases:
+                suffix = int(digits) if digits else 0
+                floors[base] = max(floors.get(base, 0), suffix + 1)
+    return floors
@@ -1,3 +1,5 @@
+import logging
+
 from django.shortcuts import render
 from business_settings.models import BusinessProfile
 from rest_framework import generics, permissions, status, serializers
@@ -15,6 +17,8 @@ from rest_framework import status
 #import changePasswordView
 from .serializers import ChangePasswordSerializer
 from .serializers import (
+    BulkUserStatusSerializer,
+    CachedTokenRefreshSerializer,
     CustomTokenObtainPairSerializer,
     UserSerializer,
     UserUpdateSerializer,
@@ -29,6 +33,14 @@ from django.core.exceptions import ValidationError
 from django.http import JsonResponse
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .signals import users_status_changed
+from .pagination import UserCursorPagination
+from .throttling import LoginRateThrottle, PasswordResetRateThrottle
+from django_filters.rest_framework import DjangoFilterBackend
+
+logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
@@ -84,13 +96,48 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
             )
 
 class UserListView(generics.ListAPIView):
+    """
+    Paginated user list. `?fields=id,email` limits both the columns read
+    and the keys returned; `?role=` and `?is_active=` filter on indexed
+    columns.
+    """
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (permissions.IsAdminUser,)
+    pagination_class = UserCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['role', 'is_active']
+
+    def get_requested_fields(self):
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        fields = [name.strip() for name in fields.split(',') if name.strip()]
+        unknown = set(fields) - set(UserSerializer.Meta.fields)
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}"})
+        return fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields:
+            # The cursor is built from created_at, so always load it.
+            queryset = queryset.only(*fields, 'created_at')
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
 
     def get(self, request, *args, **kwargs):
         try:
             return super().get(request, *args, **kwargs)
+        except serializers.ValidationError as e:
+            return Response(
+                format_error_response('Invalid query parameters', e.detail),
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 format_error_response('Failed to fetch user list', str(e)),
@@ -120,16 +167,67 @@ class UserProfileView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+def login_response_data(user):
+    """
+    Issue tokens for an authenticated user and build the login payload.
+    Expects business_profile to be select_related (find_by_identifier does).
+    """
+    # Get business profile information
+    try:
+        business_profile = user.business_profile
+        business_type = business_profile.business_type if business_profile else None
+        role = 'super_admin' if user.is_superuser else user.role
+    except BusinessProfile.DoesNotExist:
+        business_type = None
+        role = 'super_admin' if user.is_superuser else 'user'
+
+    # Generate tokens
+    refresh = RefreshToken.for_user(user)
+
+    return {
+        'success': True,
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+        'user': UserSerializer(user).data,
+        'business_type': business_type,
+        'role': role
+    }
+
+
+def register_response_data(user):
+    # Generate tokens
+    refresh = RefreshToken.for_user(user)
+    response_data = {
+        'success': True,
+        'message': 'Registration successful',
+        'tokens': {
+            'access': str(refresh.access_token),
+            'refresh': str(refresh)
+        },
+        'user': UserSerializer(user).data
+    }
+
+    # Add business profile if exists
+    try:
+        business_profile = user.business_profile
+        response_data['business_profile'] = BusinessProfileSerializer(business_profile).data
+    except BusinessProfile.DoesNotExist:
+        pass
+
+    return response_data
+
+
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [LoginRateThrottle]
 
     def post(self, request):
         try:
-            print("Login attempt with data:", request.data)
+            logger.debug('Login attempt', extra={'identifier': request.data.get('email')})
             serializer = LoginSerializer(data=request.data)
             
             if not serializer.is_valid():
-                print("Validation errors:", serializer.errors)
+                logger.info('Login rejected', extra={'errors': serializer.errors})
                 return Response({
                     'success': False,
                     'detail': serializer.errors.get('detail', 'Invalid input'),
@@ -137,30 +235,10 @@ class LoginView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             user = serializer.validated_data['user']
-            
-            # Get business profile information
-            try:
-                business_profile = user.business_profile
-                business_type = business_profile.business_type if business_profile else None
-                role = 'super_admin' if user.is_superuser else user.role
-            except BusinessProfile.DoesNotExist:
-                business_type = None
-                role = 'super_admin' if user.is_superuser else 'user'
-            
-            # Generate tokens
-            refresh = RefreshToken.for_user(user)
-            
-            return Response({
-                'success': True,
-                'access': str(refresh.access_token),
-                'refresh': str(refresh),
-                'user': UserSerializer(user).data,
-                'business_type': business_type,
-                'role': role
-            }, status=status.HTTP_200_OK)
+            return Response(login_response_data(user), status=status.HTTP_200_OK)
             
         except Exception as e:
-            print("Login error:", str(e))
+            logger.exception('Login error')
             return Response({
                 'success': False,
                 'detail': 'Login failed',
@@ -175,27 +253,7 @@ class RegisterView(APIView):
             serializer = RegisterSerializer(data=request.data)
             if serializer.is_valid():
                 user = serializer.save()
-                
-                # Generate tokens
-                refresh = RefreshToken.for_user(user)
-                response_data = {
-                    'success': True,
-                    'message': 'Registration successful',
-                    'tokens': {
-                        'access': str(refresh.access_token),
-                        'refresh': str(refresh)
-                    },
-                    'user': UserSerializer(user).data
-                }
-                
-                # Add business profile if exists
-                try:
-                    business_profile = user.business_profile
-                    response_data['business_profile'] = BusinessProfileSerializer(business_profile).data
-                except BusinessProfile.DoesNotExist:
-                    pass
-                
-                return Response(response_data, status=status.HTTP_201_CREATED)
+                return Response(register_response_data(user), status=status.HTTP_201_CREATED)
             
             return Response(
                 format_error_response('Registration failed', serializer.errors),
@@ -232,10 +290,11 @@ class LogoutView(APIView):
 
 class PasswordResetRequestView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [PasswordResetRateThrottle]
 
     def post(self, request):
         try:
-            print("Received password reset request:", request.data)  # Debug log
+            logger.debug('Password reset requested', extra={'email': request.data.get('email')})
             serializer = PasswordResetRequestSerializer(data=request.data)
             if serializer.is_valid():
                 try:
@@ -250,7 +309,7 @@ class PasswordResetRequestView(APIView):
                             status=status.HTTP_200_OK
                         )
                     except Exception as email_error:
-                        print(f"Email sending error: {str(email_error)}")
+                        logger.exception('Password reset email failed')
                         return Response(
                             format_error_response('Failed to send password reset email', str(email_error)),
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -260,13 +319,13 @@ class PasswordResetRequestView(APIView):
                         format_error_response('User with this email does not exist'),
                         status=status.HTTP_404_NOT_FOUND
                     )
-            print("Serializer errors:", serializer.errors)  # Debug log
+            logger.info('Password reset request rejected', extra={'errors': serializer.errors})
             return Response(
                 format_error_response('Password reset failed', serializer.errors),
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            print("Exception in password reset request:", str(e))  # Debug log
+            logger.exception('Password reset request failed')
             return Response(
                 format_error_response('Password reset failed', str(e)),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -274,14 +333,14 @@ class PasswordResetRequestView(APIView):
 
 class PasswordResetConfirmView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [PasswordResetRateThrottle]
 
     def post(self, request):
         try:
-            print("Received password reset confirm request:", request.data)  # Debug log
+            logger.debug('Password reset confirmation', extra={'email': request.data.get('email')})
             serializer = PasswordResetConfirmSerializer(data=request.data)
             
             if serializer.is_valid():
-                print("Serializer is valid")  # Debug log
                 serializer.save()
                 return Response(
                     {
@@ -291,7 +350,7 @@ class PasswordResetConfirmView(APIView):
                     status=status.HTTP_200_OK
                 )
             
-            print("Serializer errors:", serializer.errors)  # Debug log
+            logger.info('Password reset confirmation rejected', extra={'errors': serializer.errors})
             return Response(
                 {
                     'success': False,
@@ -301,7 +360,7 @@ class PasswordResetConfirmView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            print("Exception in password reset:", str(e))  # Debug log
+            logger.exception('Password reset confirmation failed')
             return Response(
                 {
                     'success': False,
@@ -360,7 +419,7 @@ class UserAccountStatusView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            user.save()
+            user.save(update_fields=['is_active', 'updated_at'])
             return Response({
                 'success': True,
                 'message': message
@@ -377,6 +436,72 @@ class UserAccountStatusView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class UserBulkStatusView(APIView):
+    """
+    Activate or deactivate many accounts at once, given either a list of
+    user_ids or a filter by store, location and/or role. The change is one
+    UPDATE of the rows whose status actually differs, followed by a single
+    users_status_changed signal instead of a post_save per user. Per-user
+    results are returned for user_ids only; a filter gets the count.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request):
+        try:
+            serializer = BulkUserStatusSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(
+                    format_error_response('Invalid request', serializer.errors),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            is_active = serializer.validated_data['action'] == 'activate'
+            users = serializer.get_queryset()
+            requested = serializer.validated_data.get('user_ids')
+            results = []
+            with transaction.atomic():
+                if requested is None:
+                    # A filter can match any number of users: the UPDATE
+                    # carries it instead of an id list, and no ids are read.
+                    updated = users.filter(is_active=not is_active).update(
+                        is_active=is_active, updated_at=timezone.now()
+                    )
+                    changed = None
+                else:
+                    # Locked until commit, so the outcomes reported are the
+                    # ones this update produced.
+                    current = dict(users.select_for_update().values_list('id', 'is_active'))
+                    changed = {user_id for user_id, active in current.items() if active != is_active}
+                    updated = users.filter(is_active=not is_active).update(
+                        is_active=is_active, updated_at=timezone.now()
+                    )
+                    for user_id in dict.fromkeys(requested):
+                        if user_id not in current:
+                            outcome = 'not_found'
+                        elif user_id in changed:
+                            outcome = 'updated'
+                        else:
+                            outcome = 'unchanged'
+                        results.append({'id': user_id, 'status': outcome})
+                    changed = sorted(changed)
+                if updated:
+                    transaction.on_commit(lambda: users_status_changed.send(
+                        sender=CustomUser, user_ids=changed, is_active=is_active
+                    ))
+
+            return Response({
+                'success': True,
+                'message': f"{updated} user accounts {'activated' if is_active else 'deactivated'}.",
+                'updated': updated,
+                'results': results
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                format_error_response('Failed to update user status', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
 class UserProfileUpdateView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -410,25 +535,11 @@ class UserProfileUpdateView(APIView):
             )
 
 class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CachedTokenRefreshSerializer
+
     def post(self, request, *args, **kwargs):
         try:
             response = super().post(request, *args, **kwargs)
-            
-            # Get the user from the refresh token
-            refresh_token = request.data.get('refresh')
-            if refresh_token:
-                token = RefreshToken(refresh_token)
-                user = User.objects.get(id=token['user_id'])
-                
-                # Add user data to response
-                response.data['user'] = {
-                    'id': user.id,
-                    'email': user.email,
-                    'first_name': user.first_name,
-                    'last_name': user.last_name,
-                    'is_superuser': user.is_superuser,
-                }
-            
             response.data['success'] = True
             return response
             
@@ -449,7 +560,7 @@ def test_smtp_connection(request):
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.settimeout(10)
         try:
-            print(f"Attempting to connect to smtp.gmail.com:{port}")
+            logger.debug('Attempting to connect to smtp.gmail.com:%s', port)
             result = sock.connect_ex(('smtp.gmail.com', port))
             if result == 0:
                 results[f'port_{port}'] = "Connection successful"
@@ -464,7 +575,7 @@ def test_smtp_connection(request):
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     sock.settimeout(5)
     try:
-        print("Attempting to connect to localhost:1025")
+        logger.debug('Attempting to connect to localhost:1025')
         result = sock.connect_ex(('localhost', 1025))
         if result == 0:
             results['local_smtp'] = "Local SMTP server is running"
@@ -479,13 +590,14 @@ def test_smtp_connection(request):
 
 def test_email(request):
     try:
-        print("Email settings:")
-        print(f"EMAIL_HOST: {settings.EMAIL_HOST}")
-        print(f"EMAIL_PORT: {settings.EMAIL_PORT}")
-        print(f"EMAIL_USE_SSL: {settings.EMAIL_USE_SSL}")
-        print(f"EMAIL_USE_TLS: {settings.EMAIL_USE_TLS}")
-        print(f"EMAIL_HOST_USER: {settings.EMAIL_HOST_USER}")
-        print(f"DEFAULT_FROM_EMAIL: {settings.DEFAULT_FROM_EMAIL}")
+        logger.info('Email settings', extra={
+            'email_host': settings.EMAIL_HOST,
+            'email_port': settings.EMAIL_PORT,
+            'email_use_ssl': settings.EMAIL_USE_SSL,
+            'email_use_tls': settings.EMAIL_USE_TLS,
+            'email_host_user': settings.EMAIL_HOST_USER,
+            'default_from_email': settings.DEFAULT_FROM_EMAIL,
+        })
         
         # Try to establish SMTP connection first
         from smtplib import SMTP_SSL, SMTPException
@@ -493,7 +605,7 @@ def test_email(request):
             with SMTP_SSL(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=30) as smtp:
                 smtp.set_debuglevel(1)
                 smtp.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
-                print("SMTP SSL connection and login successful")
+                logger.info('SMTP SSL connection and login successful')
                 
                 # If connection successful, try sending email
                 send_mail(
@@ -503,17 +615,17 @@ def test_email(request):
                     [settings.EMAIL_HOST_USER],
                     fail_silently=False,
                 )
-                print("Test email sent successfully")
+                logger.info('Test email sent successfully')
                 return JsonResponse({'message': 'Test email sent successfully'})
                 
         except SMTPException as smtp_e:
-            print(f"SMTP Error: {str(smtp_e)}")
+            logger.exception('SMTP error')
             return JsonResponse({
                 'error': f"SMTP Error: {str(smtp_e)}",
                 'type': 'smtp_error'
             }, status=500)
         except Exception as conn_e:
-            print(f"Connection Error: {str(conn_e)}")
+            logger.exception('SMTP connection error')
             return JsonResponse({
                 'error': f"Connection Error: {str(conn_e)}",
                 'type': 'connection_error'
@@ -522,8 +634,7 @@ def test_email(request):
     except Exception as e:
         import traceback
         error_traceback = traceback.format_exc()
-        print(f"Error sending test email: {str(e)}")
-        print(f"Traceback: {error_traceback}")
+        logger.exception('Error sending test email')
         return JsonResponse({
             'error': str(e),
             'traceback': error_traceback,
@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
+import gc
 import os
 
 from django.core.asgi import get_asgi_application
@@ -14,3 +15,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Everything loaded by now lives as long as the process. Moving it out of
+# the collector's generations keeps full collections from walking every
+# module, model and URL pattern in the middle of a request, which showed up
+# as tail latency on checkout (see pos.management.commands.bench_checkout).
+gc.freeze()
@@ -0,0 +1,72 @@
+"""
+Helpers shared by the ``bench_*`` management commands.
+
+Benchmarks run against a scratch copy of the schema built the same way the
+test runner builds its database, so they never touch real data.
+"""
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def scratch_database():
+    """
+    Create a throwaway database with every migration applied, point the
+    default connection at it for the duration of the block, then drop it.
+    SQLite gets a file rather than the test runner's in-memory database so
+    benchmarks can use several threads.
+    """
+    settings_dict = connection.settings_dict
+    old_name = settings_dict['NAME']
+    old_test_name = settings_dict['TEST'].get('NAME')
+    tmpdir = None
+    if connection.vendor == 'sqlite':
+        tmpdir = tempfile.mkdtemp(prefix='bench-')
+        settings_dict['TEST']['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+    # Same environment as the test runner: test client host allowed,
+    # outgoing mail kept in memory.
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        settings_dict['TEST']['NAME'] = old_test_name
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(func, repeat):
+    """
+    Call ``func`` ``repeat`` times and return per-call latencies in ms.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    return {
+        'mean': statistics.fmean(samples) if samples else 0.0,
+        'p50': percentile(samples, 50),
+        'p99': percentile(samples, 99),
+    }
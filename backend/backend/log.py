@@ -0,0 +1,161 @@
+"""
+Logging pieces that keep formatting and I/O off the request path.
+
+QueueStreamHandler is what LOGGING attaches to loggers: emitting a record
+only puts it on a bounded queue, and a background QueueListener thread
+formats it (JSONFormatter) and writes it to the stream. When the queue is
+full the record is dropped and counted rather than blocking the request.
+SamplingFilter thins out low-severity records per logger before they are
+queued.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+REDACTED = '[REDACTED]'
+DEFAULT_REDACT = (
+    'password', 'password1', 'password2', 'old_password', 'new_password',
+    'token', 'access', 'refresh', 'authorization', 'secret',
+)
+
+# Attributes every LogRecord has; anything else came in through `extra`.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class _Listener(QueueListener):
+    def handle(self, record):
+        # Flush markers from QueueStreamHandler.flush() are not log records.
+        event = getattr(record, 'flush_event', None)
+        if event is not None:
+            event.set()
+            return
+        super().handle(record)
+
+
+class QueueStreamHandler(QueueHandler):
+    """
+    Enqueue records for a background thread that formats them and writes
+    them to `stream`. The formatter configured for this handler is used by
+    that thread.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = logging.StreamHandler(stream)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener = _Listener(self.queue, self.target)
+        self.listener.start()
+        self._running = True
+        atexit.register(self.close)
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # The base class formats here, on the calling thread; leave that to
+        # the listener. Records are handed over in-process, so exc_info and
+        # args can travel as they are.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def flush(self):
+        # Wait for the listener to drain what has been queued so far.
+        done = threading.Event()
+        marker = logging.makeLogRecord({'msg': '', 'levelno': logging.NOTSET})
+        marker.flush_event = done
+        try:
+            self.queue.put(marker, timeout=5)
+        except queue.Full:
+            return
+        done.wait(5)
+        self.target.flush()
+
+    def close(self):
+        # Called both at exit and by logging.shutdown(); stop only once.
+        if self._running:
+            self._running = False
+            self.listener.stop()
+            self.target.flush()
+        super().close()
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line with the timestamp, level, logger, message,
+    any `extra` fields and the traceback, if there is one. Values under a
+    key listed in `redact` are masked, at any depth.
+    """
+
+    def __init__(self, redact=DEFAULT_REDACT, **kwargs):
+        super().__init__(**kwargs)
+        self.redact = frozenset(key.lower() for key in redact)
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(self.scrub(entry), default=str)
+
+    def scrub(self, value):
+        if isinstance(value, dict):
+            return {
+                key: REDACTED if str(key).lower() in self.redact else self.scrub(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, (list, tuple)):
+            return [self.scrub(item) for item in value]
+        return value
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the records below `level` from the loggers in
+    `rates`, e.g. {'authentication.views': 0.1}. The most specific logger
+    prefix wins; loggers not listed are not sampled.
+    """
+
+    def __init__(self, rates=None, level='WARNING'):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self.level = logging.getLevelName(level) if isinstance(level, str) else level
+        self._cache = {}
+
+    def rate_for(self, name):
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition('.')[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= self.level:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
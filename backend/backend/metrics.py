@@ -0,0 +1,269 @@
+"""
+Per-request performance instrumentation.
+
+MetricsMiddleware times every request and, while it runs, counts the SQL
+queries issued and the time spent in them and in DRF serializers. The
+numbers go back to the client in a Server-Timing header and into
+per-route histograms that metrics_view renders in the Prometheus text
+format.
+
+Costs per request are a few perf_counter() calls per query and serializer
+and one histogram update per metric, so the middleware is meant to stay on
+in production.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import BasePermission
+from rest_framework.serializers import BaseSerializer
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'serializer_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the shape Prometheus expects.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class MetricsRegistry:
+    METRICS = {
+        'http_request_duration_seconds': ('Time spent handling the request.', DURATION_BUCKETS),
+        'http_request_db_seconds': ('Time spent executing SQL queries.', DURATION_BUCKETS),
+        'http_request_db_queries': ('Number of SQL queries issued.', QUERY_COUNT_BUCKETS),
+        'http_request_serializer_seconds': ('Time spent in DRF serializers.', DURATION_BUCKETS),
+    }
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, labels):
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.METRICS[name][1]))
+        return histogram
+
+    def observe(self, labels, total, timings):
+        self.histogram('http_request_duration_seconds', labels).observe(total)
+        self.histogram('http_request_db_seconds', labels).observe(timings.db_time)
+        self.histogram('http_request_db_queries', labels).observe(timings.queries)
+        self.histogram('http_request_serializer_seconds', labels).observe(timings.serializer_time)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        """
+        All histograms in the Prometheus text exposition format.
+        """
+        with self._lock:
+            items = sorted(self._histograms.items())
+        lines = []
+        for name, (description, buckets) in self.METRICS.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} histogram')
+            for (metric, labels), histogram in items:
+                if metric != name:
+                    continue
+                label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+                counts, total, count = histogram.snapshot()
+                cumulative = 0
+                for bound, bucket_count in zip(buckets + ('+Inf',), counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label_text}}} {total}')
+                lines.append(f'{name}_count{{{label_text}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+def time_queries(execute, sql, params, many, context):
+    """
+    Database execute wrapper that adds each query's count and duration to
+    the current request, if any.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_time += time.perf_counter() - start
+        timings.queries += 1
+
+
+def _timed(method):
+    # A serializer used inside another (e.g. .data read from a method field)
+    # is already covered by the outer call's timer, so only the outermost
+    # call is counted.
+    def wrapper(self, *args, **kwargs):
+        timings = _current.get()
+        if timings is None or timings.serializer_depth:
+            return method(self, *args, **kwargs)
+        timings.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            timings.serializer_time += time.perf_counter() - start
+            timings.serializer_depth -= 1
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+def _add_query_timer(connection, **kwargs):
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+def _add_query_timers(**kwargs):
+    # Connections belong to a thread, and one opened before install() in a
+    # thread other than the one that ran it would never be timed.
+    # request_started runs sync receivers in the thread that will serve
+    # the request (under ASGI, the one sync views run in), so each request
+    # checks the connections it is about to use.
+    for connection in connections.all(initialized_only=True):
+        _add_query_timer(connection)
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install():
+    """
+    Hook query timing into every database connection and serializer timing
+    into DRF. Safe to call more than once.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        connection_created.connect(_add_query_timer, dispatch_uid='backend.metrics.query_timer')
+        request_started.connect(_add_query_timers, dispatch_uid='backend.metrics.query_timers')
+        _add_query_timers()
+        BaseSerializer.is_valid = _timed(BaseSerializer.is_valid)
+        BaseSerializer.data = property(_timed(BaseSerializer.data.fget))
+        _installed = True
+
+
+class MetricsMiddleware:
+    """
+    Measure each request and add a Server-Timing header, e.g.
+
+        Server-Timing: db;dur=3.1;desc="4 queries", serializer;dur=0.8, total;dur=9.6
+
+    `total` covers everything below this middleware, so it should come
+    first in MIDDLEWARE.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, time.perf_counter() - start, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, time.perf_counter() - start, timings)
+
+    def record(self, request, response, total, timings):
+        match = getattr(request, 'resolver_match', None)
+        # Label by URL pattern, not path, to keep the number of series bounded.
+        route = match.route if match else 'unmatched'
+        registry.observe((('method', request.method), ('route', route)), total, timings)
+        response['Server-Timing'] = (
+            f'db;dur={timings.db_time * 1000:.1f};desc="{timings.queries} queries", '
+            f'serializer;dur={timings.serializer_time * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+        return response
+
+
+class CanReadMetrics(BasePermission):
+    """
+    Staff users, and scrapers connecting from METRICS_ALLOWED_IPS.
+    """
+
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+
+
+@api_view(['GET'])
+@permission_classes([CanReadMetrics])
+@throttle_classes([])
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
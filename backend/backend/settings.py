@@ -43,11 +43,13 @@ INSTALLED_APPS = [
     'pos',
     'store',
     'subscription',
+    'warehouse',
 
     
 ]
 
 MIDDLEWARE = [
+    'backend.metrics.MetricsMiddleware',  # Times everything below it
     'corsheaders.middleware.CorsMiddleware',  # Add this first
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -125,9 +127,20 @@ REST_FRAMEWORK = {
         'anon': '100/day',  # Limit anonymous users to 100 requests per day
         'user': '1000/day',  # Limit authenticated users to 1000 requests per day
         'login': '5/minute',  # Limit login attempts
+        'password_reset': '5/hour',  # Limit password reset requests/confirmations
+        'pos': '300/minute',  # Per till user, in place of the daily user quota
     }
 }
 
+# Shared counters for the login/password-reset throttles
+# (authentication/throttling.py). The SQLite file is shared by every worker
+# process on the host; swap the backend for a networked store when running
+# on several hosts.
+RATE_LIMIT_STORE = {
+    'BACKEND': 'authentication.throttling.SQLiteRateStore',
+    'OPTIONS': {'path': BASE_DIR / 'ratelimit.sqlite3'},
+}
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
@@ -157,6 +170,52 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=7),
 }
 
+# Token refresh fast path (authentication/tokens.py)
+TOKEN_REFRESH_CACHE = {
+    'USER_CLAIMS_TTL': 60,  # seconds a user's refresh claims are cached per process
+    'USER_CLAIMS_MAXSIZE': 10000,
+    'BLACKLIST_CAPACITY': 1000000,  # Bloom filter size before it is rebuilt larger
+    'BLACKLIST_ERROR_RATE': 0.001,
+    'BLACKLIST_SYNC_INTERVAL': 1,  # seconds between pulls of new blacklist rows
+}
+
+# Per-process barcode -> item cache for POS scans (inventory/barcodes.py)
+BARCODE_CACHE = {
+    'MAXSIZE': 200000,  # barcodes kept per worker, including unknown ones
+    'TTL': 300,  # seconds before an entry is re-read; bounds staleness across workers
+}
+
+# POS catalog snapshots and deltas (inventory/sync.py)
+CATALOG_SYNC = {
+    'OVERLAP_SECONDS': 2,  # next_since is moved back this far to cover rows committed late
+    'TOMBSTONE_RETENTION_DAYS': 30,  # older `since` values get a full snapshot instead
+    'CACHE_TIMEOUT': 3600,  # seconds a serialized snapshot stays in the cache
+}
+
+# Per-location daily order numbers (order/numbers.py)
+ORDER_NUMBERS = {
+    'BLOCK_SIZE': 20,  # numbers each worker reserves per write; also the most a worker can leave unused
+}
+
+# Order history (order/history.py)
+ORDER_HISTORY = {
+    'BATCH_SIZE': 500,  # events a transaction buffers before writing them early
+}
+
+# Quantity resets for temporary items (inventory/expiry.py)
+ITEM_EXPIRY = {
+    'BATCH_SIZE': 500,  # items reset per transaction
+    'POLL_INTERVAL': 60,  # longest sleep between passes; bounds how late new schedules are noticed
+}
+
+# Addresses allowed to scrape /api/metrics without logging in, e.g. the
+# Prometheus server; staff users can always read it.
+METRICS_ALLOWED_IPS = [ip for ip in os.getenv('METRICS_ALLOWED_IPS', '').split(',') if ip]
+
+# Threads the async auth views hash passwords on (authentication/hashing.py);
+# defaults to the CPU count.
+PASSWORD_HASHING_WORKERS = None
+
 # Password Validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -233,26 +292,55 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'authentication.CustomUser'
 
 # Email configuration
+# Point EMAIL_HOST/EMAIL_PORT at localhost:1025 with EMAIL_USE_SSL=False to
+# deliver into the debugging sink in smtp_server.py.
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 465
-EMAIL_USE_SSL = True
-EMAIL_USE_TLS = False
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 465))
+EMAIL_USE_SSL = os.getenv('EMAIL_USE_SSL', 'True') == 'True'
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'False') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('EMAIL_HOST_USER')
 EMAIL_TIMEOUT = 30
 
+# Outgoing email queue drained by background workers over reused connections
+EMAIL_OUTBOX = {
+    'WORKERS': 2,
+    'BATCH_SIZE': 50,
+    'MAX_QUEUE_SIZE': 1000,
+    'MAX_RETRIES': 3,
+    'RETRY_BACKOFF': 2.0,  # seconds, doubled on each retry
+    'IDLE_TIMEOUT': 30,  # close the SMTP connection after this many idle seconds
+}
+
 # Frontend URL for password reset
 FRONTEND_URL = 'http://localhost:3000'  # Add closing quote
 
 # Logging Configuration
+# Handlers only enqueue; formatting and writing happen on a background
+# thread (backend/log.py). Set e.g. AUTH_LOG_SAMPLE_RATE=0.1 to keep a tenth
+# of the auth INFO/DEBUG records; warnings and errors are always kept.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'backend.log.JSONFormatter',
+        },
+    },
+    'filters': {
+        'sample': {
+            '()': 'backend.log.SamplingFilter',
+            'rates': {'authentication': float(os.getenv('AUTH_LOG_SAMPLE_RATE', '1.0'))},
+        },
+    },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            'class': 'backend.log.QueueStreamHandler',
+            'formatter': 'json',
+            'filters': ['sample'],
+            'maxsize': 10000,
         },
     },
     'root': {
@@ -268,7 +356,7 @@ LOGGING = {
         'authentication': {
             'handlers': ['console'],
             'level': 'DEBUG',
-            'propagate': True,
+            'propagate': False,
         },
     },
 }
\ No newline at end of file
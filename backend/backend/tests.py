@@ -0,0 +1,104 @@
+import io
+import json
+import logging
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .log import JSONFormatter, QueueStreamHandler, SamplingFilter
+from .metrics import Histogram, registry
+
+User = get_user_model()
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        registry.clear()
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='Str0ng!Passw0rd', role='admin', is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/auth/users/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(timing, r'serializer;dur=[\d.]+')
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+
+    def test_metrics_endpoint_exposes_route_histograms(self):
+        self.client.get('/api/auth/users/')
+        self.client.get('/api/auth/users/')
+        body = self.client.get('/api/metrics').content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="api/auth/users/"} 2', body)
+        self.assertIn('http_request_db_queries_bucket{method="GET",route="api/auth/users/",le="+Inf"} 2', body)
+
+    def test_metrics_endpoint_is_not_public(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/metrics').status_code, status.HTTP_401_UNAUTHORIZED)
+        owner = User.objects.create_user(email='owner@example.com', password='Str0ng!Passw0rd', role='owner')
+        self.client.force_authenticate(owner)
+        self.assertEqual(self.client.get('/api/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(None)
+        with self.settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            self.assertEqual(self.client.get('/api/metrics').status_code, status.HTTP_200_OK)
+
+    def test_unmatched_paths_share_one_series(self):
+        self.client.get('/no/such/path/')
+        self.client.get('/another/missing/path/')
+        body = registry.render()
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="unmatched"} 2', body)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((1, 5))
+        for value in (0.5, 3, 3, 10):
+            histogram.observe(value)
+        counts, total, count = histogram.snapshot()
+        self.assertEqual(counts, [1, 2, 1])
+        self.assertEqual((total, count), (16.5, 4))
+
+
+class QueueLoggingTests(SimpleTestCase):
+    def make_logger(self, handler):
+        logger = logging.getLogger(f'backend.tests.{self._testMethodName}')
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        self.addCleanup(handler.close)
+        return logger
+
+    def test_records_are_written_as_redacted_json(self):
+        stream = io.StringIO()
+        handler = QueueStreamHandler(stream)
+        handler.setFormatter(JSONFormatter())
+        logger = self.make_logger(handler)
+
+        logger.info('Login attempt', extra={'payload': {'email': 'a@example.com', 'password': 'hunter2'}})
+        handler.flush()
+
+        entry = json.loads(stream.getvalue())
+        self.assertEqual(entry['message'], 'Login attempt')
+        self.assertEqual(entry['payload'], {'email': 'a@example.com', 'password': '[REDACTED]'})
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = QueueStreamHandler(io.StringIO(), maxsize=1)
+        handler.close()  # stops the listener, so nothing drains the queue
+        logger = self.make_logger(handler)
+        for n in range(3):
+            logger.info('message %s', n)
+        self.assertEqual(handler.dropped, 2)
+
+    def test_sampling_keeps_warnings(self):
+        sampler = SamplingFilter({'authentication': 0.0})
+        info = logging.makeLogRecord({'name': 'authentication.views', 'levelno': logging.INFO})
+        warning = logging.makeLogRecord({'name': 'authentication.views', 'levelno': logging.WARNING})
+        other = logging.makeLogRecord({'name': 'inventory.views', 'levelno': logging.INFO})
+        self.assertFalse(sampler.filter(info))
+        self.assertTrue(sampler.filter(warning))
+        self.assertTrue(sampler.filter(other))
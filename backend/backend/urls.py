@@ -5,6 +5,7 @@ from django.conf.urls.static import static
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from .metrics import metrics_view
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -21,6 +22,11 @@ urlpatterns = [
     path('api/docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('api/redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     path('api/auth/', include('authentication.urls')),
+    path('api/inventory/', include('inventory.urls')),
+    path('api/orders/', include('order.urls')),
+    path('api/pos/', include('pos.urls')),
+    path('api/warehouse/', include('warehouse.urls')),
+    path('api/metrics', metrics_view, name='metrics'),
 
 ]
 
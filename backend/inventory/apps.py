@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
 
 
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        pre_migrate.connect(drop_search_triggers, sender=self)
+        post_migrate.connect(install_search_index, sender=self)
+
+
+def drop_search_triggers(sender, using, **kwargs):
+    from .search import drop_triggers
+    drop_triggers(using)
+
+
+def install_search_index(sender, using, **kwargs):
+    from .search import install
+    install(using)
@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+
+from .models import Item
+
+DEFAULTS = {
+    'MAXSIZE': 200000,
+    'TTL': 300,
+}
+
+# What a scan needs, without a model instance per cached item.
+ItemRecord = namedtuple('ItemRecord', [
+    'id', 'name', 'price', 'quantity', 'is_active', 'is_hidden', 'category_id', 'location_id',
+])
+RECORD_FIELDS = (
+    'id', 'name', 'price', 'quantity', 'is_active', 'is_hidden', 'category_id', 'category__location_id',
+)
+
+# Cached for barcodes that match no item, so repeated scans of an unknown
+# code stay off the database too.
+NOT_FOUND = object()
+
+# Keeps `barcode__in` under SQLite's bound-parameter limit.
+LOOKUP_CHUNK_SIZE = 500
+
+
+def cache_setting(name):
+    return getattr(settings, 'BARCODE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class BarcodeCache:
+    """
+    Per-process LRU from barcode to ItemRecord (or NOT_FOUND). Item saves
+    and deletes in this process invalidate entries right away; entries
+    also expire after TTL seconds so changes made by other workers show up
+    within that window.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        # item id -> barcode of its cached entry, for invalidating an item
+        # whose barcode has just changed.
+        self._barcodes = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, barcodes):
+        """
+        Cached entries for `barcodes`; unknown or expired ones are left out.
+        """
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for barcode in barcodes:
+                entry = self._data.get(barcode)
+                if entry is None:
+                    continue
+                value, expires = entry
+                if expires < now:
+                    self._remove(barcode)
+                    continue
+                self._data.move_to_end(barcode)
+                found[barcode] = value
+        return found
+
+    def set_many(self, entries):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for barcode, value in entries.items():
+                self._remove(barcode)
+                self._data[barcode] = (value, expires)
+                if value is not NOT_FOUND:
+                    self._barcodes[value.id] = barcode
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+
+    def invalidate(self, item_id=None, barcode=None):
+        with self._lock:
+            if barcode is not None:
+                self._remove(barcode)
+            if item_id is not None and item_id in self._barcodes:
+                self._remove(self._barcodes[item_id])
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._barcodes.clear()
+
+    def _remove(self, barcode):
+        entry = self._data.pop(barcode, None)
+        if entry is not None and entry[0] is not NOT_FOUND:
+            self._barcodes.pop(entry[0].id, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+barcode_cache = BarcodeCache(cache_setting('MAXSIZE'), cache_setting('TTL'))
+
+
+def resolve_barcodes(barcodes):
+    """
+    Map each barcode to its ItemRecord, or None if no item has it. Cache
+    misses are loaded together in one query per LOOKUP_CHUNK_SIZE codes.
+    """
+    barcodes = list(dict.fromkeys(barcodes))
+    found = barcode_cache.get_many(barcodes)
+    missing = [barcode for barcode in barcodes if barcode not in found]
+    for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+        chunk = missing[start:start + LOOKUP_CHUNK_SIZE]
+        loaded = dict.fromkeys(chunk, NOT_FOUND)
+        for barcode, *values in Item.objects.filter(barcode__in=chunk).values_list('barcode', *RECORD_FIELDS):
+            loaded[barcode] = ItemRecord(*values)
+        barcode_cache.set_many(loaded)
+        found.update(loaded)
+    return {barcode: None if found[barcode] is NOT_FOUND else found[barcode] for barcode in barcodes}
+
+
+def resolve_barcode(barcode):
+    return resolve_barcodes([barcode])[barcode]
+
+
+def record_data(record):
+    return {
+        'id': record.id,
+        'name': record.name,
+        'price': str(record.price),
+        'quantity': record.quantity,
+        'is_active': record.is_active,
+        'is_hidden': record.is_hidden,
+        'category': record.category_id,
+        'location': record.location_id,
+    }
@@ -0,0 +1,330 @@
+"""
+Streaming catalog import and export for a location's Category and Item
+rows, in CSV or JSON Lines.
+
+Files are read and written one row at a time and rows are written to the
+database in batches, so memory stays flat however large the catalog is.
+Each import row describes one item; its category is looked up by name
+within the location and created if missing. Rows with a barcode update
+the item that already has it; rows without one always create an item.
+A bad row is reported with its line number and skipped, and the rest of
+its batch still goes in. A batch the database rejects is retried one row
+at a time, so only the rows that fail are reported.
+"""
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from . import ledger
+from .models import Category, Item
+from .signals import catalog_changed
+
+FORMATS = ('csv', 'jsonl')
+COLUMNS = ('barcode', 'name', 'category', 'price', 'quantity', 'is_active', 'is_hidden')
+DEFAULT_BATCH_SIZE = 1000
+UPDATE_FIELDS = [
+    'name', 'category', 'price', 'quantity', 'is_active', 'is_hidden', 'updated_at', 'catalog_updated_at',
+]
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f', ''}
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self, max_errors=1000):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'failed': len(self.errors),
+            'errors': [{'line': line, 'error': message} for line, message in self.errors[:max_errors]],
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (line number, row dict) from a text stream. Lines that cannot be
+    parsed at all come through as (line number, RowError).
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, RowError(f'Invalid JSON: {e}')
+                continue
+            if not isinstance(row, dict):
+                yield line_number, RowError('Expected a JSON object')
+                continue
+            yield line_number, row
+    else:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+
+
+def _bool(value, name):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise RowError(f'{name}: expected a boolean, got {value!r}')
+
+
+def clean_row(row):
+    """
+    Validate one import row into the values an Item needs.
+    """
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise RowError('name: required')
+    if len(name) > Item._meta.get_field('name').max_length:
+        raise RowError('name: too long')
+    category = str(row.get('category') or '').strip()
+    if not category:
+        raise RowError('category: required')
+    if len(category) > Category._meta.get_field('name').max_length:
+        raise RowError('category: too long')
+    barcode = str(row.get('barcode') or '').strip() or None
+    if barcode and len(barcode) > Item._meta.get_field('barcode').max_length:
+        raise RowError('barcode: too long')
+    try:
+        price = Decimal(str(row.get('price', '')).strip())
+    except InvalidOperation:
+        raise RowError(f"price: not a number: {row.get('price')!r}")
+    if not price.is_finite() or price < 0 or price.as_tuple().exponent < -2 or abs(price) >= 10 ** 8:
+        raise RowError(f'price: invalid amount {price}')
+    quantity = row.get('quantity')
+    try:
+        quantity = int(str(quantity).strip()) if quantity not in (None, '') else 0
+    except ValueError:
+        raise RowError(f'quantity: not an integer: {quantity!r}')
+    if quantity < 0:
+        raise RowError(f'quantity: must not be negative, got {quantity}')
+    return {
+        'barcode': barcode,
+        'name': name,
+        'category': category,
+        'price': price,
+        'quantity': quantity,
+        'is_active': _bool(row.get('is_active', True), 'is_active'),
+        'is_hidden': _bool(row.get('is_hidden', False), 'is_hidden'),
+    }
+
+
+class CatalogImporter:
+    def __init__(self, location, batch_size=DEFAULT_BATCH_SIZE):
+        self.location = location
+        self.batch_size = batch_size
+        self.report = ImportReport()
+        self.categories = dict(Category.objects.filter(location=location).values_list('name', 'id'))
+
+    def run(self, rows):
+        start = time.perf_counter()
+        batch = []
+        for line_number, row in rows:
+            self.report.rows += 1
+            if isinstance(row, RowError):
+                self.report.errors.append((line_number, str(row)))
+                continue
+            try:
+                batch.append((line_number, clean_row(row)))
+            except RowError as e:
+                self.report.errors.append((line_number, str(e)))
+                continue
+            if len(batch) >= self.batch_size:
+                self.write(batch)
+                batch = []
+        if batch:
+            self.write(batch)
+        self.report.seconds = time.perf_counter() - start
+        return self.report
+
+    def write(self, batch):
+        # Last row wins for a barcode repeated within one batch.
+        rows = {}
+        for line_number, values in batch:
+            key = values['barcode'] or ('line', line_number)
+            if key in rows:
+                self.report.errors.append((rows[key][0], f"barcode {values['barcode']}: superseded by line {line_number}"))
+            rows[key] = (line_number, values)
+
+        rows = list(rows.values())
+        try:
+            with transaction.atomic():
+                result = self.write_rows(rows)
+        except DatabaseError:
+            # Usually a concurrent writer taking one of these barcodes. The
+            # batch is rolled back as a whole, including any categories it
+            # created, and written again a row at a time, each in its own
+            # savepoint, to find the rows at fault.
+            self.reload_categories()
+            self.write_row_by_row(rows)
+        else:
+            self.count(result)
+
+    def write_row_by_row(self, rows):
+        with transaction.atomic():
+            for line_number, values in rows:
+                try:
+                    with transaction.atomic():
+                        result = self.write_rows([(line_number, values)])
+                except DatabaseError as e:
+                    self.report.errors.append((line_number, f'Row failed: {e}'))
+                    self.reload_categories()
+                else:
+                    self.count(result)
+
+    def reload_categories(self):
+        self.categories = dict(Category.objects.filter(location=self.location).values_list('name', 'id'))
+
+    def count(self, result):
+        created, updated, errors = result
+        self.report.created += created
+        self.report.updated += updated
+        self.report.errors.extend(errors)
+
+    def write_rows(self, rows):
+        """
+        Write rows in the current transaction; returns (created, updated,
+        row errors), for the caller to count once the rows are in.
+        """
+        missing = {values['category'] for _, values in rows} - set(self.categories)
+        if missing:
+            created = Category.objects.bulk_create([
+                Category(location=self.location, name=name, is_hidden=False) for name in sorted(missing)
+            ])
+            for category in created:
+                if category.pk is None:
+                    category.pk = Category.objects.get(location=self.location, name=category.name).pk
+            self.categories.update((category.name, category.pk) for category in created)
+
+        barcodes = [values['barcode'] for _, values in rows if values['barcode']]
+        existing = {
+            barcode: (item_id, location_id, quantity)
+            for barcode, item_id, location_id, quantity in Item.objects.filter(barcode__in=barcodes)
+            .values_list('barcode', 'id', 'category__location_id', 'quantity')
+        }
+
+        now = timezone.now()
+        to_create, to_update, errors = [], [], []
+        for line_number, values in rows:
+            barcode = values['barcode']
+            item = Item(
+                barcode=barcode,
+                name=values['name'],
+                category_id=self.categories[values['category']],
+                price=values['price'],
+                quantity=values['quantity'],
+                is_active=values['is_active'],
+                is_hidden=values['is_hidden'],
+                updated_at=now,
+                catalog_updated_at=now,
+            )
+            if barcode in existing:
+                item_id, location_id, quantity = existing[barcode]
+                if location_id != self.location.pk:
+                    errors.append((line_number, f'barcode {barcode}: used by an item at another location'))
+                    continue
+                item.existing_pk = item_id
+                item.previous_quantity = quantity
+                to_update.append(item)
+            else:
+                to_create.append(item)
+
+        # New rows are plain INSERTs: a barcode another location took since
+        # the lookup above then fails the batch rather than updating its item.
+        Item.objects.bulk_create(to_create)
+        if to_update and connection.features.supports_update_conflicts_with_target:
+            # One INSERT ... ON CONFLICT (barcode) DO UPDATE for the rows that
+            # already exist here. bulk_update builds a CASE per column over
+            # every row, which gets slower the larger the batch.
+            Item.objects.bulk_create(
+                to_update, update_conflicts=True, unique_fields=['barcode'], update_fields=UPDATE_FIELDS,
+            )
+        else:
+            for item in to_update:
+                item.pk = item.existing_pk
+            Item.objects.bulk_update(to_update, UPDATE_FIELDS)
+        for item in to_update:
+            item.pk = item.existing_pk
+
+        # The upsert sets quantity outright; the ledger gets the difference.
+        movements = {item.pk: item.quantity for item in to_create if item.pk is not None}
+        movements.update((item.pk, item.quantity - item.previous_quantity) for item in to_update)
+        ledger.record(movements, 'import')
+
+        changed = to_create + to_update
+        if changed:
+            catalog_changed.send(
+                sender=Item,
+                location_id=self.location.pk,
+                item_ids=[item.pk for item in changed if item.pk is not None],
+                barcodes=[item.barcode for item in changed if item.barcode],
+            )
+        return len(to_create), len(to_update), errors
+
+
+def import_catalog(location, stream, fmt, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Import items for `location` from a text stream; returns an ImportReport.
+    """
+    return CatalogImporter(location, batch_size).run(read_rows(stream, fmt))
+
+
+def export_catalog(location, fmt, chunk_size=2000):
+    """
+    Yield the location's items as CSV or JSONL text, one row at a time, in
+    the same columns import_catalog reads.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    rows = (
+        Item.objects.filter(category__location=location)
+        .order_by('id')
+        .values_list('barcode', 'name', 'category__name', 'price', 'quantity', 'is_active', 'is_hidden')
+        .iterator(chunk_size=chunk_size)
+    )
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            writer.writerow(['' if value is None else value for value in row])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(COLUMNS, row)), default=str) + '\n'
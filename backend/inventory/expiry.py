@@ -0,0 +1,135 @@
+"""
+Quantity resets for temporary items.
+
+An item with is_temporary, auto_reset_quantity and expiry_hours set has its
+quantity put back to zero every expiry_hours. Item.next_reset_at holds when
+each item is next due, and its partial index is the scheduler's queue:
+"due now" is a range scan from the oldest entry, and "when is the next one"
+is its first row. Neither depends on how many items the catalog has.
+
+Due items are reset in batches: one UPDATE per distinct expiry_hours in the
+batch, which also moves next_reset_at forward by that many hours. Each row
+is only reset if its quantity is still the one read for the batch, so a
+sale in between is not lost from stock_changed; such rows stay due and are
+picked up on the next pass.
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Item
+from .signals import stock_changed
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BATCH_SIZE': 500,
+    'POLL_INTERVAL': 60,
+}
+
+
+def expiry_setting(name):
+    return getattr(settings, 'ITEM_EXPIRY', {}).get(name, DEFAULTS[name])
+
+
+def due_items(now=None):
+    now = now or timezone.now()
+    return Item.objects.filter(next_reset_at__lte=now)
+
+
+def next_reset(now=None):
+    """
+    When the next item is due, or None if no item resets.
+    """
+    return (
+        Item.objects.filter(next_reset_at__isnull=False)
+        .order_by('next_reset_at').values_list('next_reset_at', flat=True).first()
+    )
+
+
+def reset_batch(now=None, batch_size=None):
+    """
+    Reset up to `batch_size` due items, oldest first. Returns how many were
+    reset.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or expiry_setting('BATCH_SIZE')
+    with transaction.atomic():
+        due = list(
+            due_items(now).order_by('next_reset_at')
+            .values_list('id', 'quantity', 'expiry_hours')[:batch_size]
+        )
+        if not due:
+            return 0
+        groups = defaultdict(dict)
+        for item_id, quantity, hours in due:
+            groups[hours][item_id] = quantity
+
+        changes, reset = {}, 0
+        for hours, quantities in groups.items():
+            unchanged = Q()
+            for item_id, quantity in quantities.items():
+                unchanged |= Q(id=item_id, quantity=quantity)
+            updated = Item.objects.filter(unchanged, next_reset_at__lte=now).update(
+                quantity=0,
+                last_quantity_reset=now,
+                next_reset_at=now + timedelta(hours=hours),
+                last_inventory_update=now,
+                updated_at=now,
+            )
+            if updated != len(quantities):
+                # Some rows moved under us; report only the ones reset.
+                reset_ids = set(
+                    Item.objects.filter(id__in=quantities, last_quantity_reset=now).values_list('id', flat=True)
+                )
+                quantities = {item_id: quantities[item_id] for item_id in reset_ids}
+            reset += len(quantities)
+            changes.update((item_id, -quantity) for item_id, quantity in quantities.items() if quantity)
+
+        if changes:
+            stock_changed.send(sender=Item, changes=changes, reason='reset')
+    return reset
+
+
+def reset_due_items(now=None, batch_size=None):
+    """
+    Reset every item that is due; returns how many were reset.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or expiry_setting('BATCH_SIZE')
+    total = 0
+    while True:
+        reset = reset_batch(now, batch_size)
+        total += reset
+        if reset < batch_size:
+            return total
+
+
+def run(stop=None, poll_interval=None, batch_size=None):
+    """
+    Reset items as they come due until `stop` (a threading.Event) is set.
+    Between passes it sleeps until the next item is due, but never longer
+    than `poll_interval`, so items added or changed by other processes are
+    picked up within that time.
+    """
+    stop = stop or threading.Event()
+    poll_interval = poll_interval or expiry_setting('POLL_INTERVAL')
+    while not stop.is_set():
+        try:
+            reset = reset_due_items(batch_size=batch_size)
+            if reset:
+                logger.info('Reset temporary item quantities', extra={'items': reset})
+            upcoming = next_reset()
+        except Exception:
+            logger.exception('Temporary item reset failed')
+            upcoming = None
+        wait = poll_interval
+        if upcoming is not None:
+            wait = min(wait, max(0.0, (upcoming - timezone.now()).total_seconds()))
+        stop.wait(wait)
@@ -0,0 +1,124 @@
+"""
+Stock ledger: every change to Item.quantity as an appended StockMovement.
+
+Movements are written by the stock_changed receiver in the transaction
+that changed the quantity, as one multi-row INSERT per change, so an order
+of twenty lines costs one statement and the ledger can never disagree with
+the committed quantity. Saves that set quantity directly are recorded as
+adjustments, and new items with stock as an opening adjustment.
+
+compact() periodically records a StockSnapshot for every item that moved
+since the previous run, computed from the ledger itself. quantity_at()
+then needs the latest snapshot before the requested time plus the
+movements after it, which is at most one compaction period of rows.
+Movement ids are used as the ordering; created_at is what the point in
+time is compared against, and the two agree except for writers racing
+within the same instant.
+"""
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import Item, StockMovement, StockSnapshot
+
+# Keeps `item_id__in` under SQLite's bound-parameter limit.
+CHUNK_SIZE = 500
+
+
+def record(changes, reason, reference='', at=None):
+    """
+    Append one movement per item in `changes` ({item_id: delta}); zero
+    deltas are skipped.
+    """
+    at = at or timezone.now()
+    reference = str(reference or '')
+    StockMovement.objects.bulk_create([
+        StockMovement(item_id=item_id, delta=delta, reason=reason, reference=reference, created_at=at)
+        for item_id, delta in changes.items() if delta
+    ])
+
+
+def quantity_at(item_id, at):
+    """
+    The item's quantity as of `at`, from its latest snapshot at or before
+    then plus the movements after it.
+    """
+    snapshot = (
+        StockSnapshot.objects.filter(item_id=item_id, taken_at__lte=at)
+        .order_by('-taken_at').values_list('quantity', 'movement_id').first()
+    )
+    quantity, after = snapshot or (0, 0)
+    tail = StockMovement.objects.filter(item_id=item_id, id__gt=after, created_at__lte=at).aggregate(
+        total=Sum('delta')
+    )['total']
+    return quantity + (tail or 0)
+
+
+def compact(batch_size=CHUNK_SIZE):
+    """
+    Snapshot every item with movements since the last compaction. Returns
+    the number of snapshots written.
+    """
+    with transaction.atomic():
+        watermark = StockSnapshot.objects.aggregate(last=Max('movement_id'))['last'] or 0
+        cutoff = (
+            StockMovement.objects.filter(id__gt=watermark).order_by('-id').values_list('id', 'created_at').first()
+        )
+        if cutoff is None:
+            return 0
+        cutoff_id, taken_at = cutoff
+        moved = dict(
+            StockMovement.objects.filter(id__gt=watermark, id__lte=cutoff_id)
+            .values('item_id').annotate(total=Sum('delta')).values_list('item_id', 'total')
+        )
+        item_ids = list(moved)
+        written = 0
+        for start in range(0, len(item_ids), batch_size):
+            chunk = item_ids[start:start + batch_size]
+            previous = _latest_snapshots(chunk)
+            StockSnapshot.objects.bulk_create([
+                StockSnapshot(
+                    item_id=item_id, quantity=previous.get(item_id, 0) + moved[item_id],
+                    movement_id=cutoff_id, taken_at=taken_at,
+                )
+                for item_id in chunk
+            ])
+            written += len(chunk)
+    return written
+
+
+def _latest_snapshots(item_ids):
+    latest = dict(
+        StockSnapshot.objects.filter(item_id__in=item_ids)
+        .values('item_id').annotate(last=Max('movement_id')).values_list('item_id', 'last')
+    )
+    if not latest:
+        return {}
+    return {
+        item_id: quantity
+        for item_id, movement_id, quantity in StockSnapshot.objects.filter(
+            item_id__in=list(latest), movement_id__in=set(latest.values())
+        ).values_list('item_id', 'movement_id', 'quantity')
+        if latest[item_id] == movement_id
+    }
+
+
+def reconcile(reason='adjustment', reference='ledger reconcile'):
+    """
+    Record an adjustment for every item whose quantity differs from its
+    ledger, e.g. stock that predates the ledger or was written with raw
+    SQL. Returns {item_id: delta} for the items adjusted.
+    """
+    drift = {}
+    ledger = dict(
+        StockMovement.objects.values('item_id').annotate(total=Sum('delta')).values_list('item_id', 'total')
+    )
+    for item_id, quantity in Item.objects.values_list('id', 'quantity').iterator(chunk_size=2000):
+        delta = quantity - ledger.get(item_id, 0)
+        if delta:
+            drift[item_id] = delta
+    with transaction.atomic():
+        items = list(drift)
+        for start in range(0, len(items), CHUNK_SIZE):
+            record({item_id: drift[item_id] for item_id in items[start:start + CHUNK_SIZE]}, reason, reference)
+    return drift
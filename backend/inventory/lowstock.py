@@ -0,0 +1,112 @@
+"""
+Low-stock tracking.
+
+An item is low when it is active, has a reorder level (its own, or else
+its category's) and its quantity is at or below it. Rather than comparing
+every item on each dashboard load, the set of low items is stored in
+LowStockItem and reconciled only for the items a change touched: stock
+changes, item and category saves and catalog imports call reconcile() with
+those ids, inside the transaction that made the change. Each time an item
+enters or leaves the set a StockAlert is recorded.
+"""
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Item, LowStockItem, StockAlert
+
+# Keeps `id__in` under SQLite's bound-parameter limit.
+CHUNK_SIZE = 500
+
+
+def reconcile(item_ids):
+    """
+    Bring LowStockItem in line with the current quantity and reorder level
+    of `item_ids`, recording an alert for every item that crossed its level.
+    Returns the alerts created.
+    """
+    item_ids = list(dict.fromkeys(item_ids))
+    alerts = []
+    for start in range(0, len(item_ids), CHUNK_SIZE):
+        alerts += _reconcile(item_ids[start:start + CHUNK_SIZE])
+    return alerts
+
+
+def _reconcile(item_ids):
+    # One query for both sides: the item's level and quantity, and its
+    # LowStockItem row if it has one (None otherwise).
+    now = timezone.now()
+    rows = (
+        Item.objects.filter(id__in=item_ids)
+        .annotate(level=Coalesce('reorder_level', 'category__reorder_level'))
+        .values_list(
+            'id', 'category__location_id', 'quantity', 'level', 'is_active',
+            'low_stock__quantity', 'low_stock__reorder_level', 'low_stock__location_id',
+        )
+    )
+
+    added, changed, removed, alerts = [], [], [], []
+    for item_id, location_id, quantity, level, is_active, *listed in rows:
+        if not is_active:
+            level = None
+        low = level is not None and quantity <= level
+        was_low = listed[0] is not None
+        if low and not was_low:
+            added.append(LowStockItem(
+                item_id=item_id, location_id=location_id, quantity=quantity, reorder_level=level, since=now,
+            ))
+            alerts.append(StockAlert(
+                item_id=item_id, location_id=location_id, kind='low', quantity=quantity, reorder_level=level,
+            ))
+        elif low:
+            if tuple(listed) != (quantity, level, location_id):
+                changed.append(LowStockItem(
+                    item_id=item_id, location_id=location_id, quantity=quantity, reorder_level=level,
+                ))
+        elif was_low:
+            removed.append(item_id)
+            alerts.append(StockAlert(
+                item_id=item_id, location_id=location_id, kind='restocked', quantity=quantity, reorder_level=level,
+            ))
+
+    if removed:
+        LowStockItem.objects.filter(item_id__in=removed).delete()
+    if added:
+        LowStockItem.objects.bulk_create(added)
+    if changed:
+        LowStockItem.objects.bulk_update(changed, ['quantity', 'reorder_level', 'location'])
+    if alerts:
+        StockAlert.objects.bulk_create(alerts)
+    return alerts
+
+
+def rebuild(location_id=None, chunk_size=2000):
+    """
+    Reconcile every item (of one location, if given), e.g. after adding
+    reorder levels in bulk. Returns the number of alerts created.
+    """
+    items = Item.objects.order_by('id')
+    if location_id is not None:
+        items = items.filter(category__location_id=location_id)
+    created = 0
+    batch = []
+    for item_id in items.values_list('id', flat=True).iterator(chunk_size=chunk_size):
+        batch.append(item_id)
+        if len(batch) >= chunk_size:
+            created += len(reconcile(batch))
+            batch = []
+    if batch:
+        created += len(reconcile(batch))
+    return created
+
+
+def low_stock(location_id, limit=None):
+    """
+    The location's low items, lowest quantity first, as dicts.
+    """
+    rows = (
+        LowStockItem.objects.filter(location_id=location_id)
+        .order_by('quantity', 'item_id')
+        .values('item_id', 'quantity', 'reorder_level', 'since', name=F('item__name'), barcode=F('item__barcode'))
+    )
+    return list(rows[:limit] if limit else rows)
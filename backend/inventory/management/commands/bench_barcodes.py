@@ -0,0 +1,65 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from authentication.models import CustomUser
+from backend.benchmark import measure, scratch_database, summarize
+from inventory.barcodes import barcode_cache, resolve_barcode, resolve_barcodes
+from inventory.models import Category, Item
+from store.models import Location, Store
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark barcode resolution against a location with many items: '
+        'uncached database lookups vs. warm cache hits. Runs against a '
+        'scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=2000)
+        parser.add_argument('--batch', type=int, default=100, help='Barcodes per bulk resolve.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(options['items'], options['repeat'], options['batch'], options['batch_size'])
+
+    def run(self, items, repeat, batch, batch_size):
+        owner = CustomUser.objects.create_user(email='bench@example.com', role='owner')
+        store = Store.objects.create(
+            name='Bench', address='-', contact_number='+251911234567',
+            registration_number='BENCH', owner=owner, admin=owner,
+        )
+        location = Location.objects.create(store=store, name='Bench', address='-', contact_number='+251911234567')
+        category = Category.objects.create(location=location, name='Bench')
+        for start in range(0, items, batch_size):
+            Item.objects.bulk_create([
+                Item(category=category, name=f'Item {n}', price=Decimal('9.99'), barcode=f'{n:013d}', quantity=100)
+                for n in range(start, min(items, start + batch_size))
+            ])
+
+        codes = [f'{random.randrange(items):013d}' for _ in range(repeat)]
+        probes = iter(codes)
+
+        def uncached():
+            barcode_cache.clear()
+            resolve_barcode(next(probes))
+
+        cold = summarize(measure(uncached, repeat))
+        resolve_barcodes(codes)
+        probes = iter(codes)
+        warm = summarize(measure(lambda: resolve_barcode(next(probes)), repeat))
+        batches = [codes[i:i + batch] for i in range(0, len(codes) - batch + 1, batch)] or [codes]
+        batch_probes = iter(batches * (repeat // len(batches) + 1))
+        warm_batch = summarize(measure(lambda: resolve_barcodes(next(batch_probes)), repeat))
+
+        self.stdout.write(f'{items} items, {repeat} lookups (ms)')
+        for label, result in (
+            ('uncached single', cold), ('warm single', warm), (f'warm bulk x{batch}', warm_batch),
+        ):
+            self.stdout.write(
+                f"  {label:<16} mean {result['mean']:.4f}  p50 {result['p50']:.4f}  p99 {result['p99']:.4f}"
+            )
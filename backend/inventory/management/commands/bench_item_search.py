@@ -0,0 +1,82 @@
+import itertools
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from authentication.models import CustomUser
+from backend.benchmark import measure, scratch_database, summarize
+from inventory.models import Category, Item
+from inventory.search import fallback_search, search_items
+from store.models import Location, Store
+
+# About 2,000 made-up words, so prefixes narrow the way they do in a real
+# product vocabulary.
+WORDS = [
+    ''.join(parts) for parts in itertools.product(
+        ['ba', 'ke', 'mi', 'so', 'ta', 'wa', 'ru', 'lo', 'ne', 'pi', 'da', 'fu', 'go', 'hi', 'ja', 'zu'],
+        ['ter', 'nar', 'los', 'vin', 'dem', 'kor', 'bel', 'sip', 'gan', 'mux', 'rod', 'tep'],
+        ['', 'a', 'o', 'is', 'en', 'um', 'ar', 'el', 'ix', 'on'],
+    )
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark typeahead item search (FTS5 prefix index) against the '
+        'icontains fallback as the catalog grows. Runs against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+        parser.add_argument('--locations', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(sorted(options['sizes']), options)
+
+    def run(self, sizes, options):
+        rng = random.Random(0)
+        owner = CustomUser.objects.create_user(email='bench@example.com', role='owner')
+        store = Store.objects.create(
+            name='Bench', address='-', contact_number='+251911234567',
+            registration_number='BENCH', owner=owner, admin=owner,
+        )
+        categories = []
+        for n in range(options['locations']):
+            location = Location.objects.create(store=store, name=f'L{n}', address='-', contact_number='+251911234567')
+            categories.extend(Category.objects.create(location=location, name=f'C{n}-{k}') for k in range(10))
+        location_id = categories[0].location_id
+
+        queries = {
+            '2 chars': [word[:2] for word in rng.sample(WORDS, 20)],
+            '3 chars': [word[:3] for word in rng.sample(WORDS, 20)],
+            '5 chars': [word[:5] for word in rng.sample(WORDS, 20)],
+            '2 words': [f'{a[:3]} {b[:2]}' for a, b in zip(rng.sample(WORDS, 20), rng.sample(WORDS, 20))],
+        }
+        self.stdout.write(f"{'items':>9} {'query':>8} {'fts p50':>9} {'fts p99':>9} {'icontains p50':>14}   (ms)")
+        created = 0
+        for size in sizes:
+            while created < size:
+                count = min(options['batch_size'], size - created)
+                Item.objects.bulk_create([
+                    Item(
+                        category=rng.choice(categories),
+                        name=' '.join(rng.sample(WORDS, rng.randint(2, 4))).title(),
+                        price=Decimal('1.00'), barcode=f'{n:013d}',
+                    )
+                    for n in range(created, created + count)
+                ])
+                created += count
+
+            for label, texts in queries.items():
+                cycle = itertools.cycle(texts)
+                fts = summarize(measure(lambda: search_items(location_id, next(cycle)), options['repeat']))
+                scan = summarize(measure(
+                    lambda: fallback_search(location_id, next(cycle).split(), {}, 20), min(options['repeat'], 10)
+                ))
+                self.stdout.write(
+                    f"{created:>9} {label:>8} {fts['p50']:>9.3f} {fts['p99']:>9.3f} {scan['p50']:>14.3f}"
+                )
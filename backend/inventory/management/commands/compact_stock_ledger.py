@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from inventory import ledger
+
+
+class Command(BaseCommand):
+    help = (
+        'Snapshot the quantity of every item that moved since the last run, so '
+        'point-in-time stock queries only replay movements after the latest '
+        'snapshot. Run periodically, e.g. hourly or nightly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reconcile', action='store_true',
+            help='First record adjustments for items whose quantity differs from their ledger '
+                 '(stock that predates the ledger).',
+        )
+
+    def handle(self, *args, **options):
+        if options['reconcile']:
+            drift = ledger.reconcile()
+            self.stdout.write(f'Recorded adjustments for {len(drift)} items.')
+        written = ledger.compact()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} stock snapshots.'))
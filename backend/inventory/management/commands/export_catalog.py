@@ -0,0 +1,29 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.catalog import FORMATS, export_catalog
+from store.models import Location
+
+
+class Command(BaseCommand):
+    help = "Export a location's items as CSV or JSONL, in the columns import_catalog reads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('location_id', type=int)
+        parser.add_argument('--file-format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', help='File to write; defaults to stdout.')
+
+    def handle(self, *args, **options):
+        try:
+            location = Location.objects.get(pk=options['location_id'])
+        except Location.DoesNotExist:
+            raise CommandError(f"Location {options['location_id']} does not exist")
+
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        try:
+            for chunk in export_catalog(location, options['file_format']):
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.catalog import DEFAULT_BATCH_SIZE, FORMATS, import_catalog
+from store.models import Location
+
+
+class Command(BaseCommand):
+    help = 'Import a CSV or JSONL catalog of items into a location, upserting on barcode.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('location_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--file-format', choices=FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--max-errors', type=int, default=50, help='Row errors to print.')
+
+    def handle(self, *args, **options):
+        try:
+            location = Location.objects.get(pk=options['location_id'])
+        except Location.DoesNotExist:
+            raise CommandError(f"Location {options['location_id']} does not exist")
+        fmt = options['file_format'] or options['path'].rpartition('.')[2].lower()
+        if fmt not in FORMATS:
+            raise CommandError(f"Cannot tell the format of {options['path']}; pass --file-format")
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            report = import_catalog(location, stream, fmt, options['batch_size'])
+
+        for line, message in report.errors[:options['max_errors']]:
+            self.stderr.write(f'line {line}: {message}')
+        if len(report.errors) > options['max_errors']:
+            self.stderr.write(f"... and {len(report.errors) - options['max_errors']} more")
+        self.stdout.write(
+            f'{report.rows} rows: {report.created} created, {report.updated} updated, '
+            f'{len(report.errors)} failed in {report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s)'
+        )
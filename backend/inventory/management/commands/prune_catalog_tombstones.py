@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory.sync import prune_tombstones, sync_setting
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete catalog tombstones older than the retention window. Terminals '
+        'that last synced before it get a full snapshot instead of a delta.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=sync_setting('TOMBSTONE_RETENTION_DAYS'))
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones.'))
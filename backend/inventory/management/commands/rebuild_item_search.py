@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from inventory.search import rebuild, uses_fts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the item search index from the inventory_item table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if not uses_fts(options['database']):
+            self.stdout.write('This database has no search index; searches query inventory_item directly.')
+            return
+        rebuild(options['database'])
+        self.stdout.write(self.style.SUCCESS('Item search index rebuilt.'))
@@ -0,0 +1,33 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from inventory import expiry
+
+
+class Command(BaseCommand):
+    help = (
+        'Reset the quantity of temporary items as their expiry comes due. Runs '
+        'until interrupted; with --once, resets what is due now and exits (for cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=expiry.expiry_setting('BATCH_SIZE'))
+        parser.add_argument(
+            '--poll-interval', type=float, default=expiry.expiry_setting('POLL_INTERVAL'),
+            help='Longest sleep between passes, in seconds.',
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            reset = expiry.reset_due_items(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Reset {reset} items.'))
+            return
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+        self.stdout.write('Resetting temporary items as they come due; Ctrl-C to stop.')
+        expiry.run(stop, options['poll_interval'], options['batch_size'])
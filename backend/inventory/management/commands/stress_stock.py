@@ -0,0 +1,119 @@
+import random
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from authentication.models import CustomUser
+from backend.benchmark import scratch_database
+from inventory.models import Category, Item
+from inventory.stock import InsufficientStock, decrement_stock
+from store.models import Location, Store
+
+
+def naive_decrement(lines):
+    # What selling through save() would look like: read, subtract, write.
+    for item_id, quantity in lines.items():
+        item = Item.objects.get(id=item_id)
+        item.quantity -= quantity
+        item.save()
+
+
+class Command(BaseCommand):
+    help = (
+        'Run many terminals checking out concurrently against a few items and '
+        'verify that every committed decrement is reflected in the final '
+        'quantities. Reports checkouts per second. Runs against a scratch '
+        'SQLite file database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terminals', type=int, default=8)
+        parser.add_argument('--checkouts', type=int, default=200, help='Checkouts per terminal.')
+        parser.add_argument('--items', type=int, default=5)
+        parser.add_argument('--stock', type=int, default=2000, help='Starting quantity per item.')
+        parser.add_argument(
+            '--naive', action='store_true',
+            help='Use read-modify-write save() instead of decrement_stock, to show lost updates.',
+        )
+
+    def handle(self, *args, **options):
+        options_dict = settings.DATABASES['default'].setdefault('OPTIONS', {})
+        saved = dict(options_dict)
+        if connection.vendor == 'sqlite':
+            # Take the write lock at BEGIN and wait for it instead of failing fast.
+            options_dict.update({'transaction_mode': 'IMMEDIATE', 'timeout': 30})
+        try:
+            with scratch_database():
+                self.run(options)
+        finally:
+            options_dict.clear()
+            options_dict.update(saved)
+
+    def run(self, options):
+        owner = CustomUser.objects.create_user(email='stress@example.com', role='owner')
+        store = Store.objects.create(
+            name='Stress', address='-', contact_number='+251911234567',
+            registration_number='STRESS', owner=owner, admin=owner,
+        )
+        location = Location.objects.create(store=store, name='Stress', address='-', contact_number='+251911234567')
+        category = Category.objects.create(location=location, name='Stress')
+        item_ids = [
+            Item.objects.create(category=category, name=f'Item {n}', price=Decimal('1.00'), quantity=options['stock']).id
+            for n in range(options['items'])
+        ]
+        decrement = naive_decrement if options['naive'] else decrement_stock
+
+        sold = Counter()
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def terminal(seed):
+            rng = random.Random(seed)
+            local_sold = Counter()
+            local_outcomes = Counter()
+            try:
+                for _ in range(options['checkouts']):
+                    lines = {item_id: rng.randint(1, 3) for item_id in rng.sample(item_ids, rng.randint(1, len(item_ids)))}
+                    try:
+                        decrement(lines)
+                    except InsufficientStock:
+                        local_outcomes['short'] += 1
+                    except OperationalError:
+                        local_outcomes['locked'] += 1
+                    else:
+                        local_outcomes['committed'] += 1
+                        local_sold.update(lines)
+            finally:
+                connections.close_all()
+            with lock:
+                sold.update(local_sold)
+                outcomes.update(local_outcomes)
+
+        threads = [threading.Thread(target=terminal, args=(n,)) for n in range(options['terminals'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        final = dict(Item.objects.filter(id__in=item_ids).values_list('id', 'quantity'))
+        lost = sum(final[item_id] - (options['stock'] - sold[item_id]) for item_id in item_ids)
+        negative = sum(1 for quantity in final.values() if quantity < 0)
+
+        mode = 'save() read-modify-write' if options['naive'] else 'decrement_stock'
+        self.stdout.write(f"{mode}: {options['terminals']} terminals x {options['checkouts']} checkouts")
+        self.stdout.write(
+            f"  committed {outcomes['committed']}, short {outcomes['short']}, lock timeouts {outcomes['locked']}"
+        )
+        self.stdout.write(f"  {outcomes['committed'] / elapsed:.1f} checkouts/s over {elapsed:.2f}s")
+        self.stdout.write(f"  lost units: {lost}, items below zero: {negative}")
+        if lost or negative:
+            self.stdout.write(self.style.ERROR('  FAILED: final quantities do not match committed sales'))
+        else:
+            self.stdout.write(self.style.SUCCESS('  OK: no lost updates'))
@@ -1,4 +1,7 @@
+from datetime import timedelta
+
 from django.db import models
+from django.utils import timezone
 from store.models import Location
 
 class Category(models.Model):
@@ -7,23 +10,240 @@ class Category(models.Model):
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     is_hidden = models.BooleanField(default=True)
+    # Default reorder level for the category's items; see LowStockItem.
+    reorder_level = models.PositiveIntegerField(blank=True, null=True)
+    loaded_reorder_level = None
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['location', 'updated_at'], name='idx_category_sync'),
+        ]
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets a save tell whether the default reorder level changed.
+        instance.loaded_reorder_level = instance.__dict__.get('reorder_level')
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.loaded_reorder_level = self.__dict__.get('reorder_level')
+
 class Item(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     barcode = models.CharField(max_length=50, unique=True, blank=True, null=True)
     quantity = models.IntegerField(default=0)
+    # Overrides the category's reorder level when set.
+    reorder_level = models.PositiveIntegerField(blank=True, null=True)
     last_inventory_update = models.DateTimeField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     is_hidden = models.BooleanField(default=True)
+    # Temporary items (e.g. the day's fresh food) have their quantity reset
+    # to zero every expiry_hours when auto_reset_quantity is set; see
+    # inventory/expiry.py.
+    is_temporary = models.BooleanField(default=False)
+    expiry_hours = models.PositiveIntegerField(blank=True, null=True)
+    auto_reset_quantity = models.BooleanField(default=False)
+    last_quantity_reset = models.DateTimeField(blank=True, null=True)
+    # When the next reset is due; null for items that never reset. Indexed so
+    # the scheduler reads only the items that are due.
+    next_reset_at = models.DateTimeField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # When a field POS terminals sync last changed. Stock writes move
+    # updated_at but not this, so the sync delta skips items that only sold.
+    catalog_updated_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    RESET_FIELDS = ('is_temporary', 'expiry_hours', 'auto_reset_quantity', 'last_quantity_reset')
+    CATALOG_FIELDS = ('category', 'name', 'barcode', 'price', 'is_active', 'is_hidden')
+    loaded_quantity = None
+    loaded_catalog = None
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'catalog_updated_at'], name='idx_item_sync'),
+            models.Index(fields=['is_temporary', 'expiry_hours', 'last_quantity_reset'], name='idx_item_temporary'),
+            models.Index(
+                fields=['next_reset_at'], name='idx_item_next_reset',
+                condition=models.Q(next_reset_at__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets a save record how far it moved the quantity, and tell
+        # whether it changed the synced catalog.
+        instance.loaded_quantity = instance.__dict__.get('quantity')
+        instance.loaded_catalog = instance.catalog_values()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.loaded_quantity = self.__dict__.get('quantity')
+        self.loaded_catalog = self.catalog_values()
+
+    def catalog_values(self):
+        return tuple(self.__dict__.get(self._meta.get_field(name).attname) for name in self.CATALOG_FIELDS)
+
+    @property
+    def resets_quantity(self):
+        return bool(self.is_temporary and self.auto_reset_quantity and self.expiry_hours)
+
+    def schedule_reset(self):
+        """
+        Set next_reset_at from the last reset (or, before the first one,
+        from when the item was created).
+        """
+        if self.resets_quantity:
+            start = self.last_quantity_reset or self.created_at or timezone.now()
+            self.next_reset_at = start + timedelta(hours=self.expiry_hours)
+        else:
+            self.next_reset_at = None
+
+    def save(self, *args, **kwargs):
+        self.schedule_reset()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.RESET_FIELDS):
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'next_reset_at'}
+        if update_fields is None or set(update_fields) & set(self.CATALOG_FIELDS):
+            if self._state.adding or self.catalog_values() != self.loaded_catalog:
+                self.catalog_updated_at = timezone.now()
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*kwargs['update_fields'], 'catalog_updated_at'}
+        super().save(*args, **kwargs)
+        self.loaded_catalog = self.catalog_values()
+
+class CatalogVersion(models.Model):
+    """
+    Counter bumped whenever a location's visible catalog may have changed.
+    POS sync uses it as the ETag and as the key of the cached snapshot.
+    """
+    location = models.OneToOneField(Location, on_delete=models.CASCADE, primary_key=True, related_name='catalog_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.location_id} v{self.version}"
+
+class CatalogTombstone(models.Model):
+    """
+    Record of a deleted Category or Item, so terminals syncing a delta
+    learn to drop it. Pruned after CATALOG_SYNC['TOMBSTONE_RETENTION_DAYS'].
+    """
+    KIND_CHOICES = [
+        ('category', 'Category'),
+        ('item', 'Item'),
+    ]
+    location = models.ForeignKey(Location, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location', 'deleted_at'], name='idx_tombstone_location_time'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted"
+
+class LowStockItem(models.Model):
+    """
+    Items at or below their reorder level, kept up to date by
+    inventory.lowstock as stock changes, so listing a location's low stock
+    reads only the rows that are low.
+    """
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name='low_stock')
+    location = models.ForeignKey(Location, on_delete=models.CASCADE)
+    quantity = models.IntegerField()
+    reorder_level = models.PositiveIntegerField()
+    since = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location', 'quantity'], name='idx_low_stock_location'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id}: {self.quantity} <= {self.reorder_level}"
+
+class StockAlert(models.Model):
+    """
+    An item crossing its reorder level, in either direction, for the owner
+    dashboard to pick up.
+    """
+    KIND_CHOICES = [
+        ('low', 'Low stock'),
+        ('restocked', 'Restocked'),
+    ]
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='stock_alerts')
+    location = models.ForeignKey(Location, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    quantity = models.IntegerField()
+    reorder_level = models.PositiveIntegerField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location', 'id'], name='idx_stock_alert_location'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.item_id} at {self.quantity}"
+
+class StockMovement(models.Model):
+    """
+    One change to an item's quantity. Rows are only ever appended; the
+    sum of an item's deltas is its quantity (see inventory.ledger).
+    """
+    REASON_CHOICES = [
+        ('sale', 'Sale'),
+        ('return', 'Return'),
+        ('restock', 'Restock'),
+        ('transfer_out', 'Transfer out'),
+        ('transfer_in', 'Transfer in'),
+        ('adjustment', 'Adjustment'),
+        ('import', 'Import'),
+        ('reset', 'Reset'),
+    ]
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='movements')
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    reference = models.CharField(max_length=100, blank=True, default='')
+    # Reads go through the item_id index, which also orders by id: both
+    # the ledger listing and the tail after a snapshot are id ranges.
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.item_id} {self.delta:+d} ({self.reason})"
+
+class StockSnapshot(models.Model):
+    """
+    An item's quantity after every movement up to and including
+    `movement_id`, so a point-in-time query starts here instead of at the
+    first movement.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='stock_snapshots')
+    quantity = models.IntegerField()
+    movement_id = models.BigIntegerField(db_index=True)
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['item', 'taken_at'], name='idx_snapshot_item_time'),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.item_id}: {self.quantity} at {self.taken_at}"
@@ -0,0 +1,202 @@
+"""
+Typeahead search over Item names and barcodes.
+
+On SQLite the items are indexed in an FTS5 table with prefix indexes, and
+each item also carries its location as a token, so a query like "wat bo"
+at location 12 becomes one index lookup:
+
+    {name barcode}: ("wat"* AND "bo"*) AND loc: "l12"
+
+ranked by bm25 with name matches weighted above barcode matches.
+
+The index is kept in sync by SQL triggers on inventory_item and
+inventory_category rather than model signals, so bulk_create(), update()
+and the catalog import are covered too. Migrations are not part of the
+repository, so install() creates the table and triggers after every
+migrate and flush, and drop_triggers() takes the triggers out of the way
+before migrations run (see InventoryConfig.ready). Other
+database backends fall back to an istartswith/icontains query.
+"""
+import re
+from decimal import Decimal
+
+from django.db import connections
+
+from .models import Item
+
+TABLE = 'inventory_item_fts'
+MIN_QUERY_LENGTH = 2
+MAX_LIMIT = 100
+RESULT_FIELDS = ('id', 'name', 'barcode', 'price', 'quantity', 'category_id', 'is_active', 'is_hidden')
+PRICE_QUANTUM = Decimal(1).scaleb(-Item._meta.get_field('price').decimal_places)
+
+_LOCATION_OF = "'l' || (SELECT location_id FROM inventory_category WHERE id = {row}.category_id)"
+
+SCHEMA = [
+    # Contentless: the index stores tokens only and results are read back
+    # from inventory_item, so the table adds little to the database size.
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        name, barcode, loc,
+        content='', detail='column', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS inventory_item_fts_insert AFTER INSERT ON inventory_item BEGIN
+        INSERT INTO {TABLE} (rowid, name, barcode, loc)
+        VALUES (new.id, new.name, new.barcode, {_LOCATION_OF.format(row='new')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS inventory_item_fts_delete AFTER DELETE ON inventory_item BEGIN
+        INSERT INTO {TABLE} ({TABLE}, rowid, name, barcode, loc)
+        VALUES ('delete', old.id, old.name, old.barcode, {_LOCATION_OF.format(row='old')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS inventory_item_fts_update
+    AFTER UPDATE OF name, barcode, category_id ON inventory_item BEGIN
+        INSERT INTO {TABLE} ({TABLE}, rowid, name, barcode, loc)
+        VALUES ('delete', old.id, old.name, old.barcode, {_LOCATION_OF.format(row='old')});
+        INSERT INTO {TABLE} (rowid, name, barcode, loc)
+        VALUES (new.id, new.name, new.barcode, {_LOCATION_OF.format(row='new')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS inventory_category_fts_move
+    AFTER UPDATE OF location_id ON inventory_category BEGIN
+        INSERT INTO {TABLE} ({TABLE}, rowid, name, barcode, loc)
+        SELECT 'delete', id, name, barcode, 'l' || old.location_id FROM inventory_item WHERE category_id = new.id;
+        INSERT INTO {TABLE} (rowid, name, barcode, loc)
+        SELECT id, name, barcode, 'l' || new.location_id FROM inventory_item WHERE category_id = new.id;
+    END""",
+]
+
+TRIGGERS = (
+    'inventory_item_fts_insert', 'inventory_item_fts_delete', 'inventory_item_fts_update',
+    'inventory_category_fts_move',
+)
+
+POPULATE = f"""
+    INSERT INTO {TABLE} (rowid, name, barcode, loc)
+    SELECT i.id, i.name, i.barcode, 'l' || c.location_id
+    FROM inventory_item i JOIN inventory_category c ON c.id = i.category_id
+"""
+
+
+def uses_fts(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def install(using='default'):
+    """
+    Create the search table and its triggers if missing and index the
+    items that exist. Also re-indexes when the index has drifted from the
+    table, e.g. after `flush`, which empties inventory_item but not the
+    index.
+    """
+    if not uses_fts(using):
+        return
+    connection = connections[using]
+    tables = connection.introspection.table_names()
+    if 'inventory_item' not in tables:
+        return
+    with connection.cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        if TABLE not in tables:
+            cursor.execute(POPULATE)
+            return
+        cursor.execute(f'SELECT (SELECT COUNT(*) FROM inventory_item) - (SELECT COUNT(*) FROM {TABLE}_docsize)')
+        drifted = cursor.fetchone()[0] != 0
+    if drifted:
+        rebuild(using)
+
+
+def drop_triggers(using='default'):
+    """
+    Drop the sync triggers ahead of migrations. SQLite's table rebuilds
+    (create, copy, drop, rename) fail while a trigger on another table
+    refers to inventory_item; install() puts them back afterwards.
+    """
+    if not uses_fts(using):
+        return
+    with connections[using].cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def rebuild(using='default'):
+    """
+    Re-index every item from scratch.
+    """
+    if not uses_fts(using):
+        return
+    with connections[using].cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('delete-all')")
+        cursor.execute(POPULATE)
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def fts_query(terms, location_id):
+    prefixes = ' AND '.join(f'"{term}"*' for term in terms)
+    return f'{{name barcode}}: ({prefixes}) AND loc: "l{int(location_id)}"'
+
+
+def search_items(location_id, query, category_id=None, is_active=None, is_hidden=None, limit=20, using='default'):
+    """
+    Items at the location whose name or barcode has words starting with
+    every word of `query`, best matches first, as dicts of RESULT_FIELDS.
+    """
+    terms = _terms(query)
+    if not terms or len(''.join(terms)) < MIN_QUERY_LENGTH:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    filters = {}
+    if category_id is not None:
+        filters['category_id'] = category_id
+    if is_active is not None:
+        filters['is_active'] = is_active
+    if is_hidden is not None:
+        filters['is_hidden'] = is_hidden
+
+    if not uses_fts(using):
+        return fallback_search(location_id, terms, filters, limit, using)
+
+    conditions, params = [], [fts_query(terms, location_id)]
+    for name, value in filters.items():
+        conditions.append(f'i.{name} = %s')
+        params.append(value)
+    params.append(limit)
+    columns = ', '.join(f'i.{name}' for name in RESULT_FIELDS)
+    sql = f"""
+        SELECT {columns}
+        FROM {TABLE} f JOIN inventory_item i ON i.id = f.rowid
+        WHERE {TABLE} MATCH %s {''.join(' AND ' + condition for condition in conditions)}
+        ORDER BY bm25({TABLE}, 10.0, 2.0, 0.0), i.id
+        LIMIT %s
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = [dict(zip(RESULT_FIELDS, row)) for row in cursor.fetchall()]
+    # SQLite hands back prices as floats and flags as integers.
+    for row in rows:
+        row['price'] = Decimal(str(row['price'])).quantize(PRICE_QUANTUM)
+        row['is_active'] = bool(row['is_active'])
+        row['is_hidden'] = bool(row['is_hidden'])
+    return rows
+
+
+def fallback_search(location_id, terms, filters, limit, using='default'):
+    """
+    Portable version for backends without FTS5: names starting with the
+    first word rank ahead of names merely containing it.
+    """
+    items = Item.objects.using(using).filter(category__location_id=location_id, **filters)
+    for term in terms:
+        items = items.filter(name__icontains=term)
+    starts = list(items.filter(name__istartswith=terms[0]).order_by('name', 'id').values(*RESULT_FIELDS)[:limit])
+    if len(starts) < limit:
+        seen = [row['id'] for row in starts]
+        starts += list(
+            items.exclude(id__in=seen).order_by('name', 'id').values(*RESULT_FIELDS)[:limit - len(starts)]
+        )
+    return starts
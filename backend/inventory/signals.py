@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from store.models import Location
+from .barcodes import barcode_cache
+from . import ledger
+from .lowstock import reconcile
+from .models import Category, Item
+from .sync import add_tombstones, bump_version
+
+# Sent by inventory.stock inside the transaction that changed stock, with
+# `changes` mapping item ids to the quantity delta, and the `reason` and
+# `reference` recorded in the ledger. Receivers that write should do so in
+# that transaction; caches should wait for on_commit.
+stock_changed = Signal()
+
+# Sent by bulk catalog writes (which skip post_save) inside their
+# transaction, with location_id and the item_ids and barcodes written.
+catalog_changed = Signal()
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def drop_cached_barcode(sender, instance, **kwargs):
+    # Covers both the item's previous barcode (found by id) and its current
+    # one, which may have been cached as not found.
+    barcode_cache.invalidate(item_id=instance.pk, barcode=instance.barcode)
+
+
+@receiver(stock_changed)
+def drop_cached_barcodes_for_stock(sender, changes, **kwargs):
+    def invalidate():
+        for item_id in changes:
+            barcode_cache.invalidate(item_id=item_id)
+    transaction.on_commit(invalidate)
+
+
+@receiver(catalog_changed)
+def drop_cached_barcodes_for_catalog(sender, item_ids, barcodes, **kwargs):
+    def invalidate():
+        for item_id in item_ids:
+            barcode_cache.invalidate(item_id=item_id)
+        for barcode in barcodes:
+            barcode_cache.invalidate(barcode=barcode)
+    transaction.on_commit(invalidate)
+
+
+def _deleted_with(origin, model):
+    # `origin` is the instance or queryset whose delete() cascaded here.
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+
+def _location_of(item):
+    if Item.category.is_cached(item) and item.category.pk == item.category_id:
+        return item.category.location_id
+    return Category.objects.filter(pk=item.category_id).values_list('location_id', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+def bump_catalog_for_category(sender, instance, **kwargs):
+    bump_version(instance.location_id)
+
+
+@receiver(pre_delete, sender=Category)
+def record_deleted_category(sender, instance, origin=None, **kwargs):
+    # Tombstones for the category and, in one query, the items the delete
+    # is about to cascade to; their own post_delete then skips the work.
+    if _deleted_with(origin, Location):
+        return
+    add_tombstones(instance.location_id, 'category', [instance.pk])
+    add_tombstones(instance.location_id, 'item', Item.objects.filter(category=instance).values_list('id', flat=True))
+    bump_version(instance.location_id)
+
+
+@receiver(post_save, sender=Item)
+def bump_catalog_for_item(sender, instance, **kwargs):
+    location_id = _location_of(instance)
+    if location_id is not None:
+        bump_version(location_id)
+
+
+@receiver(post_delete, sender=Item)
+def record_deleted_item(sender, instance, origin=None, **kwargs):
+    if _deleted_with(origin, Location) or _deleted_with(origin, Category):
+        return
+    location_id = _location_of(instance)
+    if location_id is not None:
+        add_tombstones(location_id, 'item', [instance.pk])
+        bump_version(location_id)
+
+
+@receiver(catalog_changed)
+def bump_catalog_for_import(sender, location_id, **kwargs):
+    bump_version(location_id)
+
+
+@receiver(stock_changed)
+def reconcile_low_stock_for_stock(sender, changes, **kwargs):
+    reconcile(changes)
+
+
+@receiver(post_save, sender=Item)
+def reconcile_low_stock_for_item(sender, instance, **kwargs):
+    reconcile([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reconcile_low_stock_for_category(sender, instance, created, **kwargs):
+    # Only a changed default level can move the category's items.
+    if not created and instance.reorder_level != instance.loaded_reorder_level:
+        reconcile(Item.objects.filter(category=instance, reorder_level__isnull=True).values_list('id', flat=True))
+    instance.loaded_reorder_level = instance.reorder_level
+
+
+@receiver(catalog_changed)
+def reconcile_low_stock_for_import(sender, item_ids, **kwargs):
+    reconcile(item_ids)
+
+
+@receiver(stock_changed)
+def record_stock_movements(sender, changes, reason='adjustment', reference='', **kwargs):
+    ledger.record(changes, reason, reference)
+
+
+@receiver(post_save, sender=Item)
+def record_quantity_set_on_save(sender, instance, created, **kwargs):
+    # Quantity written through save() rather than inventory.stock: an
+    # opening balance for new items, an adjustment otherwise.
+    before = 0 if created else instance.loaded_quantity
+    if before is not None and instance.quantity != before:
+        ledger.record({instance.pk: instance.quantity - before}, 'adjustment')
+    instance.loaded_quantity = instance.quantity
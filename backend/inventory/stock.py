@@ -0,0 +1,156 @@
+"""
+Stock changes for Item.quantity.
+
+Every change is one UPDATE computed in the database (quantity = quantity -
+n), never a read-modify-write through save(), so concurrent terminals
+cannot overwrite each other's decrements. A decrement also carries a
+per-item guard that keeps quantity from going negative; if any line is
+short, the whole change is rolled back and reported.
+"""
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from .models import Item
+from .signals import stock_changed
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when a decrement would take an item below zero. `short` maps
+    each offending item id to {'requested': n, 'available': m}; available
+    is None for ids that do not exist.
+    """
+
+    def __init__(self, short):
+        self.short = short
+        super().__init__(f"Insufficient stock for items {sorted(short)}")
+
+
+def _merge(lines):
+    """
+    Sum quantities per item from a mapping or (item_id, quantity) pairs.
+    """
+    totals = Counter()
+    for item_id, quantity in (lines.items() if hasattr(lines, 'items') else lines):
+        if quantity <= 0:
+            raise ValueError(f"Quantity for item {item_id} must be positive")
+        totals[item_id] += quantity
+    return totals
+
+
+# Lines per UPDATE on backends without UPDATE ... FROM. Each statement
+# carries a CASE branch and a guard term per line, so its cost grows with
+# the square of its size, and SQLite rejects expressions more than 1000
+# terms deep; large changes are split into several statements in the same
+# transaction.
+CHUNK_SIZE = 100
+
+# Lines per UPDATE ... FROM (VALUES ...): two parameters per line, well
+# under SQLite's bound-parameter limit.
+VALUES_CHUNK_SIZE = 500
+
+
+def _update_with_case(item_ids, totals, sign, guard, now):
+    updated = 0
+    for start in range(0, len(item_ids), CHUNK_SIZE):
+        chunk = item_ids[start:start + CHUNK_SIZE]
+        rows = Item.objects.filter(id__in=chunk)
+        if guard:
+            condition = Q()
+            for item_id in chunk:
+                condition |= Q(id=item_id, quantity__gte=totals[item_id])
+            rows = rows.filter(condition)
+        updated += rows.update(
+            quantity=Case(
+                *(When(id=item_id, then=F('quantity') + sign * totals[item_id]) for item_id in chunk),
+                default=F('quantity'),
+            ),
+            last_inventory_update=now,
+            updated_at=now,
+        )
+    return updated
+
+
+def _update_from_values(item_ids, totals, sign, guard, now):
+    # The lines are joined in as a VALUES list, so the statement is the
+    # same size whatever the quantities and building it costs next to
+    # nothing; the CASE form spends most of its time in the ORM.
+    table = connection.ops.quote_name(Item._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(now)
+    updated = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(item_ids), VALUES_CHUNK_SIZE):
+            chunk = item_ids[start:start + VALUES_CHUNK_SIZE]
+            # Both backends name the columns of a VALUES list column1,
+            # column2. Starting the statement with UPDATE rather than WITH
+            # keeps cursor.rowcount set on SQLite.
+            cursor.execute(
+                f"UPDATE {table} SET quantity = {table}.quantity {'+' if sign > 0 else '-'} lines.column2, "
+                f"last_inventory_update = %s, updated_at = %s "
+                f"FROM (VALUES {', '.join(['(%s, %s)'] * len(chunk))}) AS lines "
+                f"WHERE {table}.id = lines.column1"
+                + (f" AND {table}.quantity >= lines.column2" if guard else ''),
+                [now, now] + [value for item_id in chunk for value in (item_id, totals[item_id])],
+            )
+            updated += cursor.rowcount
+    return updated
+
+
+class _Short(Exception):
+    pass
+
+
+def _apply(totals, sign, guard, reason, reference):
+    now = timezone.now()
+    item_ids = list(totals)
+    update = _update_from_values if connection.vendor in ('sqlite', 'postgresql') else _update_with_case
+    try:
+        with transaction.atomic():
+            updated = update(item_ids, totals, sign, guard, now)
+            if updated != len(totals):
+                # Raising inside atomic() undoes the rows that did update.
+                raise _Short
+            stock_changed.send(
+                sender=Item,
+                changes={item_id: sign * quantity for item_id, quantity in totals.items()},
+                reason=reason,
+                reference=reference,
+            )
+    except _Short:
+        # Read once the rollback has restored the rows that were updated,
+        # so they show the quantities the change was checked against.
+        available = {}
+        for start in range(0, len(item_ids), VALUES_CHUNK_SIZE):
+            available.update(
+                Item.objects.filter(id__in=item_ids[start:start + VALUES_CHUNK_SIZE]).values_list('id', 'quantity')
+            )
+        short = {
+            item_id: {'requested': quantity, 'available': available.get(item_id)}
+            for item_id, quantity in totals.items()
+            if available.get(item_id) is None or (guard and available[item_id] < quantity)
+        }
+        raise InsufficientStock(short) from None
+    return updated
+
+
+def decrement_stock(lines, reason='sale', reference='', allow_negative=False):
+    """
+    Take stock for every line of an order at once. `lines` maps item ids
+    to quantities (or is a sequence of (item_id, quantity) pairs; repeated
+    items are summed). Either every item is decremented or, if any would
+    go negative or does not exist, none is and InsufficientStock is raised.
+    `reason` and `reference` (e.g. the order number) go to the ledger.
+    allow_negative drops the guard, for sales that have already happened,
+    e.g. orders uploaded by a till that was offline.
+    """
+    return _apply(_merge(lines), -1, not allow_negative, reason, reference)
+
+
+def increment_stock(lines, reason='restock', reference=''):
+    """
+    Return stock to items, e.g. for a cancelled order or a delivery.
+    """
+    return _apply(_merge(lines), 1, False, reason, reference)
@@ -0,0 +1,209 @@
+"""
+Catalog sync for POS terminals.
+
+Each location has a CatalogVersion that is bumped, in the same transaction,
+whenever one of its categories or items is saved, deleted or bulk-written.
+A terminal either downloads the full snapshot of what it can sell (active,
+not hidden items in active, not hidden categories) or, given the
+`next_since` of its previous sync, a delta of what changed since then:
+
+    upserts  categories and items that are visible now and changed since
+    removed  ids of rows that were deleted (CatalogTombstone) or changed
+             since and are no longer visible
+
+Hides are not recorded separately: a hidden item's catalog_updated_at
+moves, so it shows up in `removed` from the row itself. Stock is left out
+of the payload because it changes far more often than the menu and has its
+own endpoints; items are picked on catalog_updated_at rather than
+updated_at, which stock writes move too, so a sale does not re-send them.
+
+The version doubles as the ETag, so a terminal that is up to date gets a
+304 without any catalog query, and the snapshot is serialized to JSON once
+per version and then served from the cache.
+
+`next_since` trails the server clock by OVERLAP_SECONDS: the timestamps
+are set when a row is saved, not when its transaction commits, so a row
+can become visible a moment after a sync that ran past its timestamp. Overlapping
+deltas may repeat a few rows; clients apply upserts and removals
+idempotently.
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import CatalogTombstone, CatalogVersion, Category, Item
+
+DEFAULTS = {
+    'OVERLAP_SECONDS': 2,
+    'TOMBSTONE_RETENTION_DAYS': 30,
+    'CACHE_TIMEOUT': 3600,
+}
+
+CATEGORY_FIELDS = ('id', 'name', 'description')
+ITEM_FIELDS = ('id', 'category_id', 'name', 'barcode', 'price')
+
+VISIBLE_CATEGORY = Q(is_active=True, is_hidden=False)
+VISIBLE_ITEM = Q(is_active=True, is_hidden=False, category__is_active=True, category__is_hidden=False)
+
+
+def sync_setting(name):
+    return getattr(settings, 'CATALOG_SYNC', {}).get(name, DEFAULTS[name])
+
+
+def bump_version(location_id):
+    """
+    Move the location's catalog to a new version. Call inside the
+    transaction that changed the catalog.
+    """
+    updated = CatalogVersion.objects.filter(location_id=location_id).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                CatalogVersion.objects.create(location_id=location_id, version=1)
+        except IntegrityError:
+            # Another writer created it first.
+            CatalogVersion.objects.filter(location_id=location_id).update(
+                version=F('version') + 1, updated_at=timezone.now()
+            )
+
+
+def current_version(location_id):
+    return CatalogVersion.objects.filter(location_id=location_id).values_list('version', flat=True).first() or 0
+
+
+def etag(location_id, version):
+    return f'"catalog-{location_id}-{version}"'
+
+
+def etag_matches(header, tag):
+    """
+    Whether an If-None-Match header value covers `tag`.
+    """
+    if not header:
+        return False
+    tags = [value.strip().removeprefix('W/') for value in header.split(',')]
+    return '*' in tags or tag in tags
+
+
+def add_tombstones(location_id, kind, object_ids):
+    CatalogTombstone.objects.bulk_create([
+        CatalogTombstone(location_id=location_id, kind=kind, object_id=object_id) for object_id in object_ids
+    ])
+
+
+def _category_rows(categories):
+    return list(categories.order_by('id').values(*CATEGORY_FIELDS))
+
+
+def _item_row(row):
+    row['category'] = row.pop('category_id')
+    row['price'] = str(row['price'])
+    return row
+
+
+def _item_rows(items):
+    return [_item_row(row) for row in items.order_by('id').values(*ITEM_FIELDS)]
+
+
+def _next_since(now):
+    return now - timedelta(seconds=sync_setting('OVERLAP_SECONDS'))
+
+
+def snapshot(location_id, version):
+    """
+    The full catalog as JSON bytes, built once per version and cached.
+    `version` must have been read before calling, so the cached data is
+    never older than the version it is filed under.
+    """
+    key = f'inventory:catalog-snapshot:{location_id}:{version}'
+    body = cache.get(key)
+    if body is None:
+        now = timezone.now()
+        body = json.dumps({
+            'success': True,
+            'location': location_id,
+            'version': version,
+            'full': True,
+            'next_since': _next_since(now),
+            'categories': _category_rows(Category.objects.filter(VISIBLE_CATEGORY, location_id=location_id)),
+            'items': _item_rows(Item.objects.filter(VISIBLE_ITEM, category__location_id=location_id)),
+        }, cls=DjangoJSONEncoder).encode()
+        cache.set(key, body, sync_setting('CACHE_TIMEOUT'))
+    return body
+
+
+def can_delta(since, now=None):
+    """
+    Whether tombstones still cover everything deleted after `since`.
+    """
+    now = now or timezone.now()
+    return since >= now - timedelta(days=sync_setting('TOMBSTONE_RETENTION_DAYS'))
+
+
+def delta(location_id, version, since):
+    """
+    What changed at the location after `since`, as a dict.
+    """
+    now = timezone.now()
+    # A location has few categories; reading them all up front lets the
+    # item query run on the (category, catalog_updated_at) index instead of
+    # walking every item of the location through the category join.
+    categories = {}
+    for category_id, is_active, is_hidden, updated_at in Category.objects.filter(
+        location_id=location_id
+    ).values_list('id', 'is_active', 'is_hidden', 'updated_at'):
+        categories[category_id] = (is_active and not is_hidden, updated_at > since)
+
+    # An item changes visibility with its category too, so the items of
+    # every category that changed are sent along with the items that did.
+    changed = Q(catalog_updated_at__gt=since)
+    changed_categories = [category_id for category_id, (_, moved) in categories.items() if moved]
+    if changed_categories:
+        changed |= Q(category_id__in=changed_categories)
+    items, removed_items = [], set()
+    for row in Item.objects.filter(changed, category_id__in=list(categories)).order_by('id').values(
+        *ITEM_FIELDS, 'is_active', 'is_hidden'
+    ):
+        if row.pop('is_active') and not row.pop('is_hidden') and categories[row['category_id']][0]:
+            items.append(row)
+        else:
+            removed_items.add(row['id'])
+
+    removed = {
+        'categories': {category_id for category_id in changed_categories if not categories[category_id][0]},
+        'items': removed_items,
+    }
+    for kind, object_id in CatalogTombstone.objects.filter(
+        location_id=location_id, deleted_at__gt=since
+    ).values_list('kind', 'object_id'):
+        removed['categories' if kind == 'category' else 'items'].add(object_id)
+
+    visible_categories = [category_id for category_id in changed_categories if categories[category_id][0]]
+    return {
+        'success': True,
+        'location': location_id,
+        'version': version,
+        'full': False,
+        'since': since,
+        'next_since': _next_since(now),
+        'categories': _category_rows(Category.objects.filter(id__in=visible_categories)) if visible_categories else [],
+        'items': [_item_row(row) for row in items],
+        'removed': {key: sorted(ids) for key, ids in removed.items()},
+    }
+
+
+def prune_tombstones(older_than=None):
+    """
+    Delete tombstones past the retention window; returns how many.
+    """
+    older_than = older_than or timezone.now() - timedelta(days=sync_setting('TOMBSTONE_RETENTION_DAYS'))
+    deleted, _ = CatalogTombstone.objects.filter(deleted_at__lt=older_than).delete()
+    return deleted
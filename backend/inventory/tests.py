@@ -1,3 +1,695 @@
-from django.test import TestCase
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.models import Location, Store
+from .barcodes import barcode_cache, resolve_barcode, resolve_barcodes
+from .catalog import import_catalog
+from .expiry import next_reset, reset_due_items
+from .ledger import compact, quantity_at, reconcile as reconcile_ledger
+from .search import fallback_search, search_items
+from .lowstock import low_stock, rebuild
+from .models import (
+    CatalogTombstone, CatalogVersion, Category, Item, LowStockItem, StockAlert, StockMovement, StockSnapshot,
+)
+from .signals import stock_changed
+from .stock import InsufficientStock, decrement_stock, increment_stock
+from .sync import current_version, prune_tombstones
+
+User = get_user_model()
+
+
+def create_location(email='owner@example.com'):
+    owner = User.objects.create_user(email=email, password='Str0ng!Passw0rd', role='owner')
+    store = Store.objects.create(
+        name='Main Store', address='Bole', contact_number='+251911234567',
+        registration_number=f'REG-{owner.pk}', owner=owner, admin=owner,
+    )
+    location = Location.objects.create(
+        store=store, name='Front', address='Bole', contact_number='+251911234567'
+    )
+    return owner, location
+
+
+class BarcodeCacheTests(TestCase):
+    def setUp(self):
+        barcode_cache.clear()
+        self.owner, self.location = create_location()
+        self.category = Category.objects.create(location=self.location, name='Drinks')
+        self.item = Item.objects.create(
+            category=self.category, name='Water', price=Decimal('15.00'), barcode='0001', quantity=10
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_warm_lookup_skips_database(self):
+        self.assertEqual(resolve_barcode('0001').name, 'Water')
+        with self.assertNumQueries(0):
+            record = resolve_barcode('0001')
+        self.assertEqual(record.location_id, self.location.id)
+
+    def test_unknown_barcode_is_cached_until_an_item_takes_it(self):
+        self.assertIsNone(resolve_barcode('0002'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolve_barcode('0002'))
+        Item.objects.create(category=self.category, name='Juice', price=Decimal('30.00'), barcode='0002')
+        self.assertEqual(resolve_barcode('0002').name, 'Juice')
+
+    def test_save_invalidates_old_and_new_barcode(self):
+        resolve_barcode('0001')
+        self.item.barcode = '0003'
+        self.item.save()
+        self.assertIsNone(resolve_barcode('0001'))
+        self.assertEqual(resolve_barcode('0003').id, self.item.id)
+
+    def test_delete_invalidates(self):
+        resolve_barcode('0001')
+        self.item.delete()
+        self.assertIsNone(resolve_barcode('0001'))
+
+    def test_bulk_resolve_loads_misses_in_one_query(self):
+        Item.objects.bulk_create([
+            Item(category=self.category, name=f'Item {n}', price=Decimal('1.00'), barcode=f'B{n}')
+            for n in range(20)
+        ])
+        with self.assertNumQueries(1):
+            records = resolve_barcodes([f'B{n}' for n in range(20)] + ['missing'])
+        self.assertEqual(records['B7'].name, 'Item 7')
+        self.assertIsNone(records['missing'])
+
+    def test_endpoints(self):
+        base = f'/api/inventory/locations/{self.location.id}/barcodes/'
+        response = self.client.get(f'{base}0001/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['item']['price'], '15.00')
+        self.assertEqual(self.client.get(f'{base}nope/').status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.post(f'{base}resolve/', {'barcodes': ['0001', 'nope']}, format='json')
+        self.assertEqual(response.data['items']['0001']['id'], self.item.id)
+        self.assertIsNone(response.data['items']['nope'])
+
+    def test_other_stores_items_are_not_found(self):
+        stranger, other_location = create_location('stranger@example.com')
+        resolve_barcode('0001')
+        self.client.force_authenticate(stranger)
+
+        response = self.client.get(f'/api/inventory/locations/{self.location.id}/barcodes/0001/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        base = f'/api/inventory/locations/{other_location.id}/barcodes/'
+        self.assertEqual(self.client.get(f'{base}0001/').status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(f'{base}resolve/', {'barcodes': ['0001']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['items']['0001'])
+
+
+class StockTests(TestCase):
+    def setUp(self):
+        barcode_cache.clear()
+        self.owner, self.location = create_location()
+        category = Category.objects.create(location=self.location, name='Drinks')
+        self.water, self.juice = (
+            Item.objects.create(category=category, name=name, price=Decimal('10.00'), barcode=code, quantity=5)
+            for name, code in (('Water', 'W1'), ('Juice', 'J1'))
+        )
+
+    def quantities(self):
+        return dict(Item.objects.values_list('name', 'quantity'))
+
+    def test_order_is_one_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                decrement_stock([(self.water.id, 2), (self.juice.id, 1), (self.water.id, 1)])
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in queries), 1)
+        self.assertEqual(self.quantities(), {'Water': 2, 'Juice': 4})
+        self.assertIsNotNone(Item.objects.get(id=self.water.id).last_inventory_update)
+
+    def test_short_item_rolls_back_whole_order(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            decrement_stock({self.water.id: 1, self.juice.id: 6, 999999: 1})
+        self.assertEqual(raised.exception.short, {
+            self.juice.id: {'requested': 6, 'available': 5},
+            999999: {'requested': 1, 'available': None},
+        })
+        self.assertEqual(self.quantities(), {'Water': 5, 'Juice': 5})
+
+        # Water can be served on its own; it must not be reported from the
+        # quantity its undone decrement left behind.
+        for vendor in ('sqlite', 'mysql'):
+            with patch('inventory.stock.connection.vendor', vendor):
+                with self.assertRaises(InsufficientStock) as raised:
+                    decrement_stock({self.water.id: 4, self.juice.id: 6})
+            self.assertEqual(raised.exception.short, {self.juice.id: {'requested': 6, 'available': 5}})
+        with transaction.atomic():
+            with self.assertRaises(InsufficientStock) as raised:
+                decrement_stock({self.water.id: 4, self.juice.id: 6})
+            self.assertEqual(raised.exception.short, {self.juice.id: {'requested': 6, 'available': 5}})
+            self.assertEqual(self.quantities(), {'Water': 5, 'Juice': 5})
+
+    def test_large_orders_and_case_fallback(self):
+        category = Category.objects.get(name='Drinks')
+        many = Item.objects.bulk_create([
+            Item(category=category, name=f'Bulk {n}', price=Decimal('1.00'), quantity=3) for n in range(1200)
+        ])
+        decrement_stock({item.id: 2 for item in many})
+        self.assertEqual(set(Item.objects.filter(name__startswith='Bulk').values_list('quantity', flat=True)), {1})
+        # Backends without UPDATE ... FROM get one CASE statement per chunk.
+        with patch('inventory.stock.connection.vendor', 'mysql'):
+            with self.assertRaises(InsufficientStock):
+                decrement_stock({many[0].id: 1, many[-1].id: 2})
+            decrement_stock({item.id: 1 for item in many[:250]})
+        self.assertEqual(Item.objects.filter(name__startswith='Bulk', quantity=0).count(), 250)
+
+    def test_increment_and_signal(self):
+        received = []
+        stock_changed.connect(lambda **kwargs: received.append(kwargs['changes']), weak=False, dispatch_uid='stock-test')
+        self.addCleanup(stock_changed.disconnect, dispatch_uid='stock-test')
+        increment_stock({self.water.id: 3})
+        self.assertEqual(self.quantities()['Water'], 8)
+        self.assertEqual(received, [{self.water.id: 3}])
+
+    def test_cached_quantity_is_dropped_on_commit(self):
+        resolve_barcode('W1')
+        with self.captureOnCommitCallbacks(execute=True):
+            decrement_stock({self.water.id: 2})
+        self.assertEqual(resolve_barcode('W1').quantity, 3)
+
+
+class CatalogImportExportTests(TestCase):
+    def setUp(self):
+        barcode_cache.clear()
+        self.owner, self.location = create_location()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def import_csv(self, text, batch_size=2):
+        return import_catalog(self.location, io.StringIO(text), 'csv', batch_size)
+
+    def test_upsert_on_barcode_with_row_errors(self):
+        report = self.import_csv(
+            'barcode,name,category,price,quantity,is_active,is_hidden\n'
+            'A1,Water,Drinks,15.00,10,true,false\n'
+            'A2,Juice,Drinks,not-a-price,5,true,false\n'
+            ',Bread,Bakery,20,3,yes,no\n'
+            'A1,Water 1L,Drinks,16.50,12,true,false\n'
+        )
+        self.assertEqual((report.rows, report.created, report.updated), (4, 2, 1))
+        self.assertEqual([line for line, _ in report.errors], [3])
+        water = Item.objects.get(barcode='A1')
+        self.assertEqual((water.name, water.price, water.quantity), ('Water 1L', Decimal('16.50'), 12))
+        self.assertEqual(
+            set(Category.objects.filter(location=self.location).values_list('name', flat=True)), {'Drinks', 'Bakery'}
+        )
+
+    def test_batches_are_bulk_writes(self):
+        rows = ''.join(f'B{n},Item {n},Misc,1.00,1,true,false\n' for n in range(10))
+        with CaptureQueriesContext(connection) as queries:
+            self.import_csv('barcode,name,category,price,quantity,is_active,is_hidden\n' + rows, batch_size=5)
+        inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT INTO "inventory_item"')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(Item.objects.count(), 10)
+
+    def test_barcode_of_another_location_is_rejected(self):
+        _, other = create_location('other@example.com')
+        category = Category.objects.create(location=other, name='Other')
+        Item.objects.create(category=category, name='Theirs', price=Decimal('1.00'), barcode='X1')
+        report = self.import_csv('barcode,name,category,price\nX1,Mine,Misc,2.00\n')
+        self.assertEqual(report.updated, 0)
+        self.assertIn('another location', report.errors[0][1])
+        self.assertEqual(Item.objects.get(barcode='X1').name, 'Theirs')
+
+    def test_barcode_taken_since_lookup_fails_only_its_row(self):
+        # Another location's import commits X1 between this batch's lookup
+        # and its INSERT: the row fails instead of taking over their item.
+        _, other = create_location('other@example.com')
+        category = Category.objects.create(location=other, name='Other')
+        Item.objects.create(category=category, name='Theirs', price=Decimal('1.00'), barcode='X1')
+        lookup = Item.objects.filter
+
+        def racing_lookup(*args, **kwargs):
+            items = lookup(*args, **kwargs)
+            return items.exclude(barcode='X1') if 'barcode__in' in kwargs else items
+
+        with patch.object(Item.objects, 'filter', side_effect=racing_lookup):
+            report = self.import_csv('barcode,name,category,price\nM1,Mine,Misc,2.00\nX1,Mine,Misc,2.00\n')
+        self.assertEqual(report.created, 1)
+        self.assertEqual([line for line, _ in report.errors], [3])
+        self.assertEqual(Item.objects.get(barcode='X1').name, 'Theirs')
+        self.assertTrue(Item.objects.filter(barcode='M1', category__location=self.location).exists())
+
+    def test_rejected_batch_is_retried_row_by_row(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TRIGGER reject_bad BEFORE INSERT ON inventory_item WHEN NEW.barcode = 'BAD' "
+                "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+            )
+        report = self.import_csv(
+            'barcode,name,category,price\nR1,One,Misc,1.00\nBAD,Two,Misc,1.00\nR3,Three,Misc,1.00\n', batch_size=5
+        )
+        self.assertEqual((report.created, report.updated), (2, 0))
+        self.assertEqual([line for line, _ in report.errors], [3])
+        self.assertEqual(set(Item.objects.values_list('barcode', flat=True)), {'R1', 'R3'})
+        self.assertEqual(Category.objects.filter(location=self.location, name='Misc').count(), 1)
+
+    def test_negative_quantity_is_rejected(self):
+        report = self.import_csv('barcode,name,category,price,quantity\nN1,Water,Drinks,1.00,-3\n')
+        self.assertEqual(report.created, 0)
+        self.assertIn('quantity', report.errors[0][1])
+
+    def test_import_invalidates_cached_barcode(self):
+        self.assertIsNone(resolve_barcode('C1'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_csv('barcode,name,category,price\nC1,Coffee,Drinks,40.00\n')
+        self.assertEqual(resolve_barcode('C1').name, 'Coffee')
+
+    def test_export_round_trips_through_endpoints(self):
+        self.import_csv('barcode,name,category,price,quantity\nA1,Water,Drinks,15.00,10\n,Bread,Bakery,20.00,3\n')
+        url = f'/api/inventory/locations/{self.location.id}/catalog/'
+        response = self.client.get(url + 'export/?file_format=jsonl')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        exported = b''.join(response.streaming_content)
+        rows = [json.loads(line) for line in exported.decode().splitlines()]
+        self.assertEqual(rows[0], {
+            'barcode': 'A1', 'name': 'Water', 'category': 'Drinks', 'price': '15.00',
+            'quantity': 10, 'is_active': True, 'is_hidden': False,
+        })
+
+        upload = SimpleUploadedFile('catalog.jsonl', exported.replace(b'"quantity": 10', b'"quantity": 7'))
+        response = self.client.post(url + 'import/', {'file': upload, 'file_format': 'jsonl'}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The barcoded row updates in place; the row without one is new.
+        self.assertEqual((response.data['updated'], response.data['created']), (1, 1))
+        self.assertEqual(Item.objects.get(barcode='A1').quantity, 7)
+
+    def test_other_users_location_is_not_found(self):
+        _, other = create_location('other@example.com')
+        response = self.client.get(f'/api/inventory/locations/{other.id}/catalog/export/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ItemSearchTests(TestCase):
+    def setUp(self):
+        self.owner, self.location = create_location()
+        self.drinks = Category.objects.create(location=self.location, name='Drinks')
+        self.bakery = Category.objects.create(location=self.location, name='Bakery')
+        for category, name, barcode, active in (
+            (self.drinks, 'Water Bottle 1L', '5001', True),
+            (self.drinks, 'Sparkling Water', '5002', True),
+            (self.drinks, 'Watermelon Juice', '5003', False),
+            (self.bakery, 'Whole Wheat Bread', '6001', True),
+        ):
+            Item.objects.create(category=category, name=name, barcode=barcode, price=Decimal('10.00'), is_active=active)
+        _, other = create_location('other@example.com')
+        Item.objects.create(
+            category=Category.objects.create(location=other, name='Drinks'), name='Water Bottle 1L',
+            barcode='9001', price=Decimal('10.00'),
+        )
+
+    def names(self, query, **filters):
+        return [row['name'] for row in search_items(self.location.id, query, **filters)]
+
+    def test_prefix_match_ranked_within_location(self):
+        self.assertEqual(set(self.names('wat')), {'Water Bottle 1L', 'Sparkling Water', 'Watermelon Juice'})
+        self.assertEqual(self.names('wat bo'), ['Water Bottle 1L'])
+        self.assertEqual(len(self.names('500')), 3)
+
+    def test_filters(self):
+        self.assertNotIn('Watermelon Juice', self.names('wat', is_active=True))
+        self.assertEqual(self.names('wh', category_id=self.bakery.id), ['Whole Wheat Bread'])
+        self.assertEqual(search_items(self.location.id, 'bread')[0]['price'], Decimal('10.00'))
+
+    def test_index_follows_writes(self):
+        item = Item.objects.get(barcode='6001')
+        item.name = 'Rye Bread'
+        item.save()
+        self.assertEqual(self.names('rye'), ['Rye Bread'])
+        self.assertEqual(self.names('whole'), [])
+        Item.objects.filter(barcode='5001').update(name='Still Water')
+        self.assertEqual(self.names('still'), ['Still Water'])
+        Item.objects.filter(barcode='5002').delete()
+        self.assertEqual(self.names('spark'), [])
+
+    def test_fallback_matches_fts(self):
+        self.assertEqual(
+            {row['name'] for row in fallback_search(self.location.id, ['wat', 'bo'], {}, 20)}, {'Water Bottle 1L'}
+        )
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.get(f'/api/inventory/locations/{self.location.id}/items/search/?q=bread&is_active=true')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['barcode'] for row in response.data['results']], ['6001'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sync-tests'}})
+class CatalogSyncTests(TestCase):
+    def setUp(self):
+        self.owner, self.location = create_location()
+        self.drinks = Category.objects.create(location=self.location, name='Drinks', is_hidden=False)
+        self.water = Item.objects.create(
+            category=self.drinks, name='Water', price=Decimal('15.00'), barcode='S1', is_hidden=False
+        )
+        self.juice = Item.objects.create(
+            category=self.drinks, name='Juice', price=Decimal('30.00'), barcode='S2', is_hidden=False
+        )
+        Item.objects.create(category=self.drinks, name='Secret', price=Decimal('1.00'), barcode='S3')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = f'/api/inventory/locations/{self.location.id}/catalog/sync/'
+
+    def sync(self, **params):
+        headers = {}
+        if 'etag' in params:
+            headers['HTTP_IF_NONE_MATCH'] = params.pop('etag')
+        response = self.client.get(self.url, params, **headers)
+        body = json.loads(response.content) if response.status_code == status.HTTP_200_OK else None
+        return response, body
+
+    def test_snapshot_then_not_modified(self):
+        response, body = self.sync()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(body['full'])
+        self.assertEqual([item['name'] for item in body['items']], ['Water', 'Juice'])
+        self.assertEqual(body['items'][0]['price'], '15.00')
+        self.assertEqual(body['version'], current_version(self.location.id))
+
+        # Served from the cache for the same version, then a bare 304.
+        with self.assertNumQueries(2):
+            self.assertEqual(self.sync()[1], body)
+        with self.assertNumQueries(2):
+            response, _ = self.sync(etag=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changes_bump_version(self):
+        version = current_version(self.location.id)
+        self.water.name = 'Still Water'
+        self.water.save()
+        self.assertEqual(current_version(self.location.id), version + 1)
+        import_catalog(self.location, io.StringIO('barcode,name,category,price\nS9,Tea,Drinks,5.00\n'), 'csv')
+        self.assertEqual(current_version(self.location.id), version + 2)
+        # Stock is not part of the synced catalog.
+        increment_stock([(self.water.id, 5)])
+        self.assertEqual(current_version(self.location.id), version + 2)
+
+    def test_delta_has_upserts_hides_and_deletions(self):
+        response, body = self.sync()
+        since = body['next_since']
+        CatalogTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=1))
+        Item.objects.update(catalog_updated_at=timezone.now() - timedelta(days=1))
+        Category.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+        self.water.price = Decimal('16.00')
+        self.water.save()
+        self.juice.is_hidden = True
+        self.juice.save()
+        gone = Item.objects.create(category=self.drinks, name='Soda', price=Decimal('20.00'), is_hidden=False).pk
+        Item.objects.get(pk=gone).delete()
+
+        response, delta = self.sync(since=since, etag=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(delta['full'])
+        self.assertEqual([(item['id'], item['price']) for item in delta['items']], [(self.water.id, '16.00')])
+        self.assertEqual(delta['removed'], {'categories': [], 'items': sorted([self.juice.id, gone])})
+
+    def test_stock_changes_are_not_resent(self):
+        since = self.sync()[1]['next_since']
+        Item.objects.update(catalog_updated_at=timezone.now() - timedelta(days=1))
+        Category.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+        increment_stock([(self.water.id, 5)])
+        decrement_stock([(self.water.id, 1)])
+        water = Item.objects.get(pk=self.water.pk)
+        water.quantity = 50
+        water.save()
+        delta = self.sync(since=since)[1]
+        self.assertEqual(delta['items'], [])
+        self.assertEqual(delta['removed'], {'categories': [], 'items': []})
+
+        water.name = 'Still Water'
+        water.save(update_fields=['name'])
+        self.assertEqual([item['name'] for item in self.sync(since=since)[1]['items']], ['Still Water'])
+
+    def test_hiding_or_deleting_a_category_removes_its_items(self):
+        since = self.sync()[1]['next_since']
+        self.drinks.is_hidden = True
+        self.drinks.save()
+        delta = self.sync(since=since)[1]
+        self.assertEqual(delta['removed']['categories'], [self.drinks.id])
+        self.assertIn(self.water.id, delta['removed']['items'])
+
+        self.drinks.delete()
+        self.assertEqual(CatalogTombstone.objects.filter(kind='item').count(), 3)
+        self.assertEqual(len(self.sync(since=since)[1]['removed']['items']), 3)
+
+    def test_old_since_gets_full_snapshot_and_tombstones_are_pruned(self):
+        self.juice.delete()
+        old = (timezone.now() - timedelta(days=365)).isoformat()
+        self.assertTrue(self.sync(since=old)[1]['full'])
+        self.assertEqual(self.sync(since='yesterday')[0].status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.sync(since='2026-13-45T00:00')[0].status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(prune_tombstones(timezone.now() + timedelta(seconds=1)), 1)
+
+    def test_location_delete_leaves_nothing_behind(self):
+        self.location.delete()
+        self.assertFalse(CatalogVersion.objects.exists())
+        self.assertFalse(CatalogTombstone.objects.exists())
+
+
+class TemporaryItemResetTests(TestCase):
+    def setUp(self):
+        barcode_cache.clear()
+        _, self.location = create_location()
+        self.category = Category.objects.create(location=self.location, name='Fresh')
+        self.now = timezone.now()
+
+    def create(self, name, quantity=10, **fields):
+        return Item.objects.create(
+            category=self.category, name=name, price=Decimal('5.00'), quantity=quantity, **fields
+        )
+
+    def temporary(self, name, hours, reset_hours_ago, quantity=10):
+        return self.create(
+            name, quantity, is_temporary=True, auto_reset_quantity=True, expiry_hours=hours,
+            last_quantity_reset=self.now - timedelta(hours=reset_hours_ago),
+        )
+
+    def test_schedule_follows_settings(self):
+        item = self.temporary('Injera', hours=24, reset_hours_ago=2)
+        self.assertEqual(item.next_reset_at, item.last_quantity_reset + timedelta(hours=24))
+        item.auto_reset_quantity = False
+        item.save(update_fields=['auto_reset_quantity'])
+        item.refresh_from_db()
+        self.assertIsNone(item.next_reset_at)
+        fresh = self.create('Bread', is_temporary=True, auto_reset_quantity=True, expiry_hours=6)
+        self.assertAlmostEqual(fresh.next_reset_at, fresh.created_at + timedelta(hours=6), delta=timedelta(seconds=1))
+        self.assertIsNone(self.create('Water').next_reset_at)
+
+    def test_resets_only_due_items_grouped_by_expiry(self):
+        due_daily = [self.temporary(f'Daily {n}', 24, 25) for n in range(3)]
+        due_hourly = self.temporary('Hourly', 1, 2, quantity=0)
+        later = self.temporary('Later', 24, 1)
+        plain = self.create('Plain')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(reset_due_items(self.now), 4)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "inventory_item"')]
+        self.assertEqual(len(updates), 2)
+
+        for item in due_daily:
+            item.refresh_from_db()
+            self.assertEqual((item.quantity, item.last_quantity_reset), (0, self.now))
+            self.assertEqual(item.next_reset_at, self.now + timedelta(hours=24))
+        due_hourly.refresh_from_db()
+        self.assertEqual(due_hourly.next_reset_at, self.now + timedelta(hours=1))
+        self.assertEqual(Item.objects.get(pk=later.pk).quantity, 10)
+        self.assertEqual(Item.objects.get(pk=plain.pk).quantity, 10)
+        self.assertEqual(reset_due_items(self.now), 0)
+        self.assertEqual(next_reset(), self.now + timedelta(hours=1))
+
+    def test_reset_reports_stock_change_in_batches(self):
+        items = [self.temporary(f'Item {n}', 24, 25, quantity=n + 1) for n in range(5)]
+        received = []
+
+        def receiver(sender, changes, **kwargs):
+            received.append(changes)
+
+        stock_changed.connect(receiver)
+        try:
+            self.assertEqual(reset_due_items(self.now, batch_size=2), 5)
+        finally:
+            stock_changed.disconnect(receiver)
+        self.assertEqual(len(received), 3)
+        self.assertEqual(
+            {item_id: delta for changes in received for item_id, delta in changes.items()},
+            {item.id: -(n + 1) for n, item in enumerate(items)},
+        )
+
+    def test_due_scan_uses_the_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN QUERY PLAN SELECT id FROM inventory_item WHERE next_reset_at <= %s ORDER BY next_reset_at',
+                [self.now],
+            )
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('idx_item_next_reset', plan)
+
+
+class LowStockTests(TestCase):
+    def setUp(self):
+        self.owner, self.location = create_location()
+        self.category = Category.objects.create(location=self.location, name='Drinks', reorder_level=5)
+        self.water = Item.objects.create(category=self.category, name='Water', price=Decimal('15.00'), quantity=10)
+        self.juice = Item.objects.create(
+            category=self.category, name='Juice', price=Decimal('30.00'), quantity=10, reorder_level=2
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = f'/api/inventory/locations/{self.location.id}/'
+
+    def alerts(self):
+        return list(StockAlert.objects.order_by('id').values_list('item_id', 'kind', 'quantity'))
+
+    def test_crossing_the_level_both_ways(self):
+        decrement_stock({self.water.id: 4})
+        self.assertFalse(LowStockItem.objects.exists())
+        decrement_stock({self.water.id: 1, self.juice.id: 7})
+        self.assertEqual([row['item_id'] for row in low_stock(self.location.id)], [self.water.id])
+        decrement_stock({self.water.id: 2})
+        self.assertEqual(LowStockItem.objects.get().quantity, 3)
+        increment_stock({self.water.id: 10})
+        self.assertFalse(LowStockItem.objects.exists())
+        self.assertEqual(self.alerts(), [(self.water.id, 'low', 5), (self.water.id, 'restocked', 13)])
+
+    def test_stock_change_on_items_far_from_level_does_not_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            decrement_stock({self.water.id: 1})
+        writes = [query['sql'] for query in queries if 'low' in query['sql'].lower() and 'SELECT' not in query['sql']]
+        self.assertEqual(writes, [])
+
+    def test_level_changes_reconcile(self):
+        self.category.reorder_level = 10
+        self.category.save()
+        self.assertEqual(list(LowStockItem.objects.values_list('item_id', flat=True)), [self.water.id])
+        self.water.reorder_level = 1
+        self.water.save()
+        self.assertFalse(LowStockItem.objects.exists())
+        self.water.reorder_level = None
+        self.water.is_active = False
+        self.water.save()
+        self.assertFalse(LowStockItem.objects.exists())
+
+    def test_rebuild_and_import(self):
+        Item.objects.filter(pk=self.water.pk).update(quantity=1)
+        self.assertEqual(rebuild(self.location.id), 1)
+        import_catalog(self.location, io.StringIO('name,category,price,quantity\nSoda,Drinks,5.00,3\n'), 'csv')
+        self.assertEqual(len(low_stock(self.location.id)), 2)
+
+    def test_endpoints(self):
+        response = self.client.post(
+            self.url + 'reorder-levels/', {'items': {str(self.juice.id): 20}, 'categories': {}}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['name'] for row in response.data['low_stock']], ['Juice'])
+
+        response = self.client.get(self.url + 'stock-alerts/')
+        self.assertEqual([alert['kind'] for alert in response.data['alerts']], ['low'])
+        last = response.data['last_id']
+        self.assertEqual(self.client.get(self.url + f'stock-alerts/?after={last}').data['alerts'], [])
+        self.assertEqual(len(self.client.get(self.url + 'low-stock/').data['items']), 1)
+
+        _, other = create_location('other@example.com')
+        theirs = Item.objects.create(
+            category=Category.objects.create(location=other, name='X'), name='Theirs', price=Decimal('1.00')
+        )
+        response = self.client.post(self.url + 'reorder-levels/', {'items': {str(theirs.id): 1}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(self.url + 'reorder-levels/', {'items': {str(self.juice.id): -1}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.owner, self.location = create_location()
+        self.category = Category.objects.create(location=self.location, name='Drinks')
+        self.item = Item.objects.create(category=self.category, name='Water', price=Decimal('15.00'), quantity=10)
+
+    def ledger(self):
+        return list(StockMovement.objects.filter(item=self.item).order_by('id').values_list('delta', 'reason'))
+
+    def backdate(self, hours):
+        StockMovement.objects.filter(created_at__gt=timezone.now() - timedelta(minutes=1)).update(
+            created_at=timezone.now() - timedelta(hours=hours)
+        )
+
+    def test_every_path_is_recorded(self):
+        decrement_stock({self.item.id: 3}, reference='ORD-1')
+        increment_stock({self.item.id: 5})
+        self.item.refresh_from_db()
+        self.item.quantity = 20
+        self.item.save()
+        import_catalog(self.location, io.StringIO('name,category,price,quantity\nJuice,Drinks,5.00,4\n'), 'csv')
+        self.assertEqual(
+            self.ledger(), [(10, 'adjustment'), (-3, 'sale'), (5, 'restock'), (8, 'adjustment')]
+        )
+        self.assertEqual(StockMovement.objects.get(delta=-3).reference, 'ORD-1')
+        self.assertEqual(StockMovement.objects.filter(reason='import').get().delta, 4)
+        self.assertEqual(reconcile_ledger(), {})
+
+    def test_one_insert_per_stock_change(self):
+        other = Item.objects.create(category=self.category, name='Juice', price=Decimal('5.00'), quantity=10)
+        with CaptureQueriesContext(connection) as queries:
+            decrement_stock({self.item.id: 1, other.id: 2})
+        inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT INTO "inventory_stockmovement"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_quantity_at_uses_snapshot_and_tail(self):
+        self.backdate(48)
+        decrement_stock({self.item.id: 2})
+        self.backdate(30)
+        self.assertEqual(compact(), 1)
+        self.assertEqual(StockSnapshot.objects.get().quantity, 8)
+        decrement_stock({self.item.id: 3})
+        self.backdate(10)
+        decrement_stock({self.item.id: 1})
+        self.assertEqual(compact(), 1)
+        self.assertEqual(compact(), 0)
+
+        now = timezone.now()
+        self.assertEqual(quantity_at(self.item.id, now - timedelta(hours=72)), 0)
+        self.assertEqual(quantity_at(self.item.id, now - timedelta(hours=40)), 10)
+        self.assertEqual(quantity_at(self.item.id, now - timedelta(hours=20)), 8)
+        self.assertEqual(quantity_at(self.item.id, now - timedelta(hours=5)), 5)
+        self.assertEqual(quantity_at(self.item.id, now), 4)
+        with self.assertNumQueries(2):
+            quantity_at(self.item.id, now - timedelta(hours=5))
+
+    def test_reconcile_records_drift(self):
+        Item.objects.filter(pk=self.item.pk).update(quantity=25)
+        self.assertEqual(reconcile_ledger(), {self.item.id: 15})
+        self.assertEqual(quantity_at(self.item.id, timezone.now()), 25)
+
+    def test_endpoint(self):
+        decrement_stock({self.item.id: 4})
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        url = f'/api/inventory/locations/{self.location.id}/items/{self.item.id}/movements/'
+        response = client.get(url, {'at': timezone.now().isoformat(), 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['delta'] for row in response.data['movements']], [-4])
+        self.assertEqual(response.data['quantity_at']['quantity'], 6)
+        response = client.get(url, {'before': response.data['movements'][0]['id']})
+        self.assertEqual([row['reason'] for row in response.data['movements']], ['adjustment'])
+        for at in ('yesterday', '2026-13-45T00:00'):
+            self.assertEqual(client.get(url, {'at': at}).status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,30 @@
+from django.urls import path
+
+from .views import (
+    BarcodeLookupView,
+    BarcodeResolveView,
+    CatalogExportView,
+    CatalogImportView,
+    CatalogSyncView,
+    ItemSearchView,
+    LowStockView,
+    ReorderLevelView,
+    StockAlertListView,
+    StockMovementListView,
+)
+
+urlpatterns = [
+    path('locations/<int:location_id>/barcodes/resolve/', BarcodeResolveView.as_view(), name='barcode_resolve'),
+    path('locations/<int:location_id>/barcodes/<str:barcode>/', BarcodeLookupView.as_view(), name='barcode_lookup'),
+    path('locations/<int:location_id>/catalog/import/', CatalogImportView.as_view(), name='catalog_import'),
+    path('locations/<int:location_id>/catalog/export/', CatalogExportView.as_view(), name='catalog_export'),
+    path('locations/<int:location_id>/catalog/sync/', CatalogSyncView.as_view(), name='catalog_sync'),
+    path('locations/<int:location_id>/items/search/', ItemSearchView.as_view(), name='item_search'),
+    path(
+        'locations/<int:location_id>/items/<int:item_id>/movements/',
+        StockMovementListView.as_view(), name='stock_movements',
+    ),
+    path('locations/<int:location_id>/low-stock/', LowStockView.as_view(), name='low_stock'),
+    path('locations/<int:location_id>/reorder-levels/', ReorderLevelView.as_view(), name='reorder_levels'),
+    path('locations/<int:location_id>/stock-alerts/', StockAlertListView.as_view(), name='stock_alerts'),
+]
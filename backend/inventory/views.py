@@ -1,3 +1,435 @@
-from django.shortcuts import render
+import io
 
-# Create your views here.
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from authentication.views import format_error_response
+from pos.views import get_pos_location_or_404
+from store.models import Location
+from .barcodes import record_data, resolve_barcode, resolve_barcodes
+from .catalog import DEFAULT_BATCH_SIZE, FORMATS, export_catalog, import_catalog
+from .ledger import quantity_at
+from .lowstock import low_stock, reconcile
+from .models import Category, Item, StockAlert, StockMovement
+from .search import MAX_LIMIT, search_items
+from .sync import can_delta, current_version, delta, etag, etag_matches, snapshot
+
+
+def get_location_or_404(user, location_id):
+    """
+    The location, if the user owns or administers its store (or is staff).
+    """
+    locations = Location.objects.select_related('store')
+    if not user.is_staff:
+        locations = locations.filter(Q(store__owner=user) | Q(store__admin=user))
+    try:
+        return locations.get(pk=location_id)
+    except Location.DoesNotExist:
+        raise Http404('Location not found')
+
+
+class BarcodeLookupView(APIView):
+    """
+    Look up a barcode at a location the user may run a till at. Items of
+    other locations are not found.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, location_id, barcode):
+        try:
+            location_id, _ = get_pos_location_or_404(request.user, location_id)
+            record = resolve_barcode(barcode)
+            if record is None or record.location_id != location_id:
+                return Response(
+                    format_error_response('No item with this barcode'),
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return Response({'success': True, 'item': record_data(record)}, status=status.HTTP_200_OK)
+        except Http404:
+            raise
+        except Exception as e:
+            return Response(
+                format_error_response('Barcode lookup failed', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class BarcodeResolveView(APIView):
+    """
+    Resolve many barcodes at once at a location: {"barcodes": [...]}
+    returns an `items` map with null for codes that match no item there.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_BARCODES = 1000
+
+    def post(self, request, location_id):
+        try:
+            location_id, _ = get_pos_location_or_404(request.user, location_id)
+            barcodes = request.data.get('barcodes')
+            if not isinstance(barcodes, list) or not all(isinstance(code, str) for code in barcodes):
+                return Response(
+                    format_error_response('barcodes must be a list of strings'),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if len(barcodes) > self.MAX_BARCODES:
+                return Response(
+                    format_error_response(f'At most {self.MAX_BARCODES} barcodes per request'),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            records = resolve_barcodes(barcodes)
+            return Response({
+                'success': True,
+                'items': {
+                    barcode: record_data(record) if record and record.location_id == location_id else None
+                    for barcode, record in records.items()
+                }
+            }, status=status.HTTP_200_OK)
+        except Http404:
+            raise
+        except Exception as e:
+            return Response(
+                format_error_response('Barcode lookup failed', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class CatalogImportView(APIView):
+    """
+    Upload a CSV or JSONL file as `file` (with `file_format`, default csv,
+    and an optional `batch_size`). Rows are upserted on barcode; rows that fail
+    are listed in the response and do not stop the import.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+    MAX_BATCH_SIZE = 5000
+
+    def post(self, request, location_id):
+        try:
+            location = get_location_or_404(request.user, location_id)
+            upload = request.FILES.get('file')
+            fmt = request.data.get('file_format', 'csv')
+            if upload is None:
+                return Response(format_error_response('No file uploaded'), status=status.HTTP_400_BAD_REQUEST)
+            if fmt not in FORMATS:
+                return Response(
+                    format_error_response(f"file_format must be one of {', '.join(FORMATS)}"),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                batch_size = int(request.data.get('batch_size', DEFAULT_BATCH_SIZE))
+            except ValueError:
+                batch_size = 0
+            if not 1 <= batch_size <= self.MAX_BATCH_SIZE:
+                return Response(
+                    format_error_response(f'batch_size must be between 1 and {self.MAX_BATCH_SIZE}'),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            report = import_catalog(location, stream, fmt, batch_size)
+            return Response({'success': True, **report.as_dict()}, status=status.HTTP_200_OK)
+        except Http404:
+            raise
+        except Exception as e:
+            return Response(
+                format_error_response('Catalog import failed', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class CatalogExportView(APIView):
+    """
+    Stream the location's items as CSV or JSONL (`?file_format=`; DRF
+    reserves `format`), in the columns the import accepts.
+    """
+    permission_classes = [IsAuthenticated]
+    CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+    def get(self, request, location_id):
+        location = get_location_or_404(request.user, location_id)
+        fmt = request.query_params.get('file_format', 'csv')
+        if fmt not in FORMATS:
+            return Response(
+                format_error_response(f"file_format must be one of {', '.join(FORMATS)}"),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        response = StreamingHttpResponse(export_catalog(location, fmt), content_type=self.CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="catalog-{location.pk}.{fmt}"'
+        return response
+
+
+class ItemSearchView(APIView):
+    """
+    Typeahead search: ?q=wat bo matches items whose name (or barcode) has
+    words starting with "wat" and "bo". Optional filters: category,
+    is_active, is_hidden; `limit` up to 100.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, location_id):
+        location = get_location_or_404(request.user, location_id)
+        params = request.query_params
+        try:
+            filters = {
+                'category_id': int(params['category']) if params.get('category') else None,
+                'is_active': self.parse_bool(params.get('is_active')),
+                'is_hidden': self.parse_bool(params.get('is_hidden')),
+                'limit': int(params.get('limit', 20)),
+            }
+        except ValueError as e:
+            return Response(format_error_response('Invalid query parameters', str(e)), status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= filters['limit'] <= MAX_LIMIT:
+            return Response(
+                format_error_response(f'limit must be between 1 and {MAX_LIMIT}'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            results = search_items(location.pk, params.get('q', ''), **filters)
+            return Response({'success': True, 'results': results}, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response(
+                format_error_response('Item search failed', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @staticmethod
+    def parse_bool(value):
+        if value in (None, ''):
+            return None
+        if value.lower() in ('true', '1'):
+            return True
+        if value.lower() in ('false', '0'):
+            return False
+        raise ValueError(f'expected true or false, got {value!r}')
+
+
+class CatalogSyncView(APIView):
+    """
+    The location's sellable catalog for POS terminals. Without `since` the
+    full snapshot is returned; with `since` (the `next_since` of the last
+    sync) only what changed, plus the ids to remove. Send the ETag back in
+    If-None-Match to get a 304 when nothing has changed.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, location_id):
+        location = get_location_or_404(request.user, location_id)
+        since = request.query_params.get('since')
+        if since:
+            try:
+                parsed = parse_datetime(since)
+            except ValueError:
+                # Well formed but out of range, e.g. month 13.
+                parsed = None
+            if parsed is None:
+                return Response(
+                    format_error_response('since must be an ISO 8601 timestamp'),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            since = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+        try:
+            version = current_version(location.pk)
+            tag = etag(location.pk, version)
+            if etag_matches(request.headers.get('If-None-Match'), tag):
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            elif since and can_delta(since):
+                response = Response(delta(location.pk, version, since), status=status.HTTP_200_OK)
+            else:
+                # Served as stored; going through the renderer would
+                # serialize the snapshot again on every request.
+                response = HttpResponse(snapshot(location.pk, version), content_type='application/json')
+            response['ETag'] = tag
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+        except Exception as e:
+            return Response(
+                format_error_response('Catalog sync failed', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class LowStockView(APIView):
+    """
+    Items at the location at or below their reorder level, lowest
+    quantity first.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, location_id):
+        location = get_location_or_404(request.user, location_id)
+        try:
+            return Response({'success': True, 'items': low_stock(location.pk)}, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response(
+                format_error_response('Failed to load low stock', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class StockAlertListView(APIView):
+    """
+    Reorder-level crossings at the location, oldest first. Poll with
+    ?after=<id of the last alert seen> to get only new ones.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_LIMIT = 500
+
+    def get(self, request, location_id):
+        location = get_location_or_404(request.user, location_id)
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = int(request.query_params.get('limit', 100))
+        except ValueError:
+            return Response(
+                format_error_response('after and limit must be integers'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= limit <= self.MAX_LIMIT:
+            return Response(
+                format_error_response(f'limit must be between 1 and {self.MAX_LIMIT}'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        alerts = list(
+            StockAlert.objects.filter(location=location, id__gt=after).order_by('id')
+            .values('id', 'item_id', 'kind', 'quantity', 'reorder_level', 'created_at')[:limit]
+        )
+        return Response({
+            'success': True,
+            'alerts': alerts,
+            'last_id': alerts[-1]['id'] if alerts else after,
+        }, status=status.HTTP_200_OK)
+
+
+class ReorderLevelView(APIView):
+    """
+    Set reorder levels in bulk: {"categories": {id: level}, "items": {id:
+    level}}, where null clears an item's own level so its category's
+    applies.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, location_id):
+        location = get_location_or_404(request.user, location_id)
+        try:
+            categories = self.parse_levels(request.data.get('categories', {}))
+            items = self.parse_levels(request.data.get('items', {}))
+        except ValueError as e:
+            return Response(format_error_response('Invalid reorder levels', str(e)), status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                found_categories = Category.objects.filter(location=location, id__in=categories)
+                found_items = Item.objects.filter(category__location=location, id__in=items)
+                missing = (set(categories) - set(found_categories.values_list('id', flat=True))) | (
+                    set(items) - set(found_items.values_list('id', flat=True))
+                )
+                if missing:
+                    return Response(
+                        format_error_response('Not found at this location', {'ids': sorted(missing)}),
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+                # Categories are few and saved one by one, so their items are
+                # reconciled by the post_save receiver. Items are updated per
+                # distinct level and reconciled together.
+                for category in found_categories:
+                    category.reorder_level = categories[category.pk]
+                    category.save(update_fields=['reorder_level', 'updated_at'])
+                by_level = {}
+                for item_id, level in items.items():
+                    by_level.setdefault(level, []).append(item_id)
+                for level, item_ids in by_level.items():
+                    Item.objects.filter(pk__in=item_ids).update(reorder_level=level)
+                reconcile(items)
+            return Response({'success': True, 'low_stock': low_stock(location.pk)}, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response(
+                format_error_response('Failed to update reorder levels', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @staticmethod
+    def parse_levels(value):
+        if not isinstance(value, dict):
+            raise ValueError('expected an object of id: level')
+        levels = {}
+        for key, level in value.items():
+            if level is not None and (not isinstance(level, int) or isinstance(level, bool) or level < 0):
+                raise ValueError(f'{key}: level must be a non-negative integer or null')
+            try:
+                levels[int(key)] = level
+            except ValueError:
+                raise ValueError(f'{key}: not an id')
+        return levels
+
+
+class StockMovementListView(APIView):
+    """
+    An item's stock ledger, newest first; page back with ?before=<id of
+    the oldest movement seen>. With ?at=<ISO 8601 time> the response also
+    has the item's quantity as of then.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_LIMIT = 500
+
+    def get(self, request, location_id, item_id):
+        location = get_location_or_404(request.user, location_id)
+        if not Item.objects.filter(pk=item_id, category__location=location).exists():
+            raise Http404('Item not found')
+        params = request.query_params
+        try:
+            before = int(params['before']) if params.get('before') else None
+            limit = int(params.get('limit', 100))
+        except ValueError:
+            return Response(
+                format_error_response('before and limit must be integers'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= limit <= self.MAX_LIMIT:
+            return Response(
+                format_error_response(f'limit must be between 1 and {self.MAX_LIMIT}'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        at = None
+        if params.get('at'):
+            try:
+                at = parse_datetime(params['at'])
+            except ValueError:
+                at = None
+            if at is None:
+                return Response(
+                    format_error_response('at must be an ISO 8601 timestamp'),
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        try:
+            movements = StockMovement.objects.filter(item_id=item_id)
+            if before is not None:
+                movements = movements.filter(id__lt=before)
+            data = {
+                'success': True,
+                'movements': list(
+                    movements.order_by('-id').values('id', 'delta', 'reason', 'reference', 'created_at')[:limit]
+                ),
+            }
+            if at is not None:
+                data['quantity_at'] = {'at': at, 'quantity': quantity_at(item_id, at)}
+            return Response(data, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response(
+                format_error_response('Failed to load stock movements', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -1,3 +1,63 @@
 from django.contrib import admin
 
-# Register your models here.
+from .history import history
+from .models import Order, OrderHistory, OrderItem
+
+
+class OrderItemInline(admin.TabularInline):
+    # Read-only: editing a line here would not move stock. Rows are
+    # labelled with str(order_item), which reads the item, so it is joined
+    # in rather than fetched per row.
+    model = OrderItem
+    fields = readonly_fields = ('item', 'quantity', 'unit_price', 'subtotal')
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('item')
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    # Location.__str__ reads its store, so it is joined into the list; the
+    # foreign keys are raw ids rather than <select>s that would list every
+    # location, user and employee.
+    list_display = (
+        'id', 'order_number', 'location', 'employee', 'status', 'payment_status', 'total_amount', 'order_date',
+    )
+    list_filter = ('status', 'payment_status')
+    list_select_related = ('location__store', 'employee')
+    search_fields = ('order_number',)
+    raw_id_fields = ('store', 'location', 'user', 'employee')
+    inlines = [OrderItemInline]
+
+    def save_model(self, request, obj, form, change):
+        obj.changed_by = request.user
+        super().save_model(request, obj, form, change)
+        # The change view runs in a transaction; write the history in it.
+        history.flush()
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order', 'item', 'quantity', 'unit_price', 'subtotal')
+    list_select_related = ('order', 'item')
+    raw_id_fields = ('order', 'item')
+
+
+@admin.register(OrderHistory)
+class OrderHistoryAdmin(admin.ModelAdmin):
+    # Read-only: history is appended by order/history.py.
+    list_display = ('id', 'order', 'action', 'previous_status', 'new_status', 'user', 'created_at')
+    list_filter = ('action',)
+    list_select_related = ('order', 'user')
+    raw_id_fields = ('order', 'user')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
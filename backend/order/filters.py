@@ -0,0 +1,20 @@
+import django_filters
+
+from .models import Order
+
+
+class OrderFilter(django_filters.FilterSet):
+    """
+    Filters in the column order of idx_order_lookup (store, location,
+    status, order_date). Ids are plain numbers rather than model choices,
+    which would cost a query each to validate.
+    """
+    store = django_filters.NumberFilter(field_name='store_id')
+    location = django_filters.NumberFilter(field_name='location_id')
+    employee = django_filters.NumberFilter(field_name='employee_id')
+    date_from = django_filters.IsoDateTimeFilter(field_name='order_date', lookup_expr='gte')
+    date_to = django_filters.IsoDateTimeFilter(field_name='order_date', lookup_expr='lt')
+
+    class Meta:
+        model = Order
+        fields = ['store', 'location', 'status', 'payment_status', 'employee']
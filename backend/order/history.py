@@ -0,0 +1,162 @@
+"""
+Order history: an OrderHistory row for every order created and every
+change of its status or payment status.
+
+Events are captured by the Order post_save receiver (and, for orders
+written with bulk_create, by record_created()) but not written there.
+Inside a transaction they are buffered and written together, in one
+multi-row INSERT:
+
+- by flush(), which writers call at the end of their transaction so the
+  events commit with the change: checkout, offline ingestion and the
+  admin;
+- when a transaction has buffered BATCH_SIZE events, to bound memory;
+- otherwise right after the transaction commits, from an on_commit
+  callback.
+
+Only flushed events are durable at commit. Django has no hook that runs
+just before COMMIT, so the on_commit fallback writes in a transaction of
+its own after the change has committed, and a process that dies in
+between loses those events. The same holds for a change made outside a
+transaction: it is already committed, and its event is written just
+after it. Writers whose history must not be lost call flush().
+
+Events recorded in a transaction or savepoint that is rolled back are
+dropped with it: a buffered batch belongs to the savepoint it was
+recorded in and lives exactly as long as its on_commit callback, which
+Django discards on rollback. flush() only writes the batches of the
+current savepoint (and of inner ones already released into it), never
+those of an enclosing one, which could otherwise be written inside a
+savepoint that is then rolled back while their change commits.
+"""
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import OrderHistory
+
+DEFAULTS = {
+    'BATCH_SIZE': 500,
+}
+
+
+def history_setting(name):
+    return getattr(settings, 'ORDER_HISTORY', {}).get(name, DEFAULTS[name])
+
+
+def _user_id(user):
+    return getattr(user, 'pk', user)
+
+
+def changes(order, created):
+    """
+    (action, previous, new) for each change a save of `order` made.
+    Orders not loaded from the database have no known previous statuses.
+    """
+    if created:
+        return [('created', None, order.status)]
+    events = []
+    if order.loaded_status is not None and order.status != order.loaded_status:
+        events.append(('status_changed', order.loaded_status, order.status))
+    if order.loaded_payment_status is not None and order.payment_status != order.loaded_payment_status:
+        events.append(('payment_status_changed', order.loaded_payment_status, order.payment_status))
+    return events
+
+
+class HistoryBuffer:
+    """
+    Buffers the events of each transaction until it is flushed or
+    commits. Each thread has its own database connection, and so its own
+    buffer.
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size
+        self._local = threading.local()
+
+    def _batches(self):
+        # [events, on_commit callback, savepoint ids] per savepoint events
+        # were recorded in. Batches whose callback is no longer pending were
+        # rolled back (or have already been written) and are dropped.
+        batches = getattr(self._local, 'batches', None)
+        if batches is None:
+            batches = self._local.batches = []
+        pending = [func for _, func, _ in connection.run_on_commit]
+        batches[:] = [batch for batch in batches if any(func is batch[1] for func in pending)]
+        return batches
+
+    def add(self, events):
+        if not events:
+            return
+        if not connection.in_atomic_block:
+            self._write(events)
+            return
+        batches = self._batches()
+        savepoints = set(connection.savepoint_ids)
+        if not batches or batches[-1][2] != savepoints:
+            batch = [[], None, savepoints]
+            batch[1] = partial(self._commit, batch)
+            transaction.on_commit(batch[1])
+            batches.append(batch)
+        batches[-1][0].extend(events)
+        if sum(len(batch[0]) for batch in batches) >= (self.batch_size or history_setting('BATCH_SIZE')):
+            self.flush()
+
+    def flush(self):
+        """
+        Write the events buffered at the current savepoint level now, in
+        the current transaction. Events of enclosing levels wait for a
+        flush at their level or for the commit.
+        """
+        if not connection.in_atomic_block:
+            return
+        current = set(connection.savepoint_ids)
+        events = []
+        for batch in self._batches():
+            if batch[2] >= current:
+                events += batch[0]
+                batch[0] = []
+        self._write(events)
+
+    def _commit(self, batch):
+        events, batch[0] = batch[0], []
+        self._write(events)
+
+    def _write(self, events):
+        if events:
+            OrderHistory.objects.bulk_create(events, batch_size=self.batch_size or history_setting('BATCH_SIZE'))
+
+
+history = HistoryBuffer()
+
+
+def _events(order, created):
+    user_id = _user_id(order.changed_by) or order.user_id
+    events = [
+        OrderHistory(
+            order_id=order.pk, user_id=user_id, action=action,
+            previous_status=previous, new_status=new, notes=order.change_notes,
+        )
+        for action, previous, new in changes(order, created)
+    ]
+    order.loaded_status = order.status
+    order.loaded_payment_status = order.payment_status
+    return events
+
+
+def record(order, created=False):
+    """
+    Buffer the events of a save of `order`. The user is order.changed_by
+    (an id or a user), falling back to the order's own user.
+    """
+    history.add(_events(order, created))
+
+
+def record_created(orders):
+    """
+    Buffer the creation of orders written with bulk_create, which sends
+    no post_save.
+    """
+    history.add([event for order in orders for event in _events(order, True)])
@@ -0,0 +1,95 @@
+import random
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from backend.benchmark import measure, scratch_database, summarize
+from employees.models import Employee
+from order import history as order_history
+from order.models import Order, OrderHistory
+from store.models import Location, Store
+
+
+class Command(BaseCommand):
+    help = (
+        'Time a transaction that changes the status of many orders with a '
+        'history row written per change versus the buffered writer, then the '
+        'timeline query for one order among many. Runs against a scratch '
+        'database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=500, help='Orders changed per transaction.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--history-orders', type=int, default=20000, help='Orders in the timeline table.')
+        parser.add_argument('--events', type=int, default=5, help='History events per order.')
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(**options)
+
+    def run(self, orders, repeat, history_orders, events, **options):
+        owner = CustomUser.objects.create_user(email='bench@example.com', role='owner')
+        store = Store.objects.create(
+            name='Bench', address='-', contact_number='+251911234567',
+            registration_number='BENCH', owner=owner, admin=owner,
+        )
+        location = Location.objects.create(store=store, name='Bench', address='-', contact_number='+251911234567')
+        employee = Employee.objects.create(
+            store=store, location=location, full_name='Cashier', phone='+251911000001', position='Cashier',
+            email='cashier@example.com', hire_date=timezone.localdate(), salary=Decimal('1000.00'),
+            employment_status='full_time',
+        )
+        now = timezone.now()
+        Order.objects.bulk_create([
+            Order(
+                store=store, location=location, user=owner, employee=employee, order_date=now,
+                status='completed', total_amount=Decimal('10.00'), payment_status='paid',
+            )
+            for _ in range(max(orders, history_orders))
+        ], batch_size=500)
+
+        ids = list(Order.objects.order_by('id').values_list('id', flat=True)[:orders])
+        statuses = ['refunded', 'completed']
+
+        def change_all():
+            # Alternates refunded and completed so every save is a change.
+            statuses.reverse()
+            with transaction.atomic():
+                for order in Order.objects.filter(id__in=ids):
+                    order.status = statuses[0]
+                    order.save(update_fields=['status', 'updated_at'])
+
+        self.stdout.write(f'{orders} status changes in one transaction')
+        for label, buffer in (
+            ('row per change', order_history.HistoryBuffer(batch_size=1)),
+            ('buffered', order_history.HistoryBuffer()),
+        ):
+            with mock.patch.object(order_history, 'history', buffer):
+                change_all()
+                stats = summarize(measure(change_all, repeat))
+            self.stdout.write(
+                f"  {label:<15} mean {stats['mean']:7.1f}ms  p50 {stats['p50']:7.1f}ms  p99 {stats['p99']:7.1f}ms"
+            )
+
+        OrderHistory.objects.all().delete()
+        all_ids = list(Order.objects.values_list('id', flat=True))
+        rows = [
+            OrderHistory(order_id=order_id, user=owner, action='status_changed', previous_status='completed',
+                         new_status='refunded', created_at=now)
+            for _ in range(events) for order_id in all_ids
+        ]
+        OrderHistory.objects.bulk_create(rows, batch_size=500)
+        timeline = OrderHistory.objects.select_related('user').order_by('created_at', 'id')
+        with connection.cursor() as cursor:
+            sql, params = timeline.filter(order_id=all_ids[0]).query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}' if connection.vendor == 'sqlite' else f'EXPLAIN {sql}', params)
+            plan = ' / '.join(str(row[-1]) for row in cursor.fetchall())
+        stats = summarize(measure(lambda: list(timeline.filter(order_id=random.choice(all_ids))), repeat * 10))
+        self.stdout.write(f'timeline of one order among {len(all_ids)} ({len(rows)} events)')
+        self.stdout.write(f"  mean {stats['mean']:.2f}ms  p99 {stats['p99']:.2f}ms")
+        self.stdout.write(f'  plan: {plan}')
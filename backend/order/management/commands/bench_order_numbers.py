@@ -0,0 +1,87 @@
+import threading
+import time
+from datetime import date
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from authentication.models import CustomUser
+from backend.benchmark import scratch_database
+from order.numbers import NumberAllocator, reserve
+from store.models import Location, Store
+
+DAY = date(2026, 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run several workers numbering orders for one location concurrently, '
+        'each with its own allocator as separate processes would, and check '
+        'that no number is handed out twice. Compares one sequence write per '
+        'order with block reservation. Runs against a scratch SQLite file '
+        'database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=500, help='Numbers per worker.')
+        parser.add_argument('--block-sizes', type=int, nargs='+', default=[1, 20, 100])
+
+    def handle(self, *args, **options):
+        options_dict = settings.DATABASES['default'].setdefault('OPTIONS', {})
+        saved = dict(options_dict)
+        if connection.vendor == 'sqlite':
+            # Take the write lock at BEGIN and wait for it instead of failing fast.
+            options_dict.update({'transaction_mode': 'IMMEDIATE', 'timeout': 30})
+        try:
+            with scratch_database():
+                self.run(options['workers'], options['orders'], options['block_sizes'])
+        finally:
+            options_dict.clear()
+            options_dict.update(saved)
+
+    def run(self, workers, orders, block_sizes):
+        owner = CustomUser.objects.create_user(email='bench@example.com', role='owner')
+        store = Store.objects.create(
+            name='Bench', address='-', contact_number='+251911234567',
+            registration_number='BENCH', owner=owner, admin=owner,
+        )
+        self.stdout.write(f'{workers} workers x {orders} order numbers each')
+        for size in block_sizes:
+            location = Location.objects.create(
+                store=store, name=f'Block {size}', address='-', contact_number='+251911234567'
+            )
+            taken, writes = [], []
+            lock = threading.Lock()
+
+            def worker():
+                if size == 1:
+                    def next_number():
+                        return reserve(location.pk, DAY, 1)
+                else:
+                    next_number = partial(NumberAllocator(block_size=size).take, location.pk, DAY)
+                mine = []
+                try:
+                    for _ in range(orders):
+                        mine.append(next_number())
+                finally:
+                    connections.close_all()
+                with lock:
+                    taken.extend(mine)
+                    writes.append(len({(value - 1) // size for value in mine}))
+
+            label = 'write per order' if size == 1 else f'blocks of {size}'
+            threads = [threading.Thread(target=worker) for _ in range(workers)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            unique = len(set(taken)) == len(taken) == workers * orders
+            self.stdout.write(
+                f"  {label:<16} {len(taken) / elapsed:>8,.0f} numbers/s  sequence writes {sum(writes):>5}  "
+                f"highest {max(taken):>5}  {'unique' if unique else 'DUPLICATES'}"
+            )
@@ -1,24 +1,116 @@
 from django.db import models
+from django.utils import timezone
 from store.models import Store, Location
 from authentication.models import CustomUser
 from employees.models import Employee
 from inventory.models import Item
 
 class Order(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('completed', 'Completed'),
+        ('cancelled', 'Cancelled'),
+        ('refunded', 'Refunded'),
+    ]
+    PAYMENT_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('paid', 'Paid'),
+        ('refunded', 'Refunded'),
+    ]
     store = models.ForeignKey(Store, on_delete=models.CASCADE)
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    # "<location>-<yymmdd>-<n>", see order/numbers.py. Null on orders
+    # created before numbering.
+    order_number = models.CharField(max_length=20, unique=True, null=True, blank=True, editable=False)
     order_date = models.DateTimeField()
-    status = models.CharField(max_length=20)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
-    payment_status = models.CharField(max_length=20)
+    payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES)
+    # Client-generated for orders rung up offline, so a retried upload
+    # finds the order it already created.
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    loaded_status = None
+    loaded_payment_status = None
+    # Who made a change and why, for the history row a save records; see
+    # order/history.py.
+    changed_by = None
+    change_notes = None
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'idempotency_key'], name='unique_order_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['store', 'location', 'status', 'order_date'], name='idx_order_lookup'),
+        ]
+
     def __str__(self):
         return f"Order {self.id} - {self.status}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets a save tell which statuses it changed.
+        instance.loaded_status = instance.__dict__.get('status')
+        instance.loaded_payment_status = instance.__dict__.get('payment_status')
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.loaded_status = self.__dict__.get('status')
+        self.loaded_payment_status = self.__dict__.get('payment_status')
+
+class OrderHistory(models.Model):
+    """
+    One event in an order's life: its creation, or a change of status or
+    payment status. Rows are only ever appended, in batches (see
+    order/history.py).
+    """
+    ACTION_CHOICES = [
+        ('created', 'Created'),
+        ('status_changed', 'Status changed'),
+        ('payment_status_changed', 'Payment status changed'),
+    ]
+    # The timeline index below leads with order, so the foreign key needs
+    # no index of its own.
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='history', db_index=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    action = models.CharField(max_length=50, choices=ACTION_CHOICES)
+    previous_status = models.CharField(max_length=20, blank=True, null=True)
+    new_status = models.CharField(max_length=20, blank=True, null=True)
+    notes = models.TextField(blank=True, null=True)
+    # When the change was made, not when its batch was written.
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='idx_order_history_timeline'),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} {self.action}: {self.previous_status} -> {self.new_status}"
+
+class OrderNumberSequence(models.Model):
+    """
+    The last order number reserved for a location on a day.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='order_number_sequences')
+    day = models.DateField()
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'day'], name='unique_order_number_sequence'),
+        ]
+
+    def __str__(self):
+        return f"{self.location_id} {self.day}: {self.last_value}"
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_items')
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
@@ -0,0 +1,132 @@
+"""
+Order numbers.
+
+Orders are numbered per location and day, "<location>-<yymmdd>-<n>", e.g.
+12-261018-0042 for the 42nd order of location 12 on 18 October 2026 (the
+day is in TIME_ZONE). The unique order_number column is what guarantees
+uniqueness; the allocator only makes sure it is never violated in normal
+operation.
+
+Reading max(order_number) + 1 would make every checkout at a location wait
+for the previous one to commit. Instead each process reserves a block of
+BLOCK_SIZE numbers with one UPDATE of the location's OrderNumberSequence
+row, committed at once, and hands them out from memory; only one checkout
+in BLOCK_SIZE touches the row. Blocks never overlap because the UPDATE is
+an increment computed in the database.
+
+A reservation made inside a caller's transaction would be undone if that
+transaction rolled back, while the block was already in memory. In that
+case the allocator reserves only the number it needs and keeps nothing.
+
+Numbers are unique but not contiguous, and not in commit order across
+processes. The gaps are:
+
+- the unused rest of a block when its process stops or the day ends:
+  fewer than BLOCK_SIZE numbers per process, location and day;
+- a number handed out for a checkout that commits inside a caller's
+  transaction which is then rolled back.
+
+The number of a checkout that fails is given back and reused by the same
+process.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OrderNumberSequence
+
+DEFAULTS = {
+    'BLOCK_SIZE': 20,
+}
+
+
+def numbers_setting(name):
+    return getattr(settings, 'ORDER_NUMBERS', {}).get(name, DEFAULTS[name])
+
+
+def format_number(location_id, day, value):
+    return f'{location_id}-{day:%y%m%d}-{value:04d}'
+
+
+def reserve(location_id, day, count):
+    """
+    Reserve `count` consecutive numbers for the location and day in one
+    write; returns the first.
+    """
+    rows = OrderNumberSequence.objects.filter(location_id=location_id, day=day)
+    with transaction.atomic():
+        if not rows.update(last_value=F('last_value') + count):
+            try:
+                with transaction.atomic():
+                    OrderNumberSequence.objects.create(location_id=location_id, day=day, last_value=count)
+                return 1
+            except IntegrityError:
+                # Another process numbered the day's first order.
+                rows.update(last_value=F('last_value') + count)
+        return rows.values_list('last_value', flat=True).get() - count + 1
+
+
+class NumberAllocator:
+    """
+    Hands out numbers from blocks reserved per location and day. Shared by
+    the threads of a process.
+    """
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        # location_id -> [day, first, next, end, numbers given back]
+        self._blocks = {}
+
+    def take(self, location_id, day):
+        with self._lock:
+            block = self._blocks.get(location_id)
+            if block is not None and block[0] == day:
+                if block[4]:
+                    return block[4].pop()
+                if block[2] < block[3]:
+                    block[2] += 1
+                    return block[2] - 1
+            if connection.in_atomic_block:
+                return reserve(location_id, day, 1)
+            size = self.block_size or numbers_setting('BLOCK_SIZE')
+            start = reserve(location_id, day, size)
+            self._blocks[location_id] = [day, start, start + 1, start + size, []]
+            return start
+
+    def give_back(self, location_id, day, value):
+        """
+        Return an unused number. Only numbers of the current block are
+        kept; one reserved on its own inside a caller's transaction may be
+        undone with it and reserved again elsewhere.
+        """
+        with self._lock:
+            block = self._blocks.get(location_id)
+            if block is not None and block[0] == day and block[1] <= value < block[2]:
+                block[4].append(value)
+
+    def reset(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+allocator = NumberAllocator()
+
+
+@contextmanager
+def order_number(location_id, now=None):
+    """
+    The next order number for the location. Use around the transaction
+    that creates the order: if the block raises, the number is given back.
+    """
+    day = timezone.localdate(now)
+    value = allocator.take(location_id, day)
+    try:
+        yield format_number(location_id, day, value)
+    except BaseException:
+        allocator.give_back(location_id, day, value)
+        raise
@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OrderCursorPagination(CursorPagination):
+    """
+    Cursor pagination for order lists, newest first. The cursor holds the
+    last row's order_date (DRF positions on the first ordering field only)
+    plus an offset past the rows sharing it; id only breaks ties in the
+    ordering.
+    """
+    ordering = ('-order_date', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,54 @@
+from rest_framework import serializers
+
+from .models import Order, OrderHistory, OrderItem
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='item.name', read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'item', 'name', 'quantity', 'unit_price', 'subtotal']
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    """
+    An order with its lines. Related objects are read only through the
+    relations order_queryset() loads up front; anything else touched here
+    costs a query per order on the page.
+    """
+    store = serializers.SerializerMethodField()
+    location = serializers.SerializerMethodField()
+    employee = serializers.SerializerMethodField()
+    user = serializers.SerializerMethodField()
+    items = OrderItemSerializer(source='order_items', many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'order_number', 'order_date', 'status', 'payment_status', 'total_amount',
+            'store', 'location', 'employee', 'user', 'items', 'created_at', 'updated_at',
+        ]
+
+    def get_store(self, obj):
+        return {'id': obj.location.store.id, 'name': obj.location.store.name}
+
+    def get_location(self, obj):
+        return {'id': obj.location.id, 'name': obj.location.name}
+
+    def get_employee(self, obj):
+        return {'id': obj.employee.id, 'full_name': obj.employee.full_name}
+
+    def get_user(self, obj):
+        return {'id': obj.user.id, 'email': obj.user.email}
+
+
+class OrderHistorySerializer(serializers.ModelSerializer):
+    user = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrderHistory
+        fields = ['id', 'action', 'previous_status', 'new_status', 'user', 'notes', 'created_at']
+
+    def get_user(self, obj):
+        return {'id': obj.user.id, 'email': obj.user.email}
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import history
+from .models import Order
+
+
+@receiver(post_save, sender=Order)
+def record_order_history(sender, instance, created, **kwargs):
+    history.record(instance, created)
@@ -1,3 +1,305 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from authentication.models import CustomUser
+from employees.models import Employee
+from inventory.models import Category, Item
+from inventory.tests import create_location
+from .history import HistoryBuffer, history
+from .models import Order, OrderHistory, OrderItem, OrderNumberSequence
+from .numbers import NumberAllocator, format_number, order_number, reserve
+
+DAY = date(2026, 10, 18)
+
+
+class OrderNumberTests(TransactionTestCase):
+    def setUp(self):
+        _, self.location = create_location()
+
+    def test_processes_get_disjoint_blocks(self):
+        first, second = NumberAllocator(block_size=5), NumberAllocator(block_size=5)
+        with CaptureQueriesContext(connection) as queries:
+            taken = [first.take(self.location.id, DAY) for _ in range(3)]
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 1)
+        taken += [second.take(self.location.id, DAY) for _ in range(6)]
+        taken += [first.take(self.location.id, DAY) for _ in range(3)]
+        self.assertEqual(taken, [1, 2, 3, 6, 7, 8, 9, 10, 11, 4, 5, 16])
+        self.assertEqual(OrderNumberSequence.objects.get().last_value, 20)
+        self.assertEqual(first.take(self.location.id, date(2026, 10, 19)), 1)
+        self.assertEqual(format_number(self.location.id, DAY, 7), f'{self.location.id}-261018-0007')
+
+    def test_failed_checkout_gives_its_number_back(self):
+        allocator = NumberAllocator(block_size=5)
+        self.assertEqual(allocator.take(self.location.id, DAY), 1)
+        allocator.give_back(self.location.id, DAY, 2)  # not handed out yet: ignored
+        value = allocator.take(self.location.id, DAY)
+        allocator.give_back(self.location.id, DAY, value)
+        self.assertEqual(allocator.take(self.location.id, DAY), value)
+        self.assertEqual(allocator.take(self.location.id, DAY), 3)
+
+    def test_no_block_is_kept_inside_a_transaction(self):
+        allocator = NumberAllocator(block_size=5)
+        with transaction.atomic():
+            value = allocator.take(self.location.id, DAY)
+            allocator.give_back(self.location.id, DAY, value)
+        self.assertEqual(value, 1)
+        self.assertEqual(OrderNumberSequence.objects.get().last_value, 1)
+        self.assertEqual(allocator.take(self.location.id, DAY), 2)
+        self.assertEqual(OrderNumberSequence.objects.get().last_value, 6)
+
+
+class ReserveTests(TestCase):
+    def test_reserve_and_context_manager(self):
+        _, location = create_location()
+        self.assertEqual(reserve(location.id, DAY, 10), 1)
+        self.assertEqual(reserve(location.id, DAY, 10), 11)
+        with self.assertRaises(RuntimeError):
+            with order_number(location.id) as number:
+                raise RuntimeError(number)
+        with order_number(location.id) as number:
+            self.assertRegex(number, rf'^{location.id}-\d{{6}}-\d{{4}}$')
+
+
+class OrderListTests(TestCase):
+    def setUp(self):
+        self.owner, self.location = create_location()
+        drinks = Category.objects.create(location=self.location, name='Drinks')
+        self.items = [
+            Item.objects.create(category=drinks, name=f'Item {n}', price=Decimal('2.50'), quantity=100) for n in range(3)
+        ]
+        self.employee = Employee.objects.create(
+            store=self.location.store, location=self.location, full_name='Cashier', phone='+251911000001',
+            position='Cashier', email='cashier@example.com', hire_date=DAY, salary=Decimal('1000.00'),
+            employment_status='full_time',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def make_orders(self, count, status='completed', order_date=None):
+        orders = Order.objects.bulk_create([
+            Order(
+                store=self.location.store, location=self.location, user=self.owner, employee=self.employee,
+                order_date=order_date or timezone.now(), status=status, total_amount=Decimal('7.50'),
+                payment_status='paid',
+            )
+            for _ in range(count)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item=item, quantity=1, unit_price=item.price, subtotal=item.price)
+            for order in orders for item in self.items
+        ])
+        return orders
+
+    def test_list_query_budget_does_not_depend_on_page_size(self):
+        self.make_orders(2)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/orders/')
+        self.assertEqual(len(response.data['results']), 2)
+        self.make_orders(40)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/orders/', {'page_size': 40})
+        order = response.data['results'][0]
+        self.assertEqual(order['location'], {'id': self.location.id, 'name': 'Front'})
+        self.assertEqual(order['store'], {'id': self.location.store.id, 'name': 'Main Store'})
+        self.assertEqual(order['employee'], {'id': self.employee.id, 'full_name': 'Cashier'})
+        self.assertEqual([line['name'] for line in order['items']], ['Item 0', 'Item 1', 'Item 2'])
+        with self.assertNumQueries(3):
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_detail_query_budget(self):
+        order = self.make_orders(1)[0]
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/orders/{order.id}/')
+        self.assertEqual(response.data['total_amount'], '7.50')
+        self.assertEqual(len(response.data['items']), 3)
+
+    def test_filters(self):
+        self.make_orders(2, order_date=timezone.now() - timedelta(days=2))
+        self.make_orders(1, status='cancelled')
+        recent = self.make_orders(1)
+        response = self.client.get('/api/orders/', {'location': self.location.id, 'status': 'completed'})
+        self.assertEqual(len(response.data['results']), 3)
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        response = self.client.get('/api/orders/', {'status': 'completed', 'date_from': since})
+        self.assertEqual([order['id'] for order in response.data['results']], [recent[0].id])
+        response = self.client.get('/api/orders/', {'date_from': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_stores_are_hidden(self):
+        order = self.make_orders(1)[0]
+        stranger, _ = create_location('stranger@example.com')
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get('/api/orders/').data['results'], [])
+        self.assertEqual(self.client.get(f'/api/orders/{order.id}/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_admin_pages_do_not_query_per_row(self):
+        admin = CustomUser.objects.create_superuser(email='root@example.com', password='Str0ng!Passw0rd')
+        self.client.force_login(admin)
+        order = self.make_orders(2)[0]
+        urls = ('/admin/order/order/', f'/admin/order/order/{order.id}/change/')
+        counts = []
+        for url in urls:
+            # The first request fills the content type cache.
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            counts.append(len(queries))
+        self.make_orders(20)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item=item, quantity=1, unit_price=item.price, subtotal=item.price)
+            for item in self.items for _ in range(5)
+        ])
+        for url, before in zip(urls, counts):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            self.assertEqual(len(queries), before)
+
+    def test_history_timeline(self):
+        order = self.make_orders(1)[0]
+        order = Order.objects.get(pk=order.pk)
+        order.status, order.changed_by, order.change_notes = 'refunded', self.owner, 'Returned unopened'
+        order.save()
+        history.flush()
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/orders/{order.id}/history/')
+        self.assertEqual(
+            [(event['action'], event['previous_status'], event['new_status'], event['notes']) for event in response.data],
+            [('status_changed', 'completed', 'refunded', 'Returned unopened')],
+        )
+        self.assertEqual(response.data[0]['user'], {'id': self.owner.id, 'email': self.owner.email})
+        stranger, _ = create_location('stranger@example.com')
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get(f'/api/orders/{order.id}/history/').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class OrderHistoryTests(TransactionTestCase):
+    def setUp(self):
+        self.owner, self.location = create_location()
+        self.employee = Employee.objects.create(
+            store=self.location.store, location=self.location, full_name='Cashier', phone='+251911000001',
+            position='Cashier', email='cashier@example.com', hire_date=DAY, salary=Decimal('1000.00'),
+            employment_status='full_time',
+        )
+
+    def create_order(self):
+        return Order.objects.create(
+            store=self.location.store, location=self.location, user=self.owner, employee=self.employee,
+            order_date=timezone.now(), status='pending', total_amount=Decimal('7.50'), payment_status='pending',
+        )
+
+    def events(self):
+        return list(OrderHistory.objects.order_by('id').values_list('order_id', 'action', 'previous_status', 'new_status'))
+
+    def test_change_outside_a_transaction_is_written_at_once(self):
+        order = self.create_order()
+        self.assertEqual(self.events(), [(order.id, 'created', None, 'pending')])
+        order.save()
+        self.assertEqual(len(self.events()), 1)
+
+    def test_transaction_writes_its_events_in_one_insert_at_commit(self):
+        orders = [self.create_order() for _ in range(3)]
+        OrderHistory.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                for order in Order.objects.all():
+                    order.status, order.payment_status = 'completed', 'paid'
+                    order.save()
+                self.assertEqual(self.events(), [])
+        self.assertEqual(
+            len([query for query in queries if query['sql'].startswith('INSERT INTO "order_orderhistory"')]), 1
+        )
+        self.assertEqual(self.events(), [
+            event for order in orders for event in (
+                (order.id, 'status_changed', 'pending', 'completed'),
+                (order.id, 'payment_status_changed', 'pending', 'paid'),
+            )
+        ])
+
+    def test_rolled_back_changes_leave_no_history(self):
+        kept, dropped = self.create_order(), self.create_order()
+        OrderHistory.objects.all().delete()
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                kept.status = 'completed'
+                kept.save()
+                raise RuntimeError
+        with transaction.atomic():
+            kept.status = 'cancelled'
+            kept.save()
+            try:
+                with transaction.atomic():
+                    dropped.status = 'completed'
+                    dropped.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.events(), [(kept.id, 'status_changed', 'completed', 'cancelled')])
+
+    def test_flush_in_a_rolled_back_savepoint_keeps_outer_events(self):
+        order = self.create_order()
+        OrderHistory.objects.all().delete()
+        with transaction.atomic():
+            order.status = 'completed'
+            order.save()
+            try:
+                with transaction.atomic():
+                    history.flush()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.events(), [(order.id, 'status_changed', 'pending', 'completed')])
+
+    def test_flush_writes_released_inner_savepoints(self):
+        order = self.create_order()
+        OrderHistory.objects.all().delete()
+        with transaction.atomic():
+            with transaction.atomic():
+                order.status = 'completed'
+                order.save()
+            history.flush()
+            self.assertEqual(len(self.events()), 1)
+
+    def test_admin_change_writes_history_in_its_transaction(self):
+        order = self.create_order()
+        admin = CustomUser.objects.create_superuser(email='root@example.com', password='Str0ng!Passw0rd')
+        self.client.force_login(admin)
+        url = f'/admin/order/order/{order.id}/change/'
+        data = {
+            'store': order.store_id, 'location': order.location_id, 'user': order.user_id,
+            'employee': order.employee_id, 'order_date_0': order.order_date.strftime('%Y-%m-%d'),
+            'order_date_1': order.order_date.strftime('%H:%M:%S'), 'status': 'cancelled',
+            'total_amount': '7.50', 'payment_status': 'pending',
+            'order_items-TOTAL_FORMS': '0', 'order_items-INITIAL_FORMS': '0',
+        }
+        # With the after-commit fallback disabled, only the flush in the
+        # admin's transaction can have written the event.
+        with patch.object(HistoryBuffer, '_commit') as fallback:
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(OrderHistory.objects.filter(action='status_changed').values_list('new_status', 'user_id')),
+            [('cancelled', admin.id)],
+        )
+        self.assertFalse(any(call.args[0][0] for call in fallback.call_args_list))
+
+    @override_settings(ORDER_HISTORY={'BATCH_SIZE': 2})
+    def test_full_buffer_and_flush_write_inside_the_transaction(self):
+        orders = [self.create_order() for _ in range(3)]
+        OrderHistory.objects.all().delete()
+        with transaction.atomic():
+            for order in orders:
+                order.status = 'completed'
+                order.save()
+            self.assertEqual(len(self.events()), 2)
+            history.flush()
+            self.assertEqual(len(self.events()), 3)
+        self.assertEqual(len(self.events()), 3)
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import OrderDetailView, OrderHistoryView, OrderListView
+
+urlpatterns = [
+    path('', OrderListView.as_view(), name='order_list'),
+    path('<int:order_id>/', OrderDetailView.as_view(), name='order_detail'),
+    path('<int:order_id>/history/', OrderHistoryView.as_view(), name='order_history'),
+]
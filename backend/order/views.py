@@ -1,3 +1,93 @@
-from django.shortcuts import render
+from django.db.models import Prefetch, Q
+from django.http import Http404
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import generics, serializers, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-# Create your views here.
+from authentication.views import format_error_response
+from store.models import Store
+from .filters import OrderFilter
+from .models import Order, OrderHistory, OrderItem
+from .pagination import OrderCursorPagination
+from .serializers import OrderHistorySerializer, OrderSerializer
+
+
+def order_queryset():
+    """
+    Orders with everything OrderSerializer reads: employee, user and
+    location with its store joined in, and the lines with their items in
+    one more query for the whole page.
+    """
+    return Order.objects.select_related('employee', 'location__store', 'user').prefetch_related(
+        Prefetch('order_items', queryset=OrderItem.objects.select_related('item').order_by('id'))
+    )
+
+
+def visible_orders(user, orders=None):
+    """
+    The orders (of `orders`, by default order_queryset()) of the stores
+    the user owns or administers (all, for staff). The store ids are read
+    first so the order query filters on the leading column of
+    idx_order_lookup instead of joining the stores.
+    """
+    orders = order_queryset() if orders is None else orders
+    if not user.is_staff:
+        store_ids = list(Store.objects.filter(Q(owner=user) | Q(admin=user)).values_list('id', flat=True))
+        orders = orders.filter(store_id__in=store_ids)
+    return orders
+
+
+class OrderListView(generics.ListAPIView):
+    """
+    Orders, newest first, with their lines. Filter with ?store=,
+    ?location=, ?status=, ?payment_status=, ?employee=, ?date_from= and
+    ?date_to= (ISO 8601). Costs three queries per page whatever its size.
+    """
+    serializer_class = OrderSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = OrderCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = OrderFilter
+
+    def get_queryset(self):
+        return visible_orders(self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return super().get(request, *args, **kwargs)
+        except serializers.ValidationError as e:
+            return Response(
+                format_error_response('Invalid query parameters', e.detail),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                format_error_response('Failed to fetch orders', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class OrderDetailView(generics.RetrieveAPIView):
+    serializer_class = OrderSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_url_kwarg = 'order_id'
+
+    def get_queryset(self):
+        return visible_orders(self.request.user)
+
+
+class OrderHistoryView(generics.ListAPIView):
+    """
+    An order's history, oldest first, read through
+    idx_order_history_timeline.
+    """
+    serializer_class = OrderHistorySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        order_id = self.kwargs['order_id']
+        if not visible_orders(self.request.user, Order.objects.filter(pk=order_id)).exists():
+            raise Http404
+        return OrderHistory.objects.filter(order_id=order_id).select_related('user').order_by('created_at', 'id')
@@ -0,0 +1,128 @@
+"""
+POS checkout.
+
+A checkout turns a cart into an Order with its OrderItems and takes the
+stock, all in one transaction and in the same number of queries whatever
+the cart size: one SELECT for every item in the cart, one INSERT for the
+order, one bulk INSERT for its lines, the set-based decrement from
+inventory.stock (one UPDATE plus the ledger and low-stock writes it
+triggers) and one INSERT for the order's history event, plus, once every
+ORDER_NUMBERS['BLOCK_SIZE'] orders, the reservation of a block of order
+numbers. On SQLite, Django splits bulk inserts at 999 parameters, so
+carts of more than 142 lines cost one more INSERT per 142 lines.
+
+Prices come from Item, never from the terminal. Amounts are Decimal
+throughout: each line's subtotal is rounded to cents and the order total
+is the sum of the subtotals, so the receipt always adds up.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.models import Item
+from inventory.stock import decrement_stock
+from order.history import history
+from order.models import Order, OrderItem
+from order.numbers import order_number
+
+MAX_LINES = 500
+CENTS = Decimal('0.01')
+PAYMENT_STATUSES = ('paid', 'pending')
+
+
+class CheckoutError(ValueError):
+    """
+    Raised for a cart that cannot be checked out; `errors` maps line
+    numbers (0-based) to what is wrong with them.
+    """
+
+    def __init__(self, message, errors=None):
+        self.errors = errors or {}
+        super().__init__(message)
+
+
+def line_subtotal(price, quantity):
+    return (price * quantity).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def parse_cart(lines):
+    """
+    ({item_id: quantity}, {item_id: line number}) from cart lines, dicts
+    with `item` and `quantity`. Repeated items are summed into one line.
+    """
+    if not isinstance(lines, list) or not lines:
+        raise CheckoutError('The cart is empty')
+    if len(lines) > MAX_LINES:
+        raise CheckoutError(f'At most {MAX_LINES} lines per order')
+    cart, lines_of, errors = {}, {}, {}
+    for number, line in enumerate(lines):
+        try:
+            item_id = int(line['item'])
+            quantity = int(line['quantity'])
+        except (KeyError, TypeError, ValueError):
+            errors[number] = 'item and quantity are required integers'
+            continue
+        if quantity <= 0:
+            errors[number] = 'quantity must be positive'
+            continue
+        cart[item_id] = cart.get(item_id, 0) + quantity
+        lines_of.setdefault(item_id, number)
+    if errors:
+        raise CheckoutError('Invalid cart', errors)
+    return cart, lines_of
+
+
+def price_cart(location_id, cart, lines_of):
+    """
+    [(item_id, name, quantity, unit_price, subtotal)] and the total, with
+    prices read in one query. Items of another location or no longer for
+    sale are rejected.
+    """
+    items = {
+        item_id: (name, price, is_active and category_active)
+        for item_id, name, price, is_active, category_active in Item.objects.filter(
+            id__in=list(cart), category__location_id=location_id
+        ).values_list('id', 'name', 'price', 'is_active', 'category__is_active')
+    }
+    errors, priced, total = {}, [], Decimal('0.00')
+    for item_id, quantity in cart.items():
+        if item_id not in items:
+            errors[lines_of[item_id]] = f'item {item_id} is not sold at this location'
+            continue
+        name, price, for_sale = items[item_id]
+        if not for_sale:
+            errors[lines_of[item_id]] = f'{name} is not for sale'
+            continue
+        subtotal = line_subtotal(price, quantity)
+        priced.append((item_id, name, quantity, price, subtotal))
+        total += subtotal
+    if errors:
+        raise CheckoutError('Invalid cart', errors)
+    return priced, total
+
+
+def checkout(location_id, store_id, user, employee_id, lines, payment_status='paid'):
+    """
+    Create a completed order for `lines` and take its stock. Returns the
+    order and its priced lines. Raises CheckoutError, or InsufficientStock
+    (nothing is written).
+    """
+    if payment_status not in PAYMENT_STATUSES:
+        raise CheckoutError(f"payment_status must be one of {', '.join(PAYMENT_STATUSES)}")
+    cart, lines_of = parse_cart(lines)
+    priced, total = price_cart(location_id, cart, lines_of)
+    now = timezone.now()
+    with order_number(location_id, now) as number, transaction.atomic():
+        order = Order.objects.create(
+            store_id=store_id, location_id=location_id, user=user, employee_id=employee_id, order_number=number,
+            order_date=now, status='completed', total_amount=total, payment_status=payment_status,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item_id=item_id, quantity=quantity, unit_price=price, subtotal=subtotal)
+            for item_id, _, quantity, price, subtotal in priced
+        ])
+        decrement_stock(cart, 'sale', number)
+        # The order's 'created' history event commits with it.
+        history.flush()
+    return order, priced
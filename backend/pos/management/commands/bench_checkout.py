@@ -0,0 +1,77 @@
+import gc
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIClient
+
+from authentication.models import CustomUser
+from backend.benchmark import measure, scratch_database, summarize
+from employees.models import Employee
+from inventory.models import Category, Item
+from pos.views import PosCheckoutView
+from store.models import Location, Store
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark POS checkout through the API for carts of various sizes, '
+        'reporting queries per checkout and latency against a p99 target. '
+        'Runs against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 50, 200])
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--target-p99', type=float, default=100.0, help='p99 target in ms.')
+
+    def handle(self, *args, **options):
+        # Rate limiting is not what is being measured.
+        with scratch_database(), patch.object(PosCheckoutView, 'throttle_classes', []):
+            self.run(options['lines'], options['repeat'], options['target_p99'])
+
+    def run(self, sizes, repeat, target):
+        owner = CustomUser.objects.create_user(email='bench@example.com', role='owner')
+        store = Store.objects.create(
+            name='Bench', address='-', contact_number='+251911234567',
+            registration_number='BENCH', owner=owner, admin=owner,
+        )
+        location = Location.objects.create(store=store, name='Bench', address='-', contact_number='+251911234567')
+        cashier = CustomUser.objects.create_user(email='cashier@example.com', role='employee')
+        Employee.objects.create(
+            store=store, location=location, full_name='Cashier', phone='+251911000001', position='Cashier',
+            email=cashier.email, hire_date=date(2026, 1, 1), salary=Decimal('1000.00'), employment_status='full_time',
+        )
+        category = Category.objects.create(location=location, name='Bench')
+        items = Item.objects.bulk_create([
+            Item(category=category, name=f'Item {n}', price=Decimal('12.35'), quantity=10 ** 6)
+            for n in range(max(sizes))
+        ])
+
+        client = APIClient()
+        client.force_authenticate(cashier)
+        # Like backend/wsgi.py after startup.
+        gc.freeze()
+        url = f'/api/pos/locations/{location.pk}/checkout/'
+        self.stdout.write(f'Checkout, {repeat} orders per cart size (ms), p99 target {target:g} ms')
+        for size in sizes:
+            cart = {'lines': [{'item': item.pk, 'quantity': 2} for item in items[:size]]}
+
+            def ring_up():
+                response = client.post(url, cart, format='json')
+                assert response.status_code == 201, response.content
+
+            ring_up()
+            # The test client resets connection.queries per request, so
+            # count executions directly.
+            queries = []
+            with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+                ring_up()
+            result = summarize(measure(ring_up, repeat))
+            verdict = 'ok' if result['p99'] <= target else 'OVER TARGET'
+            self.stdout.write(
+                f"  {size:>4} lines  queries {len(queries):<3} mean {result['mean']:.2f}  "
+                f"p50 {result['p50']:.2f}  p99 {result['p99']:.2f}  {verdict}"
+            )
@@ -0,0 +1,96 @@
+import gc
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from authentication.models import CustomUser
+from backend.benchmark import scratch_database
+from employees.models import Employee
+from inventory.models import Category, Item
+from pos.checkout import checkout
+from pos.offline import ingest_orders
+from store.models import Location, Store
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark offline order ingestion in orders per second: batched '
+        'ingest_orders() for new and for retried batches vs. one checkout() '
+        'per queued order. Runs against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batches', type=int, nargs='+', default=[10, 100, 500])
+        parser.add_argument('--lines', type=int, default=3, help='Lines per order.')
+        parser.add_argument('--rounds', type=int, default=5, help='Batches uploaded per size.')
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(options['batches'], options['lines'], options['rounds'])
+
+    def run(self, sizes, lines, rounds):
+        owner = CustomUser.objects.create_user(email='bench@example.com', role='owner')
+        store = Store.objects.create(
+            name='Bench', address='-', contact_number='+251911234567',
+            registration_number='BENCH', owner=owner, admin=owner,
+        )
+        location = Location.objects.create(store=store, name='Bench', address='-', contact_number='+251911234567')
+        employee = Employee.objects.create(
+            store=store, location=location, full_name='Cashier', phone='+251911000001', position='Cashier',
+            email=owner.email, hire_date=date(2026, 1, 1), salary=Decimal('1000.00'), employment_status='full_time',
+        )
+        category = Category.objects.create(location=location, name='Bench')
+        items = Item.objects.bulk_create([
+            Item(category=category, name=f'Item {n}', price=Decimal('12.35'), quantity=10 ** 7) for n in range(200)
+        ])
+        order_date = timezone.now().isoformat()
+        counter = iter(range(10 ** 9))
+
+        def batch(size):
+            orders = []
+            for _ in range(size):
+                n = next(counter)
+                orders.append({
+                    'idempotency_key': f'bench-{n}',
+                    'order_date': order_date,
+                    'lines': [{'item': items[(n + k) % len(items)].pk, 'quantity': 1} for k in range(lines)],
+                })
+            return orders
+
+        def rate(upload, size):
+            elapsed = 0.0
+            for _ in range(rounds):
+                orders = batch(size)
+                start = time.perf_counter()
+                upload(orders)
+                elapsed += time.perf_counter() - start
+            return size * rounds / elapsed
+
+        def batched(orders):
+            ingest_orders(location.pk, store.pk, owner, employee.pk, orders)
+
+        def retried(orders):
+            # Upload once untimed, then time the retry.
+            ingest_orders(location.pk, store.pk, owner, employee.pk, orders)
+            start = time.perf_counter()
+            ingest_orders(location.pk, store.pk, owner, employee.pk, orders)
+            retried.elapsed += time.perf_counter() - start
+
+        def one_by_one(orders):
+            for order in orders:
+                checkout(location.pk, store.pk, owner, employee.pk, order['lines'])
+
+        gc.freeze()
+        self.stdout.write(f'Orders per second, {lines} lines per order, {rounds} batches per size')
+        for size in sizes:
+            retried.elapsed = 0.0
+            for _ in range(rounds):
+                retried(batch(size))
+            self.stdout.write(
+                f"  batch {size:>4}  ingest {rate(batched, size):>8,.0f}  "
+                f"retry {size * rounds / retried.elapsed:>8,.0f}  "
+                f"checkout each {rate(one_by_one, size):>8,.0f}"
+            )
@@ -0,0 +1,74 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIClient
+
+from authentication.models import CustomUser
+from backend.benchmark import measure, scratch_database, summarize
+from inventory.models import Category, Item
+from inventory.sync import current_version, snapshot
+from pos.menu import build_menu
+from store.models import Location, Store
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark POS menu page loads: building the catalog snapshot the menu '
+        'is regrouped from on every request vs. the cached snapshot. Runs '
+        'against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=30)
+        parser.add_argument('--items', type=int, default=2000, help='Items per location.')
+        parser.add_argument('--repeat', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(options['categories'], options['items'], options['repeat'])
+
+    def run(self, categories, items, repeat):
+        owner = CustomUser.objects.create_user(email='bench@example.com', role='owner')
+        store = Store.objects.create(
+            name='Bench', address='-', contact_number='+251911234567',
+            registration_number='BENCH', owner=owner, admin=owner,
+        )
+        location = Location.objects.create(store=store, name='Bench', address='-', contact_number='+251911234567')
+        created = Category.objects.bulk_create([
+            Category(location=location, name=f'Category {n}', is_hidden=False) for n in range(categories)
+        ])
+        Item.objects.bulk_create([
+            Item(category=created[n % categories], name=f'Item {n}', price=Decimal('9.99'), is_hidden=n % 10 == 0)
+            for n in range(items)
+        ])
+        # Any save bumps the catalog version.
+        created[0].save()
+
+        client = APIClient()
+        client.force_authenticate(owner)
+        url = f'/api/pos/locations/{location.pk}/menu/'
+
+        def uncached():
+            cache.clear()
+            client.get(url)
+
+        results = [('rebuilt each load', uncached), ('cached snapshot', lambda: client.get(url))]
+        cache.clear()
+        self.stdout.write(f'{categories} categories, {items} items, {repeat} loads (ms)')
+        for label, load in results:
+            load()
+            # The test client resets connection.queries per request, so
+            # count executions directly.
+            queries = []
+            with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+                load()
+            result = summarize(measure(load, repeat))
+            self.stdout.write(
+                f"  {label:<18} queries {len(queries):<3} mean {result['mean']:.3f}  "
+                f"p50 {result['p50']:.3f}  p99 {result['p99']:.3f}"
+            )
+        body = snapshot(location.pk, current_version(location.pk))
+        built = summarize(measure(lambda: build_menu(body), repeat))
+        self.stdout.write(f"  build_menu alone   p50 {built['p50']:.3f}")
@@ -0,0 +1,49 @@
+"""
+The POS menu: a location's active, visible categories with their active,
+visible items, nested for the till screen.
+
+It is the catalog sync snapshot (inventory.sync.snapshot) for the same
+catalog version, regrouped: the snapshot already holds exactly the rows a
+till can sell, is built once per version (inventory.models.CatalogVersion,
+bumped in the same transaction as any category or item change at the
+location) and is kept in the cache as JSON bytes. A page load is one query
+for the location and its version, a cache read and the regrouping, and the
+menu can never disagree with what a terminal syncs. Stock levels are not
+part of the menu.
+"""
+import json
+
+from inventory.sync import snapshot
+
+
+def build_menu(body):
+    """
+    The menu as a dict, from a snapshot's JSON bytes: categories and their
+    items ordered by name.
+    """
+    data = json.loads(body)
+    categories = {
+        row['id']: {**row, 'items': []}
+        for row in sorted(data['categories'], key=lambda row: (row['name'], row['id']))
+    }
+    for row in sorted(data['items'], key=lambda row: (row['name'], row['id'])):
+        # The snapshot reads categories and items in separate queries, so
+        # an item can outlive a category hidden in between.
+        if row['category'] in categories:
+            categories[row['category']]['items'].append(
+                {'id': row['id'], 'name': row['name'], 'barcode': row['barcode'], 'price': row['price']}
+            )
+    return {
+        'success': True,
+        'location': data['location'],
+        'version': data['version'],
+        'categories': list(categories.values()),
+    }
+
+
+def get_menu(location_id, version):
+    """
+    The menu as JSON bytes. `version` must be read before calling, as for
+    snapshot(), so that the menu is never newer than the version it claims.
+    """
+    return json.dumps(build_menu(snapshot(location_id, version))).encode()
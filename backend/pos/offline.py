@@ -0,0 +1,217 @@
+"""
+Ingestion of orders rung up while a till was offline.
+
+A till queues its sales while the connection is down and uploads them in
+batches when it comes back. Every queued order carries a client-generated
+idempotency key, unique per location, so an upload that is retried (after
+a timeout, say) finds the orders it already created and reports them as
+duplicates instead of recording the sale twice.
+
+A batch costs the same handful of queries whatever its size: one SELECT
+for the keys already ingested, one for the items and one for the named
+employees, then in one transaction a bulk INSERT of the orders, a bulk
+INSERT of their lines, one of their history events and one set-based
+stock decrement for the whole batch. Each order is still accepted or
+rejected on its own; a bad order never holds up the rest.
+
+These sales have already happened, so they are not refused for lack of
+stock: quantities may go below zero, and the items that did are reported
+back so someone can count the shelf. Prices come from Item, as at a live
+checkout, and the ledger records the batch as one movement per item whose
+reference is the range of order ids created. Order numbers are those of
+the day each order was rung up, reserved in one write per day in the batch.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from employees.models import Employee
+from inventory.models import Item
+from inventory.stock import decrement_stock
+from order.history import history, record_created
+from order.models import Order, OrderItem
+from order.numbers import format_number, reserve
+from .checkout import PAYMENT_STATUSES, CheckoutError, line_subtotal, parse_cart
+
+MAX_ORDERS = 500
+MAX_KEY_LENGTH = Order._meta.get_field('idempotency_key').max_length
+# How far ahead of the server clock a till's order_date may be.
+CLOCK_SKEW = timedelta(minutes=5)
+# Keeps `id__in` and `idempotency_key__in` under SQLite's bound-parameter
+# limit.
+LOOKUP_CHUNK_SIZE = 500
+
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        yield values[start:start + LOOKUP_CHUNK_SIZE]
+
+
+def _parse_order(data, now):
+    """
+    (key, order_date, cart, lines_of, employee_id, payment_status) or a
+    dict of errors.
+    """
+    if not isinstance(data, dict):
+        return None, {'order': 'must be an object'}
+    errors = {}
+    key = data.get('idempotency_key')
+    if not isinstance(key, str) or not 0 < len(key) <= MAX_KEY_LENGTH:
+        errors['idempotency_key'] = f'required, at most {MAX_KEY_LENGTH} characters'
+    try:
+        order_date = parse_datetime(data['order_date']) if isinstance(data.get('order_date'), str) else None
+    except ValueError:
+        # Well formed but out of range, e.g. month 13.
+        order_date = None
+    if order_date is None:
+        errors['order_date'] = 'required ISO 8601 datetime'
+    else:
+        if timezone.is_naive(order_date):
+            order_date = timezone.make_aware(order_date)
+        if order_date > now + CLOCK_SKEW:
+            errors['order_date'] = 'is in the future'
+    payment_status = data.get('payment_status', 'paid')
+    if payment_status not in PAYMENT_STATUSES:
+        errors['payment_status'] = f"must be one of {', '.join(PAYMENT_STATUSES)}"
+    employee_id = data.get('employee')
+    try:
+        employee_id = int(employee_id) if employee_id is not None else None
+    except (TypeError, ValueError):
+        errors['employee'] = 'must be an integer'
+    try:
+        cart, lines_of = parse_cart(data.get('lines'))
+    except CheckoutError as e:
+        errors['lines'] = e.errors or str(e)
+        cart = lines_of = None
+    if errors:
+        return None, errors
+    return (key, order_date, cart, lines_of, employee_id, payment_status), None
+
+
+def ingest_orders(location_id, store_id, user, default_employee_id, orders, may_name_employees=False):
+    """
+    Record a batch of offline orders. Returns (results, oversold): one
+    result per order, in order, with `status` created, duplicate (and the
+    existing order's id) or rejected (and its errors), and the ids of the
+    items whose stock went below zero. Orders without an employee are
+    booked to `default_employee_id`; only if `may_name_employees` (the
+    store's owner, admin or staff) may an order name someone else.
+    """
+    if not isinstance(orders, list) or not orders:
+        raise CheckoutError('orders must be a non-empty list')
+    if len(orders) > MAX_ORDERS:
+        raise CheckoutError(f'At most {MAX_ORDERS} orders per batch')
+    try:
+        return _ingest(location_id, store_id, user, default_employee_id, orders, may_name_employees)
+    except IntegrityError:
+        # A concurrent upload of the same orders won the race for some
+        # keys; this pass reports those as duplicates.
+        return _ingest(location_id, store_id, user, default_employee_id, orders, may_name_employees)
+
+
+def _ingest(location_id, store_id, user, default_employee_id, orders, may_name_employees):
+    now = timezone.now()
+    results = [None] * len(orders)
+    parsed = {}
+    for number, data in enumerate(orders):
+        order, errors = _parse_order(data, now)
+        if errors:
+            key = data.get('idempotency_key') if isinstance(data, dict) else None
+            results[number] = {'idempotency_key': key, 'status': 'rejected', 'errors': errors}
+        else:
+            parsed[number] = order
+
+    existing = {}
+    for chunk in _chunks({order[0] for order in parsed.values()}):
+        existing.update(
+            (key, (order_id, number)) for key, order_id, number in Order.objects.filter(location_id=location_id, idempotency_key__in=chunk)
+            .values_list('idempotency_key', 'id', 'order_number')
+        )
+    prices = {}
+    for chunk in _chunks({item_id for order in parsed.values() for item_id in order[2]}):
+        prices.update(
+            Item.objects.filter(id__in=chunk, category__location_id=location_id).values_list('id', 'price')
+        )
+    named = {order[4] for order in parsed.values() if order[4] is not None}
+    employees = set(
+        Employee.objects.filter(location_id=location_id, pk__in=named).values_list('pk', flat=True)
+    ) if named else set()
+
+    accepted, seen = [], {}
+    for number, (key, order_date, cart, lines_of, employee_id, payment_status) in parsed.items():
+        if key in existing:
+            order_id, order_number = existing[key]
+            results[number] = {
+                'idempotency_key': key, 'status': 'duplicate', 'order': order_id, 'order_number': order_number,
+            }
+            continue
+        if key in seen:
+            # Filled in with the first one's order once it is created.
+            results[number] = {'idempotency_key': key, 'status': 'duplicate', 'order': seen[key]}
+            continue
+        errors = {
+            lines_of[item_id]: f'item {item_id} is not sold at this location' for item_id in cart if item_id not in prices
+        }
+        errors = {'lines': errors} if errors else {}
+        if employee_id is None:
+            employee_id = default_employee_id
+            if employee_id is None:
+                errors['employee'] = 'required: the uploading user is not an employee of this location'
+        elif employee_id != default_employee_id and not may_name_employees:
+            errors['employee'] = 'only the store owner or admin can record a sale for another employee'
+        elif employee_id not in employees:
+            errors['employee'] = f'employee {employee_id} does not work at this location'
+        if errors:
+            results[number] = {'idempotency_key': key, 'status': 'rejected', 'errors': errors}
+            continue
+        lines = [
+            (item_id, quantity, prices[item_id], line_subtotal(prices[item_id], quantity))
+            for item_id, quantity in cart.items()
+        ]
+        order = Order(
+            store_id=store_id, location_id=location_id, user=user, employee_id=employee_id,
+            order_date=order_date, status='completed', payment_status=payment_status,
+            total_amount=sum((subtotal for *_, subtotal in lines), Decimal('0.00')), idempotency_key=key,
+        )
+        seen[key] = order
+        accepted.append((number, order, lines))
+
+    oversold = []
+    if accepted:
+        by_day = {}
+        for _, order, _ in accepted:
+            by_day.setdefault(timezone.localdate(order.order_date), []).append(order)
+        with transaction.atomic():
+            for day, orders_of_day in by_day.items():
+                start = reserve(location_id, day, len(orders_of_day))
+                for value, order in enumerate(orders_of_day, start):
+                    order.order_number = format_number(location_id, day, value)
+            created = Order.objects.bulk_create([order for _, order, _ in accepted])
+            record_created(created)
+            history.flush()
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, item_id=item_id, quantity=quantity, unit_price=price, subtotal=subtotal)
+                for _, order, lines in accepted for item_id, quantity, price, subtotal in lines
+            ])
+            totals = {}
+            for _, _, lines in accepted:
+                for item_id, quantity, _, _ in lines:
+                    totals[item_id] = totals.get(item_id, 0) + quantity
+            ids = [order.pk for order in created]
+            decrement_stock(totals, 'sale', f'orders:{min(ids)}-{max(ids)}', allow_negative=True)
+            for chunk in _chunks(totals):
+                oversold += Item.objects.filter(id__in=chunk, quantity__lt=0).values_list('id', flat=True)
+        for number, order, _ in accepted:
+            results[number] = {
+                'idempotency_key': order.idempotency_key, 'status': 'created',
+                'order': order.pk, 'order_number': order.order_number,
+            }
+    for result in results:
+        if isinstance(result.get('order'), Order):
+            order = result['order']
+            result.update(order=order.pk, order_number=order.order_number)
+    return results, sorted(oversold)
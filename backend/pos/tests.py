@@ -1,3 +1,329 @@
-from django.test import TestCase
+import json
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from employees.models import Employee
+from inventory.models import Category, Item, StockMovement
+from inventory.sync import snapshot
+from inventory.tests import create_location
+from authentication.models import CustomUser
+from authentication.tests import MEMORY_RATE_STORE
+from order.models import Order, OrderHistory
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pos-tests'}},
+    RATE_LIMIT_STORE=MEMORY_RATE_STORE,
+)
+class PosMenuTests(TestCase):
+    def setUp(self):
+        self.owner, self.location = create_location()
+        self.drinks = Category.objects.create(location=self.location, name='Drinks', is_hidden=False)
+        hidden = Category.objects.create(location=self.location, name='Back office', is_hidden=True)
+        self.water = Item.objects.create(
+            category=self.drinks, name='Water', price=Decimal('15.00'), barcode='M1', is_hidden=False
+        )
+        Item.objects.create(category=self.drinks, name='Old Soda', price=Decimal('9.00'), is_hidden=False, is_active=False)
+        Item.objects.create(category=hidden, name='Cleaner', price=Decimal('50.00'), is_hidden=False)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = f'/api/pos/locations/{self.location.id}/menu/'
+
+    def menu(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)
+
+    def test_only_visible_rows_nested_by_category(self):
+        menu = self.menu()
+        self.assertEqual([category['name'] for category in menu['categories']], ['Drinks'])
+        self.assertEqual(menu['categories'][0]['items'], [
+            {'id': self.water.id, 'name': 'Water', 'barcode': 'M1', 'price': '15.00'},
+        ])
+
+    def test_warm_load_is_one_query(self):
+        self.menu()
+        with self.assertNumQueries(1):
+            self.menu()
+
+    def test_menu_is_built_from_the_sync_snapshot(self):
+        menu = self.menu()
+        # The menu filled the snapshot cache a terminal sync reads.
+        with self.assertNumQueries(0):
+            body = json.loads(snapshot(self.location.id, menu['version']))
+        self.assertEqual([item['id'] for item in body['items']], [self.water.id])
+
+    def test_changes_rebuild_only_their_location(self):
+        _, other = create_location('other@example.com')
+        Category.objects.create(location=other, name='Other', is_hidden=False)
+        self.menu()
+        self.water.price = Decimal('16.00')
+        self.water.save()
+        self.assertEqual(self.menu()['categories'][0]['items'][0]['price'], '16.00')
+
+        self.client.force_authenticate(CustomUser.objects.get(email='other@example.com'))
+        other_url = f'/api/pos/locations/{other.id}/menu/'
+        self.client.get(other_url)
+        Item.objects.create(category=self.drinks, name='Tea', price=Decimal('5.00'), is_hidden=False)
+        with self.assertNumQueries(1):
+            self.client.get(other_url)
+
+    def test_not_modified_and_access(self):
+        response = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        cashier = CustomUser.objects.create_user(email='cashier@example.com', password='Str0ng!Passw0rd', role='employee')
+        self.client.force_authenticate(cashier)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        Employee.objects.create(
+            store=self.location.store, location=self.location, full_name='Cashier', phone='+251911000001',
+            position='Cashier', email=cashier.email, hire_date=date(2026, 1, 1), salary=Decimal('1000.00'),
+            employment_status='full_time',
+        )
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+
+@override_settings(RATE_LIMIT_STORE=MEMORY_RATE_STORE)
+class PosCheckoutTests(TestCase):
+    def setUp(self):
+        self.owner, self.location = create_location()
+        self.drinks = Category.objects.create(location=self.location, name='Drinks')
+        self.water = Item.objects.create(category=self.drinks, name='Water', price=Decimal('15.00'), quantity=10)
+        self.juice = Item.objects.create(category=self.drinks, name='Juice', price=Decimal('0.35'), quantity=10)
+        self.cashier = CustomUser.objects.create_user(
+            email='cashier@example.com', password='Str0ng!Passw0rd', role='employee'
+        )
+        self.employee = Employee.objects.create(
+            store=self.location.store, location=self.location, full_name='Cashier', phone='+251911000001',
+            position='Cashier', email=self.cashier.email, hire_date=date(2026, 1, 1), salary=Decimal('1000.00'),
+            employment_status='full_time',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.cashier)
+        self.url = f'/api/pos/locations/{self.location.id}/checkout/'
+
+    def checkout(self, lines, **extra):
+        return self.client.post(self.url, {'lines': lines, **extra}, format='json')
+
+    def test_prices_totals_and_stock(self):
+        response = self.checkout([
+            {'item': self.water.id, 'quantity': 2},
+            {'item': self.juice.id, 'quantity': 3},
+            {'item': self.water.id, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount, Decimal('46.05'))
+        self.assertEqual((order.status, order.payment_status, order.employee_id), ('completed', 'paid', self.employee.id))
+        self.assertEqual(
+            sorted(order.order_items.values_list('item_id', 'quantity', 'unit_price', 'subtotal')),
+            [(self.water.id, 3, Decimal('15.00'), Decimal('45.00')), (self.juice.id, 3, Decimal('0.35'), Decimal('1.05'))],
+        )
+        self.assertEqual(response.data['order']['total_amount'], '46.05')
+        self.assertEqual(
+            response.data['order']['order_number'], f'{self.location.id}-{timezone.localdate():%y%m%d}-0001'
+        )
+        self.assertEqual(
+            dict(Item.objects.values_list('name', 'quantity')), {'Water': 7, 'Juice': 7}
+        )
+        self.assertEqual(
+            set(StockMovement.objects.filter(reason='sale').values_list('reference', flat=True)), {order.order_number}
+        )
+        self.assertEqual(
+            list(order.history.values_list('action', 'new_status', 'user_id')), [('created', 'completed', self.cashier.id)]
+        )
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        many = Item.objects.bulk_create([
+            Item(category=self.drinks, name=f'Item {n}', price=Decimal('1.10'), quantity=5) for n in range(60)
+        ])
+        self.checkout([{'item': self.water.id, 'quantity': 1}])
+        counts = []
+        for items in (many[:1], many):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(
+                    self.checkout([{'item': item.id, 'quantity': 1} for item in items]).status_code,
+                    status.HTTP_201_CREATED,
+                )
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_nothing_is_written_when_short_or_invalid(self):
+        response = self.checkout([{'item': self.water.id, 'quantity': 1}, {'item': self.juice.id, 'quantity': 11}])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.juice.is_active = False
+        self.juice.save()
+        _, other = create_location('other@example.com')
+        elsewhere = Item.objects.create(
+            category=Category.objects.create(location=other, name='Other'), name='Tea', price=Decimal('5.00'), quantity=5
+        )
+        response = self.checkout([
+            {'item': self.water.id, 'quantity': 1},
+            {'item': self.juice.id, 'quantity': 1},
+            {'item': elsewhere.id, 'quantity': 1},
+            {'item': self.water.id, 'quantity': 0},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(sorted(response.data['errors']), [3])
+        response = self.checkout([{'item': self.juice.id, 'quantity': 1}, {'item': elsewhere.id, 'quantity': 1}])
+        self.assertEqual(sorted(response.data['errors']), [0, 1])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Item.objects.get(id=self.water.id).quantity, 10)
+
+    def test_owner_names_the_employee(self):
+        self.client.force_authenticate(self.owner)
+        response = self.checkout([{'item': self.water.id, 'quantity': 1}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.checkout([{'item': self.water.id, 'quantity': 1}], employee=self.employee.id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.get().user, self.owner)
+
+        stranger, _ = create_location('stranger@example.com')
+        self.client.force_authenticate(stranger)
+        response = self.checkout([{'item': self.water.id, 'quantity': 1}], employee=self.employee.id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cashier_cannot_book_a_sale_for_someone_else(self):
+        colleague = Employee.objects.create(
+            store=self.location.store, location=self.location, full_name='Colleague', phone='+251911000002',
+            position='Cashier', email='colleague@example.com', hire_date=date(2026, 1, 1),
+            salary=Decimal('1000.00'), employment_status='full_time',
+        )
+        response = self.checkout([{'item': self.water.id, 'quantity': 1}], employee=colleague.id)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Order.objects.exists())
+        response = self.checkout([{'item': self.water.id, 'quantity': 1}], employee=self.employee.id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.get().employee_id, self.employee.id)
+
+
+@override_settings(RATE_LIMIT_STORE=MEMORY_RATE_STORE)
+class PosOrderSyncTests(TestCase):
+    def setUp(self):
+        self.owner, self.location = create_location()
+        drinks = Category.objects.create(location=self.location, name='Drinks')
+        self.water = Item.objects.create(category=drinks, name='Water', price=Decimal('15.00'), quantity=3)
+        self.juice = Item.objects.create(category=drinks, name='Juice', price=Decimal('20.00'), quantity=10)
+        self.cashier = CustomUser.objects.create_user(
+            email='cashier@example.com', password='Str0ng!Passw0rd', role='employee'
+        )
+        self.employee = Employee.objects.create(
+            store=self.location.store, location=self.location, full_name='Cashier', phone='+251911000001',
+            position='Cashier', email=self.cashier.email, hire_date=date(2026, 1, 1), salary=Decimal('1000.00'),
+            employment_status='full_time',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.cashier)
+        self.url = f'/api/pos/locations/{self.location.id}/orders/sync/'
+
+    def order(self, key, *lines, **extra):
+        return {
+            'idempotency_key': key,
+            'order_date': '2026-10-18T09:30:00+03:00',
+            'lines': [{'item': item.id, 'quantity': quantity} for item, quantity in lines],
+            **extra,
+        }
+
+    def upload(self, *orders):
+        response = self.client.post(self.url, {'orders': list(orders)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_batch_with_per_order_outcomes(self):
+        data = self.upload(
+            self.order('a', (self.water, 2), (self.juice, 1)),
+            self.order('b', (self.water, 2)),
+            self.order('c', (self.juice, 1), employee=999999),
+            self.order('a', (self.water, 1)),
+            {'idempotency_key': 'd', 'lines': []},
+        )
+        self.assertEqual(
+            [result['status'] for result in data['results']],
+            ['created', 'created', 'rejected', 'duplicate', 'rejected'],
+        )
+        self.assertEqual(data['counts'], {'created': 2, 'duplicate': 1, 'rejected': 2})
+        self.assertEqual(data['results'][3]['order'], data['results'][0]['order'])
+        self.assertEqual(
+            [data['results'][n]['order_number'] for n in (0, 1, 3)],
+            [f'{self.location.id}-261018-0001', f'{self.location.id}-261018-0002', f'{self.location.id}-261018-0001'],
+        )
+        self.assertEqual(sorted(data['results'][4]['errors']), ['lines', 'order_date'])
+
+        first = Order.objects.get(idempotency_key='a')
+        self.assertEqual(first.total_amount, Decimal('50.00'))
+        self.assertEqual(first.employee_id, self.employee.id)
+        self.assertEqual(first.order_date.isoformat(), '2026-10-18T06:30:00+00:00')
+        self.assertEqual(first.order_items.count(), 2)
+        self.assertEqual(
+            sorted(OrderHistory.objects.values_list('order_id', 'action')),
+            sorted((result['order'], 'created') for result in data['results'][:2]),
+        )
+        # Sold offline: stock goes below zero rather than losing the sale.
+        self.assertEqual(Item.objects.get(id=self.water.id).quantity, -1)
+        self.assertEqual(data['oversold'], [self.water.id])
+        self.assertEqual(
+            StockMovement.objects.filter(reason='sale', item=self.water).get().reference,
+            f"orders:{min(data['results'][0]['order'], data['results'][1]['order'])}-"
+            f"{max(data['results'][0]['order'], data['results'][1]['order'])}",
+        )
+
+    def test_cashier_cannot_book_orders_for_someone_else(self):
+        colleague = Employee.objects.create(
+            store=self.location.store, location=self.location, full_name='Colleague', phone='+251911000002',
+            position='Cashier', email='colleague@example.com', hire_date=date(2026, 1, 1),
+            salary=Decimal('1000.00'), employment_status='full_time',
+        )
+        data = self.upload(
+            self.order('theirs', (self.juice, 1), employee=colleague.id),
+            self.order('mine', (self.juice, 1), employee=self.employee.id),
+        )
+        self.assertEqual([result['status'] for result in data['results']], ['rejected', 'created'])
+        self.assertIn('employee', data['results'][0]['errors'])
+        self.assertEqual(Order.objects.get().employee_id, self.employee.id)
+
+    def test_out_of_range_date_rejects_only_its_order(self):
+        data = self.upload(
+            self.order('good', (self.juice, 1)),
+            self.order('bad', (self.juice, 1), order_date='2026-13-45T09:30:00'),
+        )
+        self.assertEqual([result['status'] for result in data['results']], ['created', 'rejected'])
+        self.assertIn('order_date', data['results'][1]['errors'])
+
+    def test_retried_batch_is_free(self):
+        orders = [self.order(f'key-{n}', (self.juice, 1)) for n in range(5)]
+        first = self.upload(*orders)
+        with CaptureQueriesContext(connection) as queries:
+            again = self.upload(*orders)
+        self.assertEqual([result['status'] for result in again['results']], ['duplicate'] * 5)
+        self.assertEqual([result['order'] for result in again['results']], [result['order'] for result in first['results']])
+        self.assertFalse([query for query in queries if query['sql'].startswith(('INSERT', 'UPDATE'))])
+        self.assertEqual(Order.objects.count(), 5)
+        self.assertEqual(Item.objects.get(id=self.juice.id).quantity, 5)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        # The day's first order also creates its number sequence.
+        self.upload(self.order('first', (self.juice, 1)))
+        counts = []
+        for prefix, size in (('small', 2), ('large', 40)):
+            orders = [self.order(f'{prefix}-{n}', (self.juice, 1), (self.water, 1)) for n in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.upload(*orders)['counts']['created'], size)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_owner_without_employee_record_names_one(self):
+        self.client.force_authenticate(self.owner)
+        data = self.upload(
+            self.order('x', (self.juice, 1)),
+            self.order('y', (self.juice, 1), employee=self.employee.id),
+        )
+        self.assertEqual([result['status'] for result in data['results']], ['rejected', 'created'])
+        self.assertIn('employee', data['results'][0]['errors'])
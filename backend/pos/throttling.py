@@ -0,0 +1,15 @@
+from authentication.throttling import TokenBucketThrottle
+
+
+class PosRateThrottle(TokenBucketThrottle):
+    """
+    Per-user bucket for the till endpoints, used instead of the daily user
+    quota, which a busy till would run through before closing time.
+    """
+    scope = 'pos'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': request.user.pk,
+        }
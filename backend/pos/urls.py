@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import PosCheckoutView, PosMenuView, PosOrderSyncView
+
+urlpatterns = [
+    path('locations/<int:location_id>/menu/', PosMenuView.as_view(), name='pos_menu'),
+    path('locations/<int:location_id>/checkout/', PosCheckoutView.as_view(), name='pos_checkout'),
+    path('locations/<int:location_id>/orders/sync/', PosOrderSyncView.as_view(), name='pos_order_sync'),
+]
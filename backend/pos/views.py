@@ -1,3 +1,199 @@
-from django.shortcuts import render
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from authentication.views import format_error_response
+from employees.models import Employee
+from inventory.stock import InsufficientStock
+from inventory.sync import etag, etag_matches
+from store.models import Location
+from .checkout import CheckoutError, checkout
+from .menu import get_menu
+from .offline import ingest_orders
+from .throttling import PosRateThrottle
+
+
+def _till_locations(user, location_id):
+    """
+    The location, if the user may run a till there: the store's owner or
+    admin, an active employee of the location, or staff.
+    """
+    locations = Location.objects.filter(pk=location_id)
+    if not user.is_staff:
+        works_here = Employee.objects.filter(location=OuterRef('pk'), email=user.email, is_active=True)
+        locations = locations.filter(Q(store__owner=user) | Q(store__admin=user) | Exists(works_here))
+    return locations
+
+
+def get_pos_location_or_404(user, location_id):
+    """
+    (location id, catalog version) in one query, if the user may run a
+    till there.
+    """
+    row = _till_locations(user, location_id).values_list('pk', Coalesce('catalog_version__version', 0)).first()
+    if row is None:
+        raise Http404('Location not found')
+    return row
+
+
+def get_till_or_404(user, location_id, employee_id=None):
+    """
+    (location id, store id, employee id, manages) in one query, if the
+    user may run a till there. `manages` is whether the user is the
+    store's owner or admin, or staff: only they may record a sale under
+    another employee. The employee is `employee_id` if they are active at
+    the location, else the user's own employee record there; None if
+    neither.
+    """
+    employees = Employee.objects.filter(location=OuterRef('pk'), is_active=True)
+    employees = employees.filter(pk=employee_id) if employee_id is not None else employees.filter(email=user.email)
+    if user.is_staff:
+        manages = Value(True)
+    else:
+        manages = ExpressionWrapper(Q(store__owner=user) | Q(store__admin=user), output_field=BooleanField())
+    row = _till_locations(user, location_id).values_list(
+        'pk', 'store_id', Subquery(employees.values('pk')[:1]), manages
+    ).first()
+    if row is None:
+        raise Http404('Location not found')
+    return row
+
+
+def get_own_employee_id(user, location_id):
+    return (
+        Employee.objects.filter(location_id=location_id, email=user.email, is_active=True)
+        .values_list('pk', flat=True).first()
+    )
+
+
+class PosMenuView(APIView):
+    """
+    The location's menu for the POS screen. Send the ETag back in
+    If-None-Match to get a 304 when nothing has changed.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [PosRateThrottle]
+
+    def get(self, request, location_id):
+        location_id, version = get_pos_location_or_404(request.user, location_id)
+        try:
+            tag = etag(location_id, version)
+            if etag_matches(request.headers.get('If-None-Match'), tag):
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = HttpResponse(get_menu(location_id, version), content_type='application/json')
+            response['ETag'] = tag
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+        except Exception as e:
+            return Response(
+                format_error_response('Failed to load the menu', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PosCheckoutView(APIView):
+    """
+    Ring up a cart: {"lines": [{"item", "quantity"}], "employee"?,
+    "payment_status"?}. The employee defaults to the user's own employee
+    record at the location; only owners, admins and staff may name
+    another. Creates a completed
+    order and takes its stock, or nothing at all.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [PosRateThrottle]
+
+    def post(self, request, location_id):
+        employee = request.data.get('employee')
+        try:
+            employee = int(employee) if employee is not None else None
+        except (TypeError, ValueError):
+            return Response(format_error_response('employee must be an integer'), status=status.HTTP_400_BAD_REQUEST)
+        location_id, store_id, employee_id, manages = get_till_or_404(request.user, location_id, employee)
+        if employee is not None and not manages and employee_id != get_own_employee_id(request.user, location_id):
+            return Response(
+                format_error_response('Only the store owner or admin can record a sale for another employee'),
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if employee_id is None:
+            return Response(
+                format_error_response('An active employee of this location is required'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            order, lines = checkout(
+                location_id, store_id, request.user, employee_id, request.data.get('lines'),
+                payment_status=request.data.get('payment_status', 'paid'),
+            )
+            return Response({
+                'success': True,
+                'order': {
+                    'id': order.pk,
+                    'order_number': order.order_number,
+                    'status': order.status,
+                    'payment_status': order.payment_status,
+                    'order_date': order.order_date,
+                    'employee': employee_id,
+                    # Strings, so amounts are not rounded through float.
+                    'total_amount': str(order.total_amount),
+                    'lines': [
+                        {
+                            'item': item_id, 'name': name, 'quantity': quantity,
+                            'unit_price': str(price), 'subtotal': str(subtotal),
+                        }
+                        for item_id, name, quantity, price, subtotal in lines
+                    ],
+                },
+            }, status=status.HTTP_201_CREATED)
+        except CheckoutError as e:
+            return Response(format_error_response(str(e), e.errors), status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as e:
+            return Response(
+                format_error_response('Insufficient stock', {'short': e.short}),
+                status=status.HTTP_409_CONFLICT
+            )
+        except Exception as e:
+            return Response(
+                format_error_response('Checkout failed', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PosOrderSyncView(APIView):
+    """
+    Upload orders rung up while the till was offline: {"orders":
+    [{"idempotency_key", "order_date", "lines", "employee"?,
+    "payment_status"?}]}. Every order gets its own outcome (created,
+    duplicate or rejected); resending a batch is safe.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [PosRateThrottle]
+
+    def post(self, request, location_id):
+        location_id, store_id, employee_id, manages = get_till_or_404(request.user, location_id)
+        try:
+            results, oversold = ingest_orders(
+                location_id, store_id, request.user, employee_id, request.data.get('orders'),
+                may_name_employees=manages,
+            )
+            counts = {'created': 0, 'duplicate': 0, 'rejected': 0}
+            for result in results:
+                counts[result['status']] += 1
+            return Response({
+                'success': True,
+                'counts': counts,
+                'results': results,
+                'oversold': oversold,
+            }, status=status.HTTP_200_OK)
+        except CheckoutError as e:
+            return Response(format_error_response(str(e)), status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                format_error_response('Failed to ingest orders', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
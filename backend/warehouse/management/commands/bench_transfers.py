@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+
+from authentication.models import CustomUser
+from backend.benchmark import measure, scratch_database, summarize
+from inventory.models import Category, Item
+from store.models import Location, Store
+from warehouse.transfers import complete_transfer, create_transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark completing stock transfers of various sizes: the set-based '
+        'transfer engine vs. a naive per-line UPDATE for each side. Runs '
+        'against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[10, 300, 3000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(options['lines'], options['repeat'])
+
+    def run(self, sizes, repeat):
+        owner = CustomUser.objects.create_user(email='bench@example.com', role='owner')
+        store = Store.objects.create(
+            name='Bench', address='-', contact_number='+251911234567',
+            registration_number='BENCH', owner=owner, admin=owner,
+        )
+        source, destination = (
+            Location.objects.create(store=store, name=name, address='-', contact_number='+251911234567')
+            for name in ('Source', 'Destination')
+        )
+        count = max(sizes)
+        pairs = []
+        for location in (source, destination):
+            category = Category.objects.create(location=location, name='Stock')
+            pairs.append(Item.objects.bulk_create([
+                Item(category=category, name=f'Item {n}', price=Decimal('1.00'), quantity=10 ** 6)
+                for n in range(count)
+            ]))
+        pairs = list(zip(*((item.pk for item in items) for items in pairs)))
+
+        self.stdout.write(f'Completing a transfer, {repeat} runs each (ms)')
+        for size in sizes:
+            lines = [{'item': item_id, 'to_item': to_item_id, 'quantity': 1} for item_id, to_item_id in pairs[:size]]
+
+            def batched():
+                transfer = create_transfer(source, destination, lines, user=owner)
+                complete_transfer(transfer.pk)
+
+            def naive():
+                with transaction.atomic():
+                    for item_id, to_item_id in pairs[:size]:
+                        Item.objects.filter(pk=item_id, quantity__gte=1).update(quantity=F('quantity') - 1)
+                        Item.objects.filter(pk=to_item_id).update(quantity=F('quantity') + 1)
+
+            for label, run in (('set-based', batched), ('per line', naive)):
+                queries = []
+                with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+                    run()
+                result = summarize(measure(run, repeat))
+                self.stdout.write(
+                    f"  {size:>5} lines {label:<10} queries {len(queries):<5} mean {result['mean']:.1f}  "
+                    f"p50 {result['p50']:.1f}  p99 {result['p99']:.1f}  "
+                    f"lines/s {size / result['p50'] * 1000:,.0f}"
+                )
@@ -1,3 +1,54 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from inventory.models import Item
+from store.models import Location
+
+class StockTransfer(models.Model):
+    """
+    A move of stock from one location to another. Items are per location,
+    so each line pairs the item taken at the source with the item it
+    arrives as at the destination.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('completed', 'Completed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    from_location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='transfers_out')
+    to_location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='transfers_in')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    notes = models.TextField(blank=True, null=True)
+    transfer_date = models.DateTimeField(default=timezone.now)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True, related_name='stock_transfers'
+    )
+    completed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['from_location', 'to_location', 'status', 'transfer_date'], name='idx_stock_transfer_lookup'
+            ),
+            models.Index(fields=['to_location', 'status', 'transfer_date'], name='idx_stock_transfer_incoming'),
+        ]
+
+    def __str__(self):
+        return f"Transfer {self.pk}: {self.from_location_id} -> {self.to_location_id} ({self.status})"
+
+class StockTransferLine(models.Model):
+    transfer = models.ForeignKey(StockTransfer, on_delete=models.CASCADE, related_name='lines')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='transfer_lines_out')
+    to_item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='transfer_lines_in')
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['transfer', 'item'], name='unique_transfer_item'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.item_id} -> {self.to_item_id}"
@@ -1,3 +1,133 @@
+from decimal import Decimal
+
 from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from inventory.models import Category, Item, StockMovement
+from inventory.stock import InsufficientStock
+from inventory.tests import create_location
+from store.models import Location
+from .models import StockTransfer
+from .transfers import InvalidTransition, TransferError, cancel_transfer, complete_transfer, create_transfer
+
+
+class StockTransferTests(TestCase):
+    def setUp(self):
+        self.owner, self.source = create_location()
+        self.destination = Location.objects.create(
+            store=self.source.store, name='Back', address='Piassa', contact_number='+251911234567'
+        )
+        drinks = Category.objects.create(location=self.source, name='Drinks')
+        self.water = Item.objects.create(category=drinks, name='Water', price=Decimal('15.00'), quantity=10)
+        self.juice = Item.objects.create(category=drinks, name='Juice', price=Decimal('20.00'), quantity=2)
+        there = Category.objects.create(location=self.destination, name='Drinks')
+        self.water_there = Item.objects.create(category=there, name='Water', price=Decimal('15.00'), quantity=1)
+        self.juice_there = Item.objects.create(category=there, name='Juice', price=Decimal('20.00'), quantity=0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def quantities(self):
+        return list(
+            Item.objects.filter(id__in=[self.water.id, self.juice.id, self.water_there.id, self.juice_there.id])
+            .order_by('id').values_list('quantity', flat=True)
+        )
+
+    def transfer(self, water=4, juice=2):
+        return create_transfer(self.source, self.destination, [
+            {'item': self.water.id, 'quantity': water},
+            {'item': self.juice.id, 'quantity': juice, 'to_item': self.juice_there.id},
+        ], user=self.owner)
+
+    def test_stock_moves_only_on_completion(self):
+        transfer = self.transfer()
+        self.assertEqual(transfer.status, 'pending')
+        self.assertEqual(self.quantities(), [10, 2, 1, 0])
+        self.assertEqual(complete_transfer(transfer.pk), 2)
+        self.assertEqual(self.quantities(), [6, 0, 5, 2])
+        transfer.refresh_from_db()
+        self.assertEqual(transfer.status, 'completed')
+        self.assertIsNotNone(transfer.completed_at)
+        self.assertEqual(
+            sorted(StockMovement.objects.filter(reference=f'transfer:{transfer.pk}').values_list('reason', 'delta')),
+            [('transfer_in', 2), ('transfer_in', 4), ('transfer_out', -4), ('transfer_out', -2)],
+        )
+
+    def test_short_line_moves_nothing(self):
+        transfer = self.transfer(juice=3)
+        with self.assertRaises(InsufficientStock) as raised:
+            complete_transfer(transfer.pk)
+        self.assertEqual(raised.exception.short, {self.juice.id: {'requested': 3, 'available': 2}})
+        self.assertEqual(self.quantities(), [10, 2, 1, 0])
+        transfer.refresh_from_db()
+        self.assertEqual(transfer.status, 'pending')
+
+    def test_only_pending_transfers_change_state(self):
+        transfer = self.transfer()
+        complete_transfer(transfer.pk)
+        with self.assertRaises(InvalidTransition):
+            complete_transfer(transfer.pk)
+        with self.assertRaises(InvalidTransition):
+            cancel_transfer(transfer.pk)
+        self.assertEqual(self.quantities(), [6, 0, 5, 2])
+
+        cancelled = self.transfer()
+        cancel_transfer(cancelled.pk)
+        with self.assertRaises(InvalidTransition):
+            complete_transfer(cancelled.pk)
+        self.assertEqual(self.quantities(), [6, 0, 5, 2])
+
+    def test_invalid_lines_are_reported_by_number(self):
+        Item.objects.create(
+            category=Category.objects.get(location=self.source), name='Tea', price=Decimal('5.00'), quantity=5
+        )
+        tea = Item.objects.get(name='Tea')
+        with self.assertRaises(TransferError) as raised:
+            create_transfer(self.source, self.destination, [
+                {'item': self.water.id, 'quantity': 1},
+                {'item': self.water.id, 'quantity': 1},
+                {'item': tea.id, 'quantity': 1},
+                {'item': self.water_there.id, 'quantity': 1},
+                {'item': self.juice.id, 'quantity': 0},
+                {'item': self.juice.id, 'quantity': 1, 'to_item': self.juice.id},
+            ])
+        self.assertEqual(sorted(raised.exception.errors), [1, 2, 3, 4, 5])
+        self.assertFalse(StockTransfer.objects.exists())
+        with self.assertRaises(TransferError):
+            create_transfer(self.source, self.source, [{'item': self.water.id, 'quantity': 1}])
+
+    def test_create_and_complete_endpoint(self):
+        response = self.client.post('/api/warehouse/transfers/', {
+            'from_location': self.source.id,
+            'to_location': self.destination.id,
+            'lines': [{'item': self.water.id, 'quantity': 3}],
+            'complete': True,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['transfer']['status'], 'completed')
+        self.assertEqual(response.data['transfer']['lines'], [
+            {'item_id': self.water.id, 'to_item_id': self.water_there.id, 'quantity': 3},
+        ])
+        self.assertEqual(self.quantities(), [7, 2, 4, 0])
+
+        response = self.client.get('/api/warehouse/transfers/', {'status': 'completed'})
+        self.assertEqual([row['units'] for row in response.data['transfers']], [3])
+
+    def test_complete_endpoint_conflicts(self):
+        transfer = self.transfer(juice=3)
+        url = f'/api/warehouse/transfers/{transfer.pk}/complete/'
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn(str(self.juice.id), {str(key) for key in response.data['errors']['short']})
+
+        response = self.client.post(f'/api/warehouse/transfers/{transfer.pk}/cancel/')
+        self.assertEqual(response.data['transfer']['status'], 'cancelled')
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_409_CONFLICT)
 
-# Create your tests here.
+    def test_other_owners_cannot_see_transfers(self):
+        transfer = self.transfer()
+        stranger, _ = create_location('stranger@example.com')
+        self.client.force_authenticate(stranger)
+        response = self.client.get(f'/api/warehouse/transfers/{transfer.pk}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/warehouse/transfers/').data['transfers'], [])
@@ -0,0 +1,167 @@
+"""
+Stock transfers between locations.
+
+A transfer is created pending with all its lines in one bulk insert, and
+completed or cancelled later. Completing takes the stock off the source
+items and puts it on the destination items with the set-based updates in
+inventory.stock, all in one transaction: either every line moves or, if
+any source item is short, none does. Status changes are conditional
+UPDATEs on the current status, so two people completing the same transfer
+cannot both move the stock.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.models import Item
+from inventory.stock import decrement_stock, increment_stock
+from .models import StockTransfer, StockTransferLine
+
+MAX_LINES = 5000
+
+# Keeps `id__in` and name lookups under SQLite's bound-parameter limit.
+LOOKUP_CHUNK_SIZE = 500
+
+
+class TransferError(ValueError):
+    """
+    Raised for a transfer that cannot be created; `errors` maps line
+    numbers (0-based) to what is wrong with them.
+    """
+
+    def __init__(self, message, errors=None):
+        self.errors = errors or {}
+        super().__init__(message)
+
+
+class InvalidTransition(Exception):
+    def __init__(self, transfer_id, status, current):
+        self.current = current
+        super().__init__(f"Transfer {transfer_id} is {current}; cannot mark it {status}")
+
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        yield values[start:start + LOOKUP_CHUNK_SIZE]
+
+
+def resolve_lines(from_location, to_location, lines):
+    """
+    Validate transfer lines, dicts with `item`, `quantity` and optionally
+    `to_item`. Without `to_item` the destination item is the one with the
+    same name in a category of the same name. Returns
+    [(item_id, to_item_id, quantity)] or raises TransferError.
+    """
+    if not lines:
+        raise TransferError('A transfer needs at least one line')
+    if len(lines) > MAX_LINES:
+        raise TransferError(f'At most {MAX_LINES} lines per transfer')
+
+    errors, parsed = {}, []
+    for number, line in enumerate(lines):
+        try:
+            item_id = int(line['item'])
+            quantity = int(line['quantity'])
+            to_item_id = int(line['to_item']) if line.get('to_item') is not None else None
+        except (KeyError, TypeError, ValueError):
+            errors[number] = 'item and quantity are required integers'
+            continue
+        if quantity <= 0:
+            errors[number] = 'quantity must be positive'
+            continue
+        parsed.append((number, item_id, to_item_id, quantity))
+
+    seen = {}
+    for number, item_id, _, _ in parsed:
+        if item_id in seen:
+            errors[number] = f'item {item_id} is already on line {seen[item_id]}'
+        seen.setdefault(item_id, number)
+
+    sources = {}
+    for chunk in _chunks(item_id for _, item_id, _, _ in parsed):
+        sources.update(
+            (item_id, (category, name)) for item_id, category, name in
+            Item.objects.filter(id__in=chunk, category__location=from_location)
+            .values_list('id', 'category__name', 'name')
+        )
+    destinations = set()
+    for chunk in _chunks(to_item_id for _, _, to_item_id, _ in parsed if to_item_id is not None):
+        destinations.update(
+            Item.objects.filter(id__in=chunk, category__location=to_location).values_list('id', flat=True)
+        )
+    names = {sources[item_id] for _, item_id, to_item_id, _ in parsed if to_item_id is None and item_id in sources}
+    by_name = {}
+    for chunk in _chunks({name for _, name in names}):
+        for item_id, category, name in Item.objects.filter(
+            category__location=to_location, name__in=chunk
+        ).values_list('id', 'category__name', 'name'):
+            by_name.setdefault((category, name), item_id)
+
+    resolved = []
+    for number, item_id, to_item_id, quantity in parsed:
+        if number in errors:
+            continue
+        if item_id not in sources:
+            errors[number] = f'item {item_id} is not at the source location'
+            continue
+        if to_item_id is None:
+            to_item_id = by_name.get(sources[item_id])
+            if to_item_id is None:
+                errors[number] = f'no item named {sources[item_id][1]!r} in {sources[item_id][0]!r} at the destination'
+                continue
+        elif to_item_id not in destinations:
+            errors[number] = f'item {to_item_id} is not at the destination location'
+            continue
+        resolved.append((item_id, to_item_id, quantity))
+
+    if errors:
+        raise TransferError('Invalid transfer lines', errors)
+    return resolved
+
+
+def create_transfer(from_location, to_location, lines, user=None, notes=None):
+    """
+    Create a pending transfer; no stock moves until it is completed.
+    """
+    if from_location.pk == to_location.pk:
+        raise TransferError('Source and destination must differ')
+    resolved = resolve_lines(from_location, to_location, lines)
+    with transaction.atomic():
+        transfer = StockTransfer.objects.create(
+            from_location=from_location, to_location=to_location, created_by=user, notes=notes,
+        )
+        StockTransferLine.objects.bulk_create([
+            StockTransferLine(transfer=transfer, item_id=item_id, to_item_id=to_item_id, quantity=quantity)
+            for item_id, to_item_id, quantity in resolved
+        ], batch_size=LOOKUP_CHUNK_SIZE)
+    return transfer
+
+
+def _transition(transfer_id, status, **fields):
+    now = timezone.now()
+    updated = StockTransfer.objects.filter(pk=transfer_id, status='pending').update(
+        status=status, updated_at=now, **fields
+    )
+    if not updated:
+        current = StockTransfer.objects.filter(pk=transfer_id).values_list('status', flat=True).first()
+        raise InvalidTransition(transfer_id, status, current)
+    return now
+
+
+def complete_transfer(transfer_id):
+    """
+    Move the stock of every line and mark the transfer completed. Raises
+    InsufficientStock (nothing moves) or InvalidTransition.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        _transition(transfer_id, 'completed', completed_at=now, transfer_date=now)
+        lines = list(StockTransferLine.objects.filter(transfer_id=transfer_id).values_list('item_id', 'to_item_id', 'quantity'))
+        reference = f'transfer:{transfer_id}'
+        decrement_stock([(item_id, quantity) for item_id, _, quantity in lines], 'transfer_out', reference)
+        increment_stock([(to_item_id, quantity) for _, to_item_id, quantity in lines], 'transfer_in', reference)
+    return len(lines)
+
+
+def cancel_transfer(transfer_id):
+    _transition(transfer_id, 'cancelled')
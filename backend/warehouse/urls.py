@@ -0,0 +1,15 @@
+from django.urls import path
+
+from .views import (
+    StockTransferCancelView,
+    StockTransferCompleteView,
+    StockTransferDetailView,
+    StockTransferListView,
+)
+
+urlpatterns = [
+    path('transfers/', StockTransferListView.as_view(), name='stock_transfer_list'),
+    path('transfers/<int:transfer_id>/', StockTransferDetailView.as_view(), name='stock_transfer_detail'),
+    path('transfers/<int:transfer_id>/complete/', StockTransferCompleteView.as_view(), name='stock_transfer_complete'),
+    path('transfers/<int:transfer_id>/cancel/', StockTransferCancelView.as_view(), name='stock_transfer_cancel'),
+]
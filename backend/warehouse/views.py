@@ -1,3 +1,176 @@
-from django.shortcuts import render
+from django.db.models import Count, Q, Sum
+from django.http import Http404
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from authentication.views import format_error_response
+from inventory.stock import InsufficientStock
+from inventory.views import get_location_or_404
+from .models import StockTransfer, StockTransferLine
+from .transfers import (
+    InvalidTransition, TransferError, cancel_transfer, complete_transfer, create_transfer,
+)
+
+TRANSFER_FIELDS = (
+    'id', 'from_location_id', 'to_location_id', 'status', 'notes', 'transfer_date', 'completed_at', 'created_at',
+)
+
+
+def visible_transfers(user):
+    transfers = StockTransfer.objects.all()
+    if not user.is_staff:
+        transfers = transfers.filter(
+            Q(from_location__store__owner=user) | Q(from_location__store__admin=user)
+            | Q(to_location__store__owner=user) | Q(to_location__store__admin=user)
+        )
+    return transfers
+
+
+def get_transfer_or_404(user, transfer_id):
+    """
+    The transfer, if the user manages both of its locations.
+    """
+    transfer = StockTransfer.objects.filter(pk=transfer_id).values('from_location_id', 'to_location_id').first()
+    if transfer is None:
+        raise Http404('Transfer not found')
+    get_location_or_404(user, transfer['from_location_id'])
+    get_location_or_404(user, transfer['to_location_id'])
+    return transfer_id
+
+
+def transfer_data(transfer_id):
+    data = StockTransfer.objects.filter(pk=transfer_id).values(*TRANSFER_FIELDS).get()
+    data['lines'] = list(
+        StockTransferLine.objects.filter(transfer_id=transfer_id).order_by('id')
+        .values('item_id', 'to_item_id', 'quantity')
+    )
+    return data
+
+
+class StockTransferListView(APIView):
+    """
+    GET lists transfers touching the user's locations, newest first
+    (?status=, ?location=, ?before=<id>, ?limit=). POST creates one:
+    {"from_location", "to_location", "lines": [{"item", "quantity",
+    "to_item"?}], "notes"?, "complete"?}. With "complete": true the stock
+    moves right away.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_LIMIT = 200
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            limit = int(params.get('limit', 50))
+            before = int(params['before']) if params.get('before') else None
+            location = int(params['location']) if params.get('location') else None
+        except ValueError:
+            return Response(
+                format_error_response('limit, before and location must be integers'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= limit <= self.MAX_LIMIT:
+            return Response(
+                format_error_response(f'limit must be between 1 and {self.MAX_LIMIT}'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        transfers = visible_transfers(request.user)
+        if params.get('status'):
+            transfers = transfers.filter(status=params['status'])
+        if location is not None:
+            transfers = transfers.filter(Q(from_location_id=location) | Q(to_location_id=location))
+        if before is not None:
+            transfers = transfers.filter(id__lt=before)
+        rows = list(
+            transfers.order_by('-id')
+            .annotate(line_count=Count('lines'), units=Sum('lines__quantity'))
+            .values(*TRANSFER_FIELDS, 'line_count', 'units')[:limit]
+        )
+        return Response({'success': True, 'transfers': rows}, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        try:
+            from_location = get_location_or_404(request.user, request.data.get('from_location'))
+            to_location = get_location_or_404(request.user, request.data.get('to_location'))
+        except (TypeError, ValueError):
+            return Response(
+                format_error_response('from_location and to_location are required'),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        lines = request.data.get('lines')
+        if not isinstance(lines, list) or not all(isinstance(line, dict) for line in lines):
+            return Response(format_error_response('lines must be a list of objects'), status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            transfer = create_transfer(
+                from_location, to_location, lines, user=request.user, notes=request.data.get('notes'),
+            )
+            if request.data.get('complete'):
+                complete_transfer(transfer.pk)
+            return Response({'success': True, 'transfer': transfer_data(transfer.pk)}, status=status.HTTP_201_CREATED)
+        except TransferError as e:
+            return Response(format_error_response(str(e), e.errors), status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as e:
+            # The transfer was created; only completing it failed.
+            return Response(
+                format_error_response('Insufficient stock', {'transfer': transfer.pk, 'short': e.short}),
+                status=status.HTTP_409_CONFLICT
+            )
+        except Exception as e:
+            return Response(
+                format_error_response('Failed to create transfer', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class StockTransferDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, transfer_id):
+        get_transfer_or_404(request.user, transfer_id)
+        return Response({'success': True, 'transfer': transfer_data(transfer_id)}, status=status.HTTP_200_OK)
+
+
+class StockTransferCompleteView(APIView):
+    """
+    Move the transfer's stock. Nothing moves if any source item is short.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, transfer_id):
+        get_transfer_or_404(request.user, transfer_id)
+        try:
+            complete_transfer(transfer_id)
+            return Response({'success': True, 'transfer': transfer_data(transfer_id)}, status=status.HTTP_200_OK)
+        except InsufficientStock as e:
+            return Response(
+                format_error_response('Insufficient stock', {'short': e.short}),
+                status=status.HTTP_409_CONFLICT
+            )
+        except InvalidTransition as e:
+            return Response(format_error_response(str(e)), status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            return Response(
+                format_error_response('Failed to complete transfer', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class StockTransferCancelView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, transfer_id):
+        get_transfer_or_404(request.user, transfer_id)
+        try:
+            cancel_transfer(transfer_id)
+            return Response({'success': True, 'transfer': transfer_data(transfer_id)}, status=status.HTTP_200_OK)
+        except InvalidTransition as e:
+            return Response(format_error_response(str(e)), status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            return Response(
+                format_error_response('Failed to cancel transfer', str(e)),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )